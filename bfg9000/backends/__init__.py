@@ -1,25 +1,40 @@
 from collections import OrderedDict
-from pkg_resources import iter_entry_points, DistributionNotFound
 
 from ..objutils import memoize
+from ..plugins import entry_point, entry_points
 
 
 @memoize
 def list_backends():
     backends = []
-    for i in iter_entry_points('bfg9000.backends'):
+    for i in entry_points('bfg9000.backends'):
         try:
             backend = i.load()
             backends.append((i.name, backend))
-        # An ImportError can be thrown by the MSBuild backend when bfg9000 was
-        # installed as a Wheel with setuptools < 34.0.2. We'd require 34.0.2 or
-        # better, but setuptools < 11.0 won't let you upgrade setuptools during
-        # bfg's installation. Since Ubuntu 14.04 is supported until 2019 and
-        # has setuptools 2.2 by default, we're stuck with this for a while.
-        except (DistributionNotFound, ImportError):  # pragma: no cover
+        # An ImportError is thrown if a backend's optional dependencies (e.g.
+        # lxml for the MSBuild backend) aren't installed.
+        except ImportError:  # pragma: no cover
             pass
 
-    def sort_key(x):
-        return x[1].priority if x[1].version() else 0
-    backends.sort(key=sort_key, reverse=True)
+    # Checking whether a backend is actually installed means running it, so
+    # just sort by priority here; we'll only check when we need to choose a
+    # default backend.
+    backends.sort(key=lambda x: x[1].priority, reverse=True)
     return OrderedDict(backends)
+
+
+def get_backend(name):
+    # Look up a single backend without listing them all, since that usually
+    # means scanning every installed package's metadata.
+    entry = entry_point('bfg9000.backends', name)
+    if entry is None:
+        raise KeyError(name)
+    return entry.load()
+
+
+def default_backend():
+    backends = list_backends()
+    for name, backend in backends.items():
+        if backend.version():
+            return name
+    return next(iter(backends))
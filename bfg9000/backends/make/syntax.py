@@ -1,4 +1,5 @@
 import re
+import sys
 from collections import namedtuple
 from enum import Enum
 from io import StringIO
@@ -8,16 +9,18 @@ from ... import safe_str
 from ... import iterutils
 from ...platforms.host import platform_info
 from ...tools.common import Command
+from ...versioning import SpecifierSet
 
 # XXX: Make currently only supports sh-style shells.
 from ...shell import posix as pshell
 
-__all__ = ['Call', 'Entity', 'Function', 'Makefile', 'NamedEntity', 'Pattern',
-           'Section', 'Syntax', 'Writer', 'Variable', 'var', 'qvar', 'Silent',
-           'path_vars']
+__all__ = ['Call', 'Entity', 'features', 'Function', 'Makefile', 'NamedEntity',
+           'Pattern', 'Section', 'Syntax', 'Writer', 'Variable', 'var', 'qvar',
+           'Silent', 'path_vars']
 
 Rule = namedtuple('Rule', ['targets', 'deps', 'order_only', 'recipe',
-                           'variables', 'phony'])
+                           'variables', 'phony', 'private_variables',
+                           'grouped'])
 Include = namedtuple('Include', ['name', 'optional'])
 
 Syntax = Enum('Syntax', ['target', 'dependency', 'function', 'shell', 'clean'])
@@ -41,8 +44,11 @@ class Writer:
     __target_ex = re.compile(r'(\\*)(^~|[' + __escape_chars + '])')
     __dep_ex = re.compile(r'(\\*)(^~|[|' + __escape_chars + '])')
 
-    def __init__(self, stream):
+    def __init__(self, stream, path_cache=None):
         self.stream = stream
+        # A dict shared by all the Writers for a file, mapping (path, syntax)
+        # to the path's rendered string and whether it was shell-escaped.
+        self.path_cache = path_cache
 
     @classmethod
     def escape_str(cls, string, syntax):
@@ -88,19 +94,32 @@ class Writer:
             for i in thing.bits:
                 escaped |= self.write(i, syntax, shell_quote)
         elif isinstance(thing, path.BasePath):
-            out = Writer(StringIO())
-            thing = thing.realize(path_vars, shelly)
-            escaped = out.write(thing, syntax, pshell.inner_quote_info)
-
-            thing = out.stream.getvalue()
-            if shelly and escaped:
-                thing = pshell.wrap_quotes(thing)
+            key = (thing, syntax)
+            cached = (self.path_cache.get(key) if self.path_cache is not None
+                      else None)
+            if cached is None:
+                cached = self._render_path(thing, syntax, shelly)
+                if self.path_cache is not None:
+                    self.path_cache[key] = cached
+
+            thing, escaped = cached
             self.write_literal(thing)
         else:
             raise TypeError(type(thing))
 
         return escaped
 
+    @staticmethod
+    def _render_path(thing, syntax, shelly):
+        out = Writer(StringIO())
+        thing = thing.realize(path_vars, shelly)
+        escaped = out.write(thing, syntax, pshell.inner_quote_info)
+
+        thing = out.stream.getvalue()
+        if shelly and escaped:
+            thing = pshell.wrap_quotes(thing)
+        return sys.intern(thing), escaped
+
     def write_each(self, things, syntax, delim=safe_str.literal(' '),
                    prefix=None, suffix=None, shell_quote=pshell.quote_info):
         for i in iterutils.tween(things, delim, prefix, suffix):
@@ -226,15 +245,42 @@ if platform_info().destdir:
     path_vars[path.DestDir.destdir] = Variable('DESTDIR')
 
 
+class _MakeFeatures:
+    _features = {
+        'grouped_targets': '4.3',
+    }
+
+    def version(self, feature):
+        return self._features[feature]
+
+    def supported(self, feature, version):
+        return version and version in SpecifierSet(
+            '>={}'.format(self.version(feature))
+        )
+
+
+features = _MakeFeatures()
+
+
 class Makefile:
     Section = Section
 
-    def __init__(self, bfgfile, gnu=False):
+    def __init__(self, bfgfile, version=None, fast=False):
         self._bfgfile = bfgfile
-        self._gnu = gnu
+        # `version` is None for non-GNU makes.
+        self.version = version
+        # In fast mode, output directories are created up front instead of
+        # by rules in the Makefile; see `directory_deps` in the writer.
+        self.fast = fast
+        self.directories = set()
+        # Response files to write alongside the Makefile, mapping each path to
+        # the files it lists; see `response_file` in the writer.
+        self.response_files = {}
 
         self._var_table = set()
         self._global_variables = {i: [] for i in Section}
+        self._shared_variables = {}
+        self._shared_counts = {}
         self._target_variables = []
         self._defines = []
 
@@ -242,6 +288,14 @@ class Makefile:
         self._targets = set()
         self._includes = []
 
+        # Paths are often written many times (e.g. an object file is a target
+        # once but a dependency of many other rules), so remember how we
+        # rendered each one.
+        self._path_cache = {}
+
+    def _writer(self, out):
+        return Writer(out, path_cache=self._path_cache)
+
     def variable(self, name, value, section=Section.other, exist_ok=False):
         name, exists = self._unique_var(name, exist_ok)
         if not exists:
@@ -264,6 +318,26 @@ class Makefile:
             self._defines.append((name, value))
         return name
 
+    def shared_variable(self, name, value, section=Section.other):
+        """Return a variable (named `<name>_<N>`) holding `value`. Every call
+        with the same name and an identical value returns the same variable,
+        so that many rules can share a single definition."""
+
+        value = self._convert_args(value)
+        out = self._writer(StringIO())
+        out.write_shell(value)
+        key = (var(name).name, out.stream.getvalue())
+
+        if key not in self._shared_variables:
+            index = self._shared_counts.get(key[0], 0)
+            while self.has_variable('{}_{}'.format(key[0], index)):
+                index += 1
+            self._shared_counts[key[0]] = index + 1
+            self._shared_variables[key] = self.variable(
+                '{}_{}'.format(key[0], index), value, section
+            )
+        return self._shared_variables[key]
+
     def cmd_var(self, cmd):
         name = cmd.command_var.upper()
         return self.variable(name, cmd.command, Section.command, exist_ok=True)
@@ -282,17 +356,19 @@ class Makefile:
     def include(self, name, optional=False):
         self._includes.append(Include(name, optional))
 
-    @staticmethod
-    def _target_str(name):
-        out = Writer(StringIO())
+    def _target_str(self, name):
+        out = self._writer(StringIO())
         out.write(name, Syntax.target)
         return out.stream.getvalue()
 
     def rule(self, target, deps=None, order_only=None, recipe=None,
-             variables=None, phony=False):
+             variables=None, phony=False, private_variables=None,
+             grouped=False):
         targets = iterutils.listify(target)
         if len(targets) == 0:
             raise ValueError('must have at least one target')
+        if grouped and not self.supports('grouped_targets'):
+            raise ValueError('grouped targets not supported')
         for i in targets:
             target = self._target_str(i)
             if self.has_rule(target):
@@ -303,15 +379,21 @@ class Makefile:
             recipe = [self._convert_args(i) for i in recipe]
 
         variables = {var(k): v for k, v in (variables or {}).items()}
+        # Private variables aren't inherited by the target's prerequisites.
+        private_variables = {var(k): self._convert_args(v) for k, v in
+                             (private_variables or {}).items()}
 
         self._rules.append(Rule(
             targets, iterutils.listify(deps), iterutils.listify(order_only),
-            recipe, variables, phony
+            recipe, variables, phony, private_variables, grouped
         ))
 
     def has_rule(self, name):
         return name in self._targets
 
+    def supports(self, feature):
+        return features.supported(feature, self.version)
+
     def _convert_args(self, args):
         def convert(args):
             if iterutils.isiterable(args):
@@ -323,10 +405,12 @@ class Makefile:
         return convert(args)
 
     def _write_variable(self, out, name, value, syntax=Syntax.shell,
-                        target=None):
+                        target=None, private=False):
         if target:
             out.write(target, Syntax.target)
             out.write_literal(': ')
+        if private:
+            out.write_literal('private ')
         out.write_literal(name.name + ' := ')
         out.write_shell(value, syntax)
         out.write_literal('\n')
@@ -343,6 +427,11 @@ class Makefile:
             for target in rule.targets:
                 for name, value in rule.variables.items():
                     self._write_variable(out, name, value, target=target)
+        if rule.private_variables:
+            for target in rule.targets:
+                for name, value in rule.private_variables.items():
+                    self._write_variable(out, name, value, target=target,
+                                         private=True)
 
         if rule.phony:
             out.write_literal('.PHONY: ')
@@ -350,7 +439,8 @@ class Makefile:
             out.write_literal('\n')
 
         out.write_each(rule.targets, Syntax.target)
-        out.write_literal(':')
+        # Grouped targets are all updated by a single run of the recipe.
+        out.write_literal(' &:' if rule.grouped else ':')
 
         lit = safe_str.literal
         out.write_each(rule.deps, Syntax.dependency, prefix=lit(' '))
@@ -360,18 +450,30 @@ class Makefile:
             out.write_literal(' ; ')
             out.write_shell(rule.recipe)
         elif rule.recipe is not None:
+            # An empty recipe isn't the same as no recipe at all: make checks
+            # the target's mtime again after running an (empty) recipe.
+            if not rule.recipe:
+                out.write_literal(' ;')
             for cmd in rule.recipe:
                 out.write_literal('\n\t')
                 out.write_shell(cmd)
         out.write_literal('\n\n')
 
     def write(self, out):
-        out = Writer(out)
+        out = self._writer(out)
         out.write_literal(_comment_tmpl.format(self._bfgfile) + '\n\n')
 
-        # Don't let make use built-in rules/variables.
-        out.write_literal('MAKEFLAGS += --no-builtin-variables\n' if self._gnu
-                          else '.SUFFIXES:\n')
+        # Don't let make use built-in rules/variables. In fast mode, be extra
+        # thorough so that make doesn't waste time searching for implicit
+        # rules.
+        if self.fast:
+            if self.version is not None:
+                out.write_literal('MAKEFLAGS += -rR\n')
+            out.write_literal('.SUFFIXES:\n')
+        else:
+            out.write_literal('MAKEFLAGS += --no-builtin-variables\n'
+                              if self.version is not None
+                              else '.SUFFIXES:\n')
 
         # Necessary for escaping commas in function calls.
         self._write_variable(out, Variable(','), ',')
@@ -3,14 +3,24 @@ import re
 
 from ... import path
 from ... import shell
+from ... import tracing
 from .syntax import *
 from ...iterutils import listify, uniques
+from ...objutils import memoize
 from ...versioning import Version
 
 
 def version(env=os.environ):
     try:
         make = shell.which(env.get('MAKE', ['make', 'gmake']), env)
+    except IOError:
+        return None
+    return _version(make)
+
+
+@memoize
+def _version(make):
+    try:
         output = shell.execute(make + ['--version'], stdout=shell.Mode.pipe,
                                stderr=shell.Mode.devnull)
         m = re.match(r'GNU Make ([\d\.]+)', output)
@@ -51,17 +61,21 @@ def post_rule(fn):
 
 def write(env, build_inputs):
     buildfile = Makefile(build_inputs.bfgpath.string(env.base_dirs),
-                         env.backend_version is not None)
+                         env.backend_version, env.fast_makefile)
     buildfile.variable(path_vars[path.Root.srcdir], env.srcdir, Section.path)
 
     for i in _pre_rules:
-        i(build_inputs, buildfile, env)
+        with tracing.span(i.__name__, 'rule'):
+            i(build_inputs, buildfile, env)
     for e in build_inputs.edges():
-        _rule_handlers[type(e)](e, build_inputs, buildfile, env)
+        with tracing.span(type(e).__name__, 'rule'):
+            _rule_handlers[type(e)](e, build_inputs, buildfile, env)
     for i in _post_rules:
-        i(build_inputs, buildfile, env)
+        with tracing.span(i.__name__, 'rule'):
+            i(build_inputs, buildfile, env)
 
-    with open(filepath.string(env.base_dirs), 'w') as out:
+    with tracing.span(filepath.suffix, 'write'), \
+         path.write_if_changed(filepath.string(env.base_dirs)) as out:  # noqa
         buildfile.write(out)
 
 
@@ -76,28 +90,103 @@ def _get_path(thing):
     return thing if isinstance(thing, path.Path) else thing.path
 
 
+def stamp_path(target):
+    return _get_path(target).addext('.stamp')
+
+
 def multitarget_rule(buildfile, targets, deps=None, order_only=None,
-                     recipe=None, variables=None, phony=None):
+                     recipe=None, variables=None, phony=None,
+                     private_variables=None, restat=False):
     targets = listify(targets)
-    if len(targets) > 1:
-        first = targets[0]
-        primary = _get_path(first).addext('.stamp')
-        buildfile.rule(target=targets, deps=[primary])
+    grouped = len(targets) > 1 and buildfile.supports('grouped_targets')
+    if grouped and not restat:
+        # GNU Make 4.3+ knows that one run of the recipe updates every target,
+        # so we don't need a stamp file (or an extra `touch`) to tie them
+        # together.
+        buildfile.rule(targets, deps, order_only, recipe, variables, phony,
+                       private_variables, grouped=True)
+        return
+
+    if len(targets) > 1 or restat:
+        primary = stamp_path(targets[0])
+        # If the recipe might leave the targets untouched, give them an empty
+        # recipe so that make checks their mtimes again before deciding
+        # whether anything depending on them is out of date.
+        buildfile.rule(target=targets, deps=[primary],
+                       recipe=[] if restat else None, grouped=grouped)
         recipe = listify(recipe) + [Silent([ 'touch', qvar('@') ])]
     else:
         primary = targets[0]
 
-    buildfile.rule(primary, deps, order_only, recipe, variables, phony)
+    buildfile.rule(primary, deps, order_only, recipe, variables, phony,
+                   private_variables)
+
 
+def pool_variables(env, pool):
+    # Make has no equivalent to Ninja's pools, so run the recipes for rules in
+    # a pool via a wrapper that only lets `depth` of them run at once. Since
+    # this is a private variable, it doesn't apply to the rule's prerequisites.
+    if pool is None:
+        return None
+    lockfile = path.Path('.{}.pool'.format(pool.name))
+    return {'SHELL': env.tool('pool')(lockfile, pool.depth, ['/bin/sh'])}
 
-def directory_deps(targets):
+
+def directory_deps(buildfile, targets):
     builddir = path.Path('.')
-    dirs = uniques(_get_path(i).parent() for i in targets)
-    return [i.append(dir_sentinel) for i in dirs if i != builddir]
+    dirs = [i for i in uniques(_get_path(i).parent() for i in targets)
+            if i != builddir]
+
+    # In fast mode, we create all the directories when writing the Makefile,
+    # so make doesn't need to check a sentinel for each one during the build.
+    if buildfile.fast:
+        buildfile.directories.update(dirs)
+        return []
+    return [i.append(dir_sentinel) for i in dirs]
+
+
+def response_file(buildfile, target, files):
+    # Make can't write a file's contents for a recipe on its own (at least
+    # before GNU Make 4.0), so we write response files when generating the
+    # Makefile. Since they're only rewritten when they change, making them a
+    # dependency of the target also relinks it when the list of files changes.
+    rspfile = _get_path(target).addext('.rsp')
+    buildfile.response_files[rspfile] = files
+    return rspfile
+
+
+@post_rule
+def response_file_rule(build_inputs, buildfile, env):
+    if not buildfile.response_files:
+        return
+
+    variables = {path.Root.srcdir: env.srcdir, path.Root.builddir: None}
+    for rspfile, files in buildfile.response_files.items():
+        filename = rspfile.string(env.base_dirs)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with path.write_if_changed(filename) as out:
+            for i in files:
+                out.write(shell.quote(_get_path(i).string(variables)) + '\n')
+
+    # If a response file goes missing, regenerate the build files to write it
+    # again. Don't pass `--if-changed`, since none of the build's inputs have
+    # changed.
+    targets = list(buildfile.response_files)
+    buildfile.rule(
+        target=targets,
+        recipe=[env.tool('bfg9000')(path.Path('.'))],
+        grouped=len(targets) > 1 and buildfile.supports('grouped_targets')
+    )
 
 
 @post_rule
 def directory_rule(build_inputs, buildfile, env):
+    if buildfile.fast:
+        for i in sorted(i.string(env.base_dirs)
+                        for i in buildfile.directories):
+            os.makedirs(i, exist_ok=True)
+        return
+
     mkdir_p = env.tool('mkdir_p')
     pattern = Pattern(os.path.join('%', dir_sentinel))
     path = Function('patsubst', pattern, Pattern('%'), var('@'), quoted=True)
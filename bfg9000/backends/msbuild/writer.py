@@ -3,14 +3,24 @@ import re
 
 from ... import path
 from ... import shell
+from ... import tracing
 from .solution import Solution, UuidMap
 from .syntax import *  # noqa
+from ...objutils import memoize
 from ...versioning import Version
 
 
 def version(env=os.environ):
     try:
         msbuild = shell.which(env.get('MSBUILD', ['msbuild', 'xbuild']), env)
+    except IOError:
+        return None
+    return _version(msbuild)
+
+
+@memoize
+def _version(msbuild):
+    try:
         output = shell.execute(msbuild + ['/version'], stdout=shell.Mode.pipe,
                                stderr=shell.Mode.devnull)
         m = re.search(r'([\d\.]+)$', output)
@@ -39,16 +49,20 @@ def write(env, build_inputs):
     solution = Solution(uuids)
 
     for e in build_inputs.edges():
-        _rule_handlers[type(e)](e, build_inputs, solution, env)
+        with tracing.span(type(e).__name__, 'rule'):
+            _rule_handlers[type(e)](e, build_inputs, solution, env)
 
     # XXX: Handle default builds. Default builds go first in the solution. This
     # also means we'd need to support aliases so that we can have multiple
     # builds be the default.
     sln_file = path.Path(build_inputs['project'].name + '.sln')
-    with open(sln_file.string(env.base_dirs), 'w') as out:
+    with tracing.span(sln_file.suffix, 'write'), \
+         path.write_if_changed(sln_file.string(env.base_dirs)) as out:  # noqa
         solution.write(out)
     for p in solution:
         os.makedirs(p.path.parent().string(env.base_dirs), exist_ok=True)
-        with open(p.path.string(env.base_dirs), 'wb') as out:
+        with tracing.span(p.path.suffix, 'write'), \
+             path.write_if_changed(p.path.string(env.base_dirs),
+                                   binary=True) as out:  # noqa
             p.write(out)
     uuids.save()
@@ -1,5 +1,7 @@
 import re
+import sys
 from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
 from enum import Enum
 from io import StringIO
 
@@ -15,7 +17,8 @@ __all__ = ['features', 'NinjaFile', 'path_vars', 'Section', 'Syntax', 'var',
            'Variable', 'Writer']
 
 Rule = namedtuple('Rule', ['command', 'depfile', 'deps', 'description',
-                           'generator', 'pool', 'restat'])
+                           'generator', 'pool', 'restat', 'rspfile',
+                           'rspfile_content'])
 Build = namedtuple('Build', ['outputs', 'rule', 'inputs', 'implicit',
                              'order_only', 'variables'])
 
@@ -30,9 +33,12 @@ _comment_tmpl = """
 
 
 class Writer:
-    def __init__(self, stream, shell=shell):
+    def __init__(self, stream, shell=shell, path_cache=None):
         self.stream = stream
         self.shell = shell
+        # A dict shared by all the Writers for a file, mapping (path, syntax)
+        # to the path's rendered string and whether it was shell-escaped.
+        self.path_cache = path_cache
 
     @staticmethod
     def escape_str(string, syntax):
@@ -74,19 +80,31 @@ class Writer:
             for i in thing.bits:
                 escaped |= self.write(i, syntax, shell_quote)
         elif isinstance(thing, path.BasePath):
-            out = Writer(StringIO())
-            thing = thing.realize(path_vars, shelly)
-            escaped = out.write(thing, syntax, self.shell.inner_quote_info)
-
-            thing = out.stream.getvalue()
-            if shelly and escaped:
-                thing = self.shell.wrap_quotes(thing)
+            key = (thing, syntax)
+            cached = (self.path_cache.get(key) if self.path_cache is not None
+                      else None)
+            if cached is None:
+                cached = self._render_path(thing, syntax, shelly)
+                if self.path_cache is not None:
+                    self.path_cache[key] = cached
+
+            thing, escaped = cached
             self.write_literal(thing)
         else:
             raise TypeError(type(thing))
 
         return escaped
 
+    def _render_path(self, thing, syntax, shelly):
+        out = Writer(StringIO(), self.shell)
+        thing = thing.realize(path_vars, shelly)
+        escaped = out.write(thing, syntax, self.shell.inner_quote_info)
+
+        thing = out.stream.getvalue()
+        if shelly and escaped:
+            thing = self.shell.wrap_quotes(thing)
+        return sys.intern(thing), escaped
+
     def write_each(self, things, syntax, delim=safe_str.literal(' '),
                    prefix=None, suffix=None):
         for i in iterutils.tween(things, delim, prefix, suffix):
@@ -147,6 +165,7 @@ if platform_info().destdir:
 class _NinjaFeatures:
     _features = {
         'console': '1.5',
+        'dyndep': '1.10',
     }
 
     def version(self, feature):
@@ -170,13 +189,32 @@ class NinjaFile:
         self._min_version = None
         self._var_table = set()
         self._variables = {i: [] for i in Section}
+        self._shared_variables = {}
+        self._shared_counts = {}
 
+        self._pools = OrderedDict()
         self._rules = OrderedDict()
 
         self._builds = []
         self._build_outputs = set()
         self._defaults = []
 
+        # Builds for each file that we include with `subninja`, and the list
+        # that new builds are currently added to.
+        self._shards = OrderedDict()
+        self._current_builds = self._builds
+
+        self._stream = None
+        self._stream_path = None
+
+        # Paths are often written many times (e.g. an object file is an
+        # output once but an input to many other builds), so remember how we
+        # rendered each one.
+        self._path_cache = {}
+
+    def _writer(self, out):
+        return Writer(out, path_cache=self._path_cache)
+
     def min_version(self, version):
         version = Version(version)
         if self._min_version is None or version > self._min_version:
@@ -193,6 +231,26 @@ class NinjaFile:
             self._variables[section].append((name, value))
         return name
 
+    def shared_variable(self, name, value, section=Section.other):
+        """Return a variable (named `<name>_<N>`) holding `value`. Every call
+        with the same name and an identical value returns the same variable,
+        so that many builds can share a single definition."""
+
+        value = self._convert_args(value)
+        out = self._writer(StringIO())
+        out.write_shell(value)
+        key = (var(name).name, out.stream.getvalue())
+
+        if key not in self._shared_variables:
+            index = self._shared_counts.get(key[0], 0)
+            while self.has_variable('{}_{}'.format(key[0], index)):
+                index += 1
+            self._shared_counts[key[0]] = index + 1
+            self._shared_variables[key] = self.variable(
+                '{}_{}'.format(key[0], index), value, section
+            )
+        return self._shared_variables[key]
+
     def cmd_var(self, cmd):
         return self.variable(cmd.command_var, cmd.command, Section.command,
                              exist_ok=True)
@@ -200,15 +258,32 @@ class NinjaFile:
     def has_variable(self, name):
         return var(name) in self._var_table
 
+    def pool(self, name, depth):
+        if re.search(r'[^\w.-]', name):
+            raise ValueError('pool name contains invalid characters')
+        if name == 'console':
+            raise ValueError("'console' is a built-in pool")
+
+        if self._pools.setdefault(name, depth) != depth:
+            raise ValueError('pool {!r} already exists'.format(name))
+        return name
+
+    def has_pool(self, name):
+        return name in self._pools
+
+    def _check_pool(self, pool):
+        if pool == 'console':
+            self.min_version(features.version('console'))
+        elif not self.has_pool(pool):
+            raise ValueError('unknown pool {!r}'.format(pool))
+
     def rule(self, name, command, depfile=None, deps=None, description=None,
-             generator=False, pool=None, restat=False):
+             generator=False, pool=None, restat=False, rspfile=None,
+             rspfile_content=None):
         command = self._convert_args(command)
 
         if pool is not None:
-            if pool == 'console':
-                self.min_version(features.version('console'))
-            else:
-                raise ValueError('unknown pool {!r}'.format(pool))
+            self._check_pool(pool)
 
         if re.search(r'\W', name):
             raise ValueError('rule name contains invalid characters')
@@ -216,15 +291,19 @@ class NinjaFile:
         if self.has_rule(name):
             raise ValueError('rule {!r} already exists'.format(name))
 
+        if (rspfile is None) != (rspfile_content is None):
+            raise ValueError('rspfile and rspfile_content must be ' +
+                             'specified together')
+
         self._rules[name] = Rule(command, depfile, deps, description,
-                                 generator, pool, restat)
+                                 generator, pool, restat, rspfile,
+                                 rspfile_content)
 
     def has_rule(self, name):
         return name in self._rules
 
-    @staticmethod
-    def _output_str(name):
-        out = Writer(StringIO())
+    def _output_str(self, name):
+        out = self._writer(StringIO())
         out.write(name, Syntax.output)
         return out.stream.getvalue()
 
@@ -235,6 +314,10 @@ class NinjaFile:
 
         variables = {var(k): self._convert_args(v) for k, v in
                      (variables or {}).items()}
+        if var('pool') in variables:
+            self._check_pool(variables[var('pool')])
+        if var('dyndep') in variables:
+            self.min_version(features.version('dyndep'))
 
         outputs = iterutils.listify(output)
         for i in outputs:
@@ -242,15 +325,62 @@ class NinjaFile:
             if self.has_build(out):
                 raise ValueError('build for {!r} already exists'.format(out))
             self._build_outputs.add(out)
-        self._builds.append(Build(
+
+        build = Build(
             outputs, rule, iterutils.listify(inputs),
             iterutils.listify(implicit), iterutils.listify(order_only),
             variables
-        ))
+        )
+        if self._stream:
+            self._write_build(self._stream, build)
+            self._stream.write_literal('\n')
+        else:
+            self._current_builds.append(build)
 
     def has_build(self, name):
         return name in self._build_outputs
 
+    def stream_builds(self, out, path):
+        """Write all build statements (including those added later) to `out`
+        as soon as they're added instead of keeping them in memory. `path` is
+        the file `out` writes to; the main file will include it."""
+
+        self._stream = self._writer(out)
+        self._stream_path = path
+        for build in self._builds:
+            self._write_build(self._stream, build)
+            self._stream.write_literal('\n')
+        self._builds = self._current_builds = []
+
+    def add_shard(self, path):
+        self._shards.setdefault(path, [])
+
+    @contextmanager
+    def shard(self, path):
+        """Add builds to the separate file at `path` (included via `subninja`
+        from the main file) until the end of this context. If `path` is None,
+        add builds to the main file instead."""
+
+        old = self._current_builds
+        if path is None:
+            self._current_builds = self._builds
+        else:
+            self._current_builds = self._shards.setdefault(path, [])
+        try:
+            yield
+        finally:
+            self._current_builds = old
+
+    def shards(self):
+        return list(self._shards.keys())
+
+    def write_shard(self, out, path, bfgfile):
+        out = self._writer(out)
+        out.write_literal(_comment_tmpl.format(bfgfile) + '\n\n')
+        for build in self._shards[path]:
+            self._write_build(out, build)
+            out.write_literal('\n')
+
     def default(self, paths):
         self._defaults.extend(iterutils.iterate(paths))
 
@@ -283,6 +413,10 @@ class NinjaFile:
             self._write_variable(out, var('pool'), rule.pool, indent=1)
         if rule.restat:
             self._write_variable(out, var('restat'), '1', indent=1)
+        if rule.rspfile:
+            self._write_variable(out, var('rspfile'), rule.rspfile, indent=1)
+            self._write_variable(out, var('rspfile_content'),
+                                 rule.rspfile_content, indent=1)
 
     def _write_build(self, out, build):
         out.write_literal('build ')
@@ -302,7 +436,7 @@ class NinjaFile:
                 self._write_variable(out, k, v, indent=1, syntax=syntax)
 
     def write(self, out):
-        out = Writer(out)
+        out = self._writer(out)
         out.write_literal(_comment_tmpl.format(self._bfgfile) + '\n\n')
 
         if self._min_version:
@@ -320,10 +454,27 @@ class NinjaFile:
             if self._variables[section]:
                 out.write_literal('\n')
 
+        for name, depth in self._pools.items():
+            out.write_literal('pool ' + name + '\n')
+            self._write_variable(out, var('depth'), str(depth), indent=1)
+            out.write_literal('\n')
+
         for name, rule in self._rules.items():
             self._write_rule(out, name, rule)
             out.write_literal('\n')
 
+        if self._stream_path:
+            out.write_literal('include ')
+            out.write(self._stream_path, Syntax.input)
+            out.write_literal('\n\n')
+
+        for shard in self._shards:
+            out.write_literal('subninja ')
+            out.write(shard, Syntax.input)
+            out.write_literal('\n')
+        if self._shards:
+            out.write_literal('\n')
+
         for build in self._builds:
             self._write_build(out, build)
             out.write_literal('\n')
@@ -3,13 +3,23 @@ import os
 from ... import iterutils
 from ... import path
 from ... import shell
+from ... import tracing
 from .syntax import *
+from ...objutils import memoize
 from ...versioning import Version
 
 
 def version(env=os.environ):
     try:
         ninja = shell.which(env.get('NINJA', ['ninja', 'ninja-build']), env)
+    except IOError:
+        return None
+    return _version(ninja)
+
+
+@memoize
+def _version(ninja):
+    try:
         output = shell.execute(ninja + ['--version'], stdout=shell.Mode.pipe,
                                stderr=shell.Mode.devnull)
         return Version(output.strip())
@@ -20,6 +30,11 @@ def version(env=os.environ):
 
 priority = 3
 filepath = path.Path('build.ninja')
+edges_filepath = path.Path('build.edges.ninja')
+
+# For builds with at least this many edges, write the build statements to a
+# separate file as we go instead of keeping them all in memory.
+stream_threshold = 10000
 
 _rule_handlers = {}
 _pre_rules = []
@@ -44,19 +59,65 @@ def post_rule(fn):
     return fn
 
 
+def _shard_path(bfgpath):
+    if bfgpath is None:
+        return None
+    return path.Path(bfgpath.parent().suffix).append(filepath.suffix)
+
+
 def write(env, build_inputs):
     buildfile = NinjaFile(build_inputs.bfgpath.string(env.base_dirs))
     buildfile.variable(path_vars[path.Root.srcdir], env.srcdir, Section.path)
 
+    if env.split_build_files:
+        # Write the builds for each submodule's edges to a separate file. We
+        # find all of these files up front so that they can be outputs of the
+        # regenerate rule (and be written even if they end up empty).
+        shards = {}
+        for e in build_inputs.edges():
+            bfgpath = build_inputs.edge_submodule(e)
+            shard = _shard_path(bfgpath)
+            if shard is not None and shard not in shards:
+                shards[shard] = bfgpath
+                buildfile.add_shard(shard)
+        build_inputs['regenerate'].outputs.extend(shards)
+        _write_rules(env, build_inputs, buildfile, split=True)
+
+        for shard, bfgpath in shards.items():
+            filename = shard.string(env.base_dirs)
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            with tracing.span(shard.suffix, 'write'), \
+                 path.write_if_changed(filename) as out:  # noqa
+                buildfile.write_shard(out, shard,
+                                      bfgpath.string(env.base_dirs))
+    elif sum(1 for i in build_inputs.edges()) >= stream_threshold:
+        build_inputs['regenerate'].outputs.append(edges_filepath)
+        with tracing.span(edges_filepath.suffix, 'write'), \
+             path.stream_if_changed(edges_filepath.string(env.base_dirs)) \
+             as out:  # noqa
+            buildfile.stream_builds(out, edges_filepath)
+            _write_rules(env, build_inputs, buildfile)
+    else:
+        _write_rules(env, build_inputs, buildfile)
+
+    with tracing.span(filepath.suffix, 'write'), \
+         path.write_if_changed(filepath.string(env.base_dirs)) as out:  # noqa
+        buildfile.write(out)
+
+
+def _write_rules(env, build_inputs, buildfile, split=False):
     for i in _pre_rules:
-        i(build_inputs, buildfile, env)
+        with tracing.span(i.__name__, 'rule'):
+            i(build_inputs, buildfile, env)
     for e in build_inputs.edges():
-        _rule_handlers[type(e)](e, build_inputs, buildfile, env)
+        shard = (_shard_path(build_inputs.edge_submodule(e)) if split
+                 else None)
+        with tracing.span(type(e).__name__, 'rule'), \
+             buildfile.shard(shard):  # noqa
+            _rule_handlers[type(e)](e, build_inputs, buildfile, env)
     for i in _post_rules:
-        i(build_inputs, buildfile, env)
-
-    with open(filepath.string(env.base_dirs), 'w') as out:
-        buildfile.write(out)
+        with tracing.span(i.__name__, 'rule'):
+            i(build_inputs, buildfile, env)
 
 
 def flags_vars(name, value, buildfile):
@@ -67,7 +128,7 @@ def flags_vars(name, value, buildfile):
 
 def command_build(buildfile, env, output, inputs=None, implicit=None,
                   order_only=None, command=[], console=False, phony=False,
-                  description=None):
+                  description=None, pool=None, restat=False, dyndep=None):
     if phony:
         extra_implicit = ['PHONY']
         if not buildfile.has_build('PHONY'):
@@ -89,6 +150,13 @@ def command_build(buildfile, env, output, inputs=None, implicit=None,
     variables = {'cmd': command}
     if description:
         variables['description'] = description
+    if pool:
+        variables['pool'] = pool
+    if restat:
+        variables['restat'] = '1'
+    if dyndep:
+        variables['dyndep'] = dyndep
+        order_only = iterutils.listify(order_only) + [dyndep]
     buildfile.build(
         output=output,
         rule=rule_name,
@@ -1,11 +1,14 @@
 import errno
 from itertools import chain
 
+from . import tracing
 from .arguments.parser import ArgumentParser
 from .builtins import builtin, init as builtin_init
 from .build_inputs import BuildInputs
+from .find_cache import FindCache
 from .path import exists, Path, pushd, Root
 from .iterutils import listify
+from .submodule_cache import SubmoduleCache
 from .tools import init as tools_init
 
 bfgfile = 'build.bfg'
@@ -47,10 +50,30 @@ def _execute_script(f, context, path, run_post=False):
 
 
 def execute_file(context, path, run_post=False):
-    with open(path.string(context.env.base_dirs), 'r') as f:
+    with tracing.span(path.suffix, 'script', root=path.root.name), \
+         open(path.string(context.env.base_dirs), 'r') as f:  # noqa
         return _execute_script(f, context, path, run_post)
 
 
+def execute_submodule(context, path):
+    def execute():
+        return execute_file(context, path).exports
+
+    def execute_cached():
+        cache = getattr(context, 'submodule_cache', None)
+        if cache is None:
+            return execute()
+        return cache.execute(context, path, execute)
+
+    # Only build contexts track which submodule added each edge; options.bfg
+    # files can use submodules too, but they have no build inputs.
+    build = getattr(context, 'build', None)
+    if build is None:
+        return execute_cached()
+    with build.push_submodule(path):
+        return execute_cached()
+
+
 def load_toolchain(env, path, reload=False):
     builtin_init()
     tools_init()
@@ -91,13 +114,30 @@ def fill_user_help(env, parent):
 
 def configure_build(env):
     builtin_init()
-    parser, opts_paths = _execute_options(env)
-    argv = parser.parse_args(env.extra_args)
+
+    # Create all the builders we used last time up front so that their probes
+    # can run in parallel.
+    env.prefetch_builders(env.prefetch_langs)
+
+    with tracing.span('options', 'phase'):
+        parser, opts_paths = _execute_options(env)
+        argv = parser.parse_args(env.extra_args)
 
     bfgpath = Path(builtin.BuildContext.filename, Root.srcdir)
     build = BuildInputs(env, bfgpath)
     context = builtin.BuildContext(env, build, argv)
+    context.find_cache = FindCache(
+        env.builddir.append(FindCache.filename).string()
+    )
+    if env.submodule_cache:
+        context.submodule_cache = SubmoduleCache(
+            env.builddir.append(SubmoduleCache.filename).string(), env, argv
+        )
     execute_file(context, bfgpath, run_post=True)
+    env.prefetch_langs = env.builder_langs
+    context.find_cache.save()
+    if context.submodule_cache:
+        context.submodule_cache.save()
 
     # Add all the bfg files as bootstrap entries (except for the main
     # build.bfg, which is already included).
@@ -1,4 +1,5 @@
 from collections import OrderedDict
+from contextlib import contextmanager
 from itertools import chain
 
 from .path import Path, Root
@@ -20,8 +21,9 @@ def build_input(name):
 
 class Edge:
     def __init__(self, build, output, final_output=None, extra_deps=None,
-                 description=None):
+                 description=None, pool=None):
         self.description = description
+        self.pool = pool
         self.raw_output = output
         self.output = listify(output)
         for i in self.output:
@@ -47,9 +49,19 @@ class BuildInputs:
         self._sources = OrderedDict()
         self.bootstrap_paths = []
         self._edges = []
+        self._outputs = {}
         self._extra_targets = []
         self._extra_inputs = {}
 
+        # When set to a list, all the sources, edges, and targets added to the
+        # build are recorded here (see `SubmoduleCache`).
+        self._journal = None
+
+        # The submodule currently being executed, and the submodule that added
+        # each edge (if not the root build.bfg).
+        self._submodule = None
+        self._edge_submodules = {}
+
         self.bfgpath = bfgpath
         self.add_bootstrap(bfgpath)
 
@@ -62,14 +74,33 @@ class BuildInputs:
 
     def add_source(self, source):
         self._sources[source.path] = source
+        if self._journal is not None:
+            self._journal.append(('source', source))
         return source
 
+    @contextmanager
+    def push_submodule(self, path):
+        old = self._submodule
+        self._submodule = path
+        try:
+            yield
+        finally:
+            self._submodule = old
+
     def add_edge(self, edge):
         self._edges.append(edge)
+        if self._submodule is not None:
+            self._edge_submodules[edge] = self._submodule
+        for i in edge.output:
+            self._outputs[i.path] = i
+        if self._journal is not None:
+            self._journal.append(('edge', edge))
         return edge
 
     def add_target(self, target):
         self._extra_targets.append(target)
+        if self._journal is not None:
+            self._journal.append(('target', target))
         return target
 
     def sources(self):
@@ -85,6 +116,12 @@ class BuildInputs:
     def edges(self):
         return iter(self._edges)
 
+    def edge_submodule(self, edge):
+        return self._edge_submodules.get(edge)
+
+    def output(self, path):
+        return self._outputs[path]
+
     def __getitem__(self, key):
         return self._extra_inputs[key]
 
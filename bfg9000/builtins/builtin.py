@@ -3,6 +3,7 @@ import inspect
 from contextlib import contextmanager
 from itertools import chain
 
+from .. import tracing
 from ..iterutils import iterate, listify
 from ..platforms.basepath import BasePath
 
@@ -99,6 +100,8 @@ class BuildContext(StackContext):
     def __init__(self, env, build, argv):
         self.build = build
         self.argv = argv
+        self.find_cache = None
+        self.submodule_cache = None
         super().__init__(env)
 
 
@@ -144,7 +147,8 @@ class _PartialFunctionBinder(_Binder):
     def bind(self, context):
         @functools.wraps(self._fn)
         def wrapper(*args, **kwargs):
-            return self._fn(context, *args, **kwargs)
+            with tracing.span(self._fn.__name__, 'builtin'):
+                return self._fn(context, *args, **kwargs)
 
         sig = inspect.signature(wrapper)
         params = list(sig.parameters.values())[self.builtin_bound:]
@@ -1,15 +1,16 @@
 from itertools import chain, repeat
 
 from . import builtin
+from .pool import get_pool
 from .. import shell
 from ..backends.make import writer as make
 from ..backends.ninja import writer as ninja
 from ..build_inputs import Edge
 from ..file_types import File, Node, Phony
 from ..iterutils import isiterable, iterate, listify
-from ..objutils import convert_each
+from ..objutils import convert_each, convert_one
 from ..path import Path, Root
-from ..safe_str import jbos, safe_str, safe_string
+from ..safe_str import jbos, safe_str, safe_string, shell_literal
 from ..shell import posix as pshell
 
 
@@ -53,18 +54,22 @@ Output = Placeholder('output')
 
 
 class BaseCommand(Edge):
+    restat = False
+
     def __init__(self, context, name, outputs, cmds, files, environment=None,
-                 phony=False, extra_deps=None, description=None):
+                 phony=False, extra_deps=None, description=None, pool=None,
+                 dyndep=None):
         self.name = name
         self.files = files
         self.phony = phony
+        self.dyndep = dyndep
 
         implicit = [i for line in cmds for i in iterate(line)
                     if isinstance(i, Node) and (i.creator or not phony)]
         implicit.extend(iterate(extra_deps))
 
         super().__init__(context.build, outputs, extra_deps=implicit,
-                         description=description)
+                         description=description, pool=pool)
 
         # Do this after Edge.__init__ so that self.output is set for our
         # placeholders.
@@ -82,6 +87,8 @@ class BaseCommand(Edge):
         kwargs['cmds'] = [cmd] if cmds is None else cmds
 
         convert_each(kwargs, 'files', context['auto_file'])
+        convert_one(kwargs, 'pool', lambda x: get_pool(context.build, x))
+        convert_one(kwargs, 'dyndep', context['auto_file'])
         return kwargs
 
     def _expand_cmd(self, cmd):
@@ -117,7 +124,8 @@ class BuildStep(BaseCommand):
     msbuild_output = True
 
     def __init__(self, context , name, type=None, always_outdated=False,
-                 **kwargs):
+                 restat=False, **kwargs):
+        self.restat = restat
         name = listify(name)
         project_name = name[0]
 
@@ -154,17 +162,40 @@ build_step.input = Input
 build_step.output = Output
 
 
+def _command_line(rule, env, shell):
+    # Join all the commands onto one line so that users can use 'cd' and such.
+    line = shell.global_env(rule.env, rule.cmds)
+    if not rule.restat:
+        return line
+
+    # Run the commands in a subshell so that any 'cd's don't affect restoring
+    # the mtimes of the outputs afterwards.
+    restat = env.tool('restat')
+    state = rule.output[0].path.addext('.restat')
+    return shell.join_lines([
+        restat('save', state, rule.output),
+        [shell_literal('(')] + line + [shell_literal(')')],
+        restat('restore', state),
+    ])
+
+
 @make.rule_handler(Command, BuildStep)
 def make_command(rule, build_inputs, buildfile, env):
-    # Join all the commands onto one line so that users can use 'cd' and such.
+    # Make has no equivalent of dyndep files, so just make sure the file is
+    # built first.
+    order_only = listify(rule.dyndep)
+    if isinstance(rule, BuildStep):
+        order_only = make.directory_deps(buildfile, rule.output) + order_only
+
     make.multitarget_rule(
         buildfile,
         targets=rule.output,
         deps=rule.files + rule.extra_deps,
-        order_only=(make.directory_deps(rule.output) if
-                    isinstance(rule, BuildStep) else []),
-        recipe=[pshell.global_env(rule.env, rule.cmds)],
-        phony=rule.phony
+        order_only=order_only,
+        recipe=[_command_line(rule, env, pshell)],
+        phony=rule.phony,
+        private_variables=make.pool_variables(env, rule.pool),
+        restat=rule.restat
     )
 
 
@@ -175,10 +206,13 @@ def ninja_command(rule, build_inputs, buildfile, env):
         output=rule.output,
         inputs=rule.files,
         implicit=rule.extra_deps,
-        command=shell.global_env(rule.env, rule.cmds),
+        command=_command_line(rule, env, shell),
         console=rule.console,
         phony=rule.phony,
-        description=rule.description
+        description=rule.description,
+        pool=buildfile.pool(*rule.pool) if rule.pool else None,
+        restat=rule.restat,
+        dyndep=rule.dyndep
     )
 
 
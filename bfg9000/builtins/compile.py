@@ -3,6 +3,7 @@ from collections import defaultdict
 from . import builtin
 from .. import options as opts
 from .path import buildpath, relname, within_directory
+from .pool import get_pool
 from .file_types import FileList, static_file
 from ..backends.make import writer as make
 from ..backends.ninja import writer as ninja
@@ -20,7 +21,7 @@ class BaseCompile(Edge):
     desc_verb = 'compile'
 
     def __init__(self, context, name, internal_options, directory=None,
-                 extra_deps=None, description=None):
+                 extra_deps=None, description=None, pool=None):
         build = context.build
         if name is None:
             name = self.compiler.default_name(self.file, self)
@@ -42,7 +43,8 @@ class BaseCompile(Edge):
         public_output = compiler.post_output(context, options, output, self)
         primary.post_install = compiler.post_install(options, output, self)
 
-        super().__init__(build, output, public_output, extra_deps, description)
+        super().__init__(build, output, public_output, extra_deps, description,
+                         pool)
 
     @property
     def options(self):
@@ -55,13 +57,14 @@ class BaseCompile(Edge):
     @staticmethod
     def convert_args(context, kwargs):
         convert_one(kwargs, 'directory', lambda x: buildpath(context, x, True))
+        convert_one(kwargs, 'pool', lambda x: get_pool(context.build, x))
         return kwargs
 
 
 class Compile(BaseCompile):
     def __init__(self, context, name, includes, include_deps, pch, libs,
                  packages, options, lang=None, directory=None, extra_deps=None,
-                 description=None):
+                 description=None, pool=None):
         self.includes = includes
         self.include_deps = include_deps
         self.packages = packages
@@ -88,7 +91,7 @@ class Compile(BaseCompile):
             internal_options.append(opts.pch(self.pch))
 
         super().__init__(context, name, internal_options, directory,
-                         extra_deps, description)
+                         extra_deps, description, pool)
 
     @staticmethod
     def convert_args(context, lang, kwargs):
@@ -192,7 +195,8 @@ class GenerateSource(BaseCompile):
     desc_verb = 'generate'
 
     def __init__(self, context, name, file, options, lang=None,
-                 directory=None, extra_deps=None, description=None):
+                 directory=None, extra_deps=None, description=None,
+                 pool=None):
         builder_lang = lang or getattr(file, 'lang', None)
         if builder_lang is None:
             raise ValueError('unable to determine language for file {!r}'
@@ -202,7 +206,7 @@ class GenerateSource(BaseCompile):
         self.user_options = options
         self.compiler = context.env.builder(builder_lang).transpiler
         super().__init__(context, name, None, directory, extra_deps,
-                         description)
+                         description, pool)
 
     @classmethod
     def convert_args(cls, context, file, kwargs):
@@ -289,7 +293,11 @@ def _get_flags(backend, rule, build_inputs, buildfile):
         cmd_kwargs['flags'] = cflags
         flags = rule.flags(gopts)
         if flags:
-            variables[cflags] = [global_cflags] + flags
+            # Many files are usually compiled with the same flags, so share
+            # one variable for each distinct set of them.
+            variables[cflags] = buildfile.shared_variable(
+                cflags.name, [global_cflags] + flags
+            )
 
     return variables, cmd_kwargs
 
@@ -313,11 +321,17 @@ def make_compile(rule, build_inputs, buildfile, env):
     if not buildfile.has_variable(recipename):
         recipe_extra = []
 
-        # Only GCC-style depfiles are supported by Make.
+        # Only GCC-style depfiles are supported by Make. Every dependency in
+        # the depfile needs to be a target too, so that removing a header
+        # doesn't break the build. If the compiler can't do this itself, run
+        # the depfixer afterwards.
         if compiler.deps_flavor == 'gcc':
-            depfixer = env.tool('depfixer')
             cmd_kwargs['deps'] = deps = first(output_vars) + '.d'
-            recipe_extra = [make.Silent(depfixer(deps))]
+            if compiler.supports_phony_deps:
+                cmd_kwargs['phony_deps'] = True
+            else:
+                depfixer = env.tool('depfixer')
+                recipe_extra = [make.Silent(depfixer(deps))]
 
         buildfile.define(recipename, [compiler(
             make.qvar('<'), output_vars, **cmd_kwargs
@@ -343,9 +357,10 @@ def make_compile(rule, build_inputs, buildfile, env):
         buildfile,
         targets=rule.output,
         deps=deps + rule.extra_deps,
-        order_only=make.directory_deps(rule.output),
+        order_only=make.directory_deps(buildfile, rule.output),
         recipe=make.Call(recipename, *output_params),
-        variables=variables
+        variables=variables,
+        private_variables=make.pool_variables(env, rule.pool)
     )
 
 
@@ -355,6 +370,8 @@ def ninja_compile(rule, build_inputs, buildfile, env):
     variables, cmd_kwargs = _get_flags(ninja, rule, build_inputs, buildfile)
     if rule.description:
         variables['description'] = rule.description
+    if rule.pool:
+        variables['pool'] = buildfile.pool(*rule.pool)
 
     if compiler.num_outputs == 'all':
         output_vars = ninja.var('out')
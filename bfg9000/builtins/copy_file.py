@@ -79,7 +79,7 @@ def make_copy_file(rule, build_inputs, buildfile, env):
     buildfile.rule(
         target=rule.output,
         deps=[rule.file] + rule.extra_deps,
-        order_only=make.directory_deps(rule.output),
+        order_only=make.directory_deps(buildfile, rule.output),
         recipe=make.Call(recipename, *args)
     )
 
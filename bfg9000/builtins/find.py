@@ -1,21 +1,29 @@
-import fnmatch
+import json
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from enum import IntEnum
+from functools import partial
 
 from . import builtin
 from ..file_types import File
-from ..iterutils import iterate
+from ..iterutils import iterate, listify
 from ..backends.make import writer as make
 from ..backends.ninja import writer as ninja
 from ..backends.make.syntax import Writer, Syntax
 from ..build_inputs import build_input
-from ..path import exists, isdir, islink, Path, Root
+from ..path import exists, Path, Root, write_if_changed
 from ..platforms import known_platforms
 
 build_input('find_dirs')(lambda build_inputs, env: set())
+build_input('find_globs')(lambda build_inputs, env: [])
 depfile_name = '.bfg_find_deps'
+globs_name = '.bfg_find_globs'
+stamp_name = '.bfg_find_stamp'
+check_name = '.bfg_find_check'
+globs_version = 1
 exclude_globs = ['.*#', '*~', '#*#']
+walk_threads = min(8, (os.cpu_count() or 1) * 2)
 
 
 @builtin.default()
@@ -26,7 +34,7 @@ class FindResult(IntEnum):
 
 
 def write_depfile(env, path, output, seen_dirs, makeify=False):
-    with open(path.string(env.base_dirs), 'w') as f:
+    with write_if_changed(path.string(env.base_dirs)) as f:
         # Since this file is in the build dir, we can use relative dirs for
         # deps also in the build dir.
         roots = env.base_dirs.copy()
@@ -45,107 +53,365 @@ def write_depfile(env, path, output, seen_dirs, makeify=False):
                 out.write_literal(':\n')
 
 
-def _listdir(path, variables=None):
-    dirs, nondirs = [], []
+def _scandir(path):
+    # Use the file types reported by `scandir` so that (on most platforms) we
+    # don't need to stat each entry. This returns plain strings so that it's
+    # cheap to run in a worker thread.
+    dirs, nondirs, links = [], [], set()
     try:
-        names = os.listdir(path.string(variables))
-        for name in names:
-            curpath = path.append(name)
-            if isdir(curpath, variables):
-                dirs.append(curpath)
-            else:
-                nondirs.append(curpath)
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    dirs.append(entry.name)
+                    if entry.is_symlink():
+                        links.add(entry.name)
+                else:
+                    nondirs.append(entry.name)
     except OSError:
         pass
-    return dirs, nondirs
+    return dirs, nondirs, links
+
+
+def _to_paths(base, listing):
+    dirs, nondirs, links = listing
+    dirpaths = [base.append_name(i) for i in dirs]
+    return (dirpaths, [base.append_name(i) for i in nondirs],
+            [p for i, p in zip(dirs, dirpaths) if i not in links])
+
+
+def _listdir(path, variables=None, scandir=_scandir):
+    return _to_paths(path, scandir(path.string(variables)))[0:2]
 
 
-def _walk_flat(top, variables=None):
+def _walk_flat(top, variables=None, scandir=_scandir):
     if exists(top, variables):
-        yield (top,) + _listdir(top, variables)
+        yield (top,) + _listdir(top, variables, scandir)
 
 
-def _walk_recursive(top, variables=None):
+def _walk_recursive(top, variables=None, scandir=_scandir):
     if not exists(top, variables):
         return
-    dirs, nondirs = _listdir(top, variables)
-    yield top, dirs, nondirs
-    for d in dirs:
-        if not islink(d, variables):
-            for i in _walk_recursive(d, variables):
-                yield i
 
-
-def _make_filter_from_glob(match_type, matches, extra, exclude):
-    matches = [re.compile(fnmatch.translate(i)) for i in iterate(matches)]
-    extra = [re.compile(fnmatch.translate(i)) for i in iterate(extra)]
-    exclude = [re.compile(fnmatch.translate(i)) for i in iterate(exclude)]
-
-    def fn(path, type):
-        name = path.basename()
-        if match_type in {type, '*'}:
-            if any(ex.match(name) for ex in exclude):
+    # List each directory in a thread pool as soon as we find it so that we
+    # can read independent subtrees in parallel. We still yield the results
+    # in the same (depth-first) order as a simple recursive walk.
+    with ThreadPoolExecutor(max_workers=walk_threads) as pool:
+        def submit(path):
+            return path, pool.submit(scandir, path.string(variables))
+
+        stack = [submit(top)]
+        try:
+            while stack:
+                base, future = stack.pop()
+                dirs, nondirs, walk = _to_paths(base, future.result())
+                count = len(dirs)
+                yield base, dirs, nondirs
+
+                # Like `os.walk`, our caller can remove directories from
+                # `dirs` to avoid searching them.
+                if len(dirs) != count:
+                    keep = {id(i) for i in dirs}
+                    walk = [i for i in walk if id(i) in keep]
+                stack.extend(reversed([submit(d) for d in walk]))
+        finally:
+            # If our caller stopped early, don't bother listing the rest.
+            for _, future in stack:
+                future.cancel()
+
+
+def _translate_name(pattern):
+    # Like `fnmatch.translate`, but wildcards never match a `/`, so that we
+    # can use this on each component of a path-aware pattern.
+    i, n = 0, len(pattern)
+    result = ''
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == '*':
+            result += '[^/]*'
+        elif c == '?':
+            result += '[^/]'
+        elif c == '[':
+            j = i
+            if j < n and pattern[j] == '!':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 1
+            if j >= n:
+                result += '\\['
+            else:
+                chars = pattern[i:j].replace('\\', '\\\\')
+                i = j + 1
+                if chars[0] == '!':
+                    chars = '^' + chars[1:]
+                elif chars[0] == '^':
+                    chars = '\\' + chars
+                result += '[' + chars + ']'
+        else:
+            result += re.escape(c)
+    return result
+
+
+def _translate_path(pattern):
+    # `**` matches zero or more directories (or, at the end of the pattern,
+    # everything inside the preceding directory).
+    parts = pattern.strip('/').split('/')
+    result = ''
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+        if part == '**':
+            result += '.*' if last else '(?:[^/]+/)*'
+        else:
+            result += _translate_name(part) + ('' if last else '/')
+    return result
+
+
+def _translate_prefix(parts):
+    # Translate a path-aware pattern into a regex matching the directories
+    # that could contain something matching the whole pattern.
+    if parts[0] == '**':
+        return '.*'
+    if len(parts) < 2:
+        return None
+    result = _translate_name(parts[0])
+    sub = _translate_prefix(parts[1:])
+    if sub is not None:
+        result += '(?:/' + sub + ')?'
+    return result
+
+
+def _compile(patterns):
+    if not patterns:
+        return None
+    return re.compile('(?:' + '|'.join(patterns) + r')\Z', re.DOTALL)
+
+
+def _is_path_glob(pattern):
+    # `**` is only special as a whole path component, so a pattern like
+    # `**.cpp` is just a (redundant) wildcard on the file name, and `**` alone
+    # matches every name anyway.
+    return '/' in pattern
+
+
+class _Glob:
+    """A compiled set of glob patterns. Patterns without a `/` are matched
+    against the file name; others are matched against the path relative to
+    the directory being searched. Each kind of pattern is merged
+    into a single regex so that checking a path is one match per kind."""
+
+    def __init__(self, match_type, matches, extra, exclude):
+        matches = listify(matches)
+        exclude = ([i[1:] for i in matches if i.startswith('!')] +
+                   listify(exclude))
+        matches = [i for i in matches if not i.startswith('!')]
+        extra = listify(extra)
+
+        self.match_type = match_type
+        self._matches = self._compile_pair(matches)
+        self._extra = self._compile_pair(extra)
+        self._exclude = self._compile_pair(exclude)
+
+        # We can skip searching a directory if an exclusion like `dir/**`
+        # covers it...
+        self._exclude_tree = _compile([
+            _translate_path(i[:-3]) for i in exclude
+            if i.endswith('/**') and i[:-3].strip('/')
+        ])
+        # ... or if every other pattern is path-aware and none of them can
+        # match anything inside it.
+        self._descend = None
+        if not any(not _is_path_glob(i) for i in matches + extra):
+            self._descend = _compile([
+                i for i in (_translate_prefix(j.strip('/').split('/'))
+                            for j in matches + extra) if i is not None
+            ]) or False
+
+    @staticmethod
+    def _compile_pair(patterns):
+        return (_compile([_translate_name(i) for i in patterns
+                          if not _is_path_glob(i)]),
+                _compile([_translate_path(i) for i in patterns
+                          if _is_path_glob(i)]))
+
+    @staticmethod
+    def _check(pair, name, relpath):
+        by_name, by_path = pair
+        return bool((by_name and by_name.match(name)) or
+                    (by_path and by_path.match(relpath)))
+
+    def match(self, name, relpath, type):
+        if self.match_type in {type, '*'}:
+            if self._check(self._exclude, name, relpath):
                 return FindResult.exclude
-            if any(ex.match(name) for ex in matches):
+            if self._check(self._matches, name, relpath):
                 return FindResult.include
-            elif any(ex.match(name) for ex in extra):
+            elif self._check(self._extra, name, relpath):
                 return FindResult.not_now
         return FindResult.exclude
+
+    def prune(self, relpath):
+        if self._exclude_tree and self._exclude_tree.match(relpath):
+            return True
+        if self._descend is None:
+            return False
+        return not (self._descend and self._descend.match(relpath))
+
+    def __call__(self, path, type):
+        return self.match(path.basename(), path.suffix, type)
+
+
+def _make_platform_filter(genus, family):
+    my_plat = {genus, family}
+    sub = '|'.join(re.escape(i) for i in known_platforms if i not in my_plat)
+    ex = re.compile(r'(^|/|_)(' + sub + r')(\.[^\.]+$|$|/)')
+
+    def fn(path, type):
+        return (FindResult.not_now if ex.search(path.suffix)
+                else FindResult.include)
     return fn
 
 
 @builtin.function()
 def filter_by_platform(context, path, type):
-    env = context.env
-    my_plat = {env.target_platform.genus, env.target_platform.family}
+    platform = context.env.target_platform
+    return _make_platform_filter(platform.genus, platform.family)(path, type)
 
-    sub = '|'.join(re.escape(i) for i in known_platforms if i not in my_plat)
-    ex = r'(^|/|_)(' + sub + r')(\.[^\.]+$|$|/)'
-    return (FindResult.not_now if re.search(ex, path.suffix)
-            else FindResult.include)
 
+def _relpath_prefix(path):
+    if not path.suffix or path.suffix.endswith('/'):
+        return len(path.suffix)
+    return len(path.suffix) + 1
 
-def _combine_filters(*args):
-    return lambda path, type: max(f(path, type) for f in args)
 
-
-def _find_files(env, paths, filter, flat, seen_dirs=None):
+def _find_files(variables, paths, glob, flat, seen_dirs=None,
+                scandir=_scandir, filter=None):
     # "Does the walker choose the path, or the path the walker?" - Garth Nix
     walker = _walk_flat if flat else _walk_recursive
 
+    def match(path, relpath, type):
+        result = glob.match(relpath.rpartition('/')[2], relpath, type)
+        if filter and result != FindResult.exclude:
+            result = max(result, filter(path, type))
+        return result
+
     for p in paths:
-        yield p, 'd', filter(p, 'd')
+        result = glob.match(p.basename(), '', 'd')
+        if filter and result != FindResult.exclude:
+            result = max(result, filter(p, 'd'))
+        yield p, 'd', result
     for p in paths:
-        for base, dirs, files in walker(p, env.base_dirs):
+        start = _relpath_prefix(p)
+        for base, dirs, files in walker(p, variables, scandir):
             if seen_dirs is not None:
                 seen_dirs.append(base)
 
-            for p in dirs:
-                yield p, 'd', filter(p, 'd')
-            for p in files:
-                yield p, 'f', filter(p, 'f')
+            pruned = False
+            for i in dirs:
+                relpath = i.suffix[start:]
+                yield i, 'd', match(i, relpath, 'd')
+                if glob.prune(relpath):
+                    pruned = True
+            for i in files:
+                yield i, 'f', match(i, i.suffix[start:], 'f')
+
+            if pruned:
+                dirs[:] = [i for i in dirs if not glob.prune(i.suffix[start:])]
 
 
 def find(env, path='.', name='*', type='*', extra=None, exclude=exclude_globs,
          flat=False):
-    glob_filter = _make_filter_from_glob(type, name, extra, exclude)
+    glob = _Glob(type, name, extra, exclude)
     paths = [Path.ensure(i, Root.srcdir) for i in iterate(path)]
 
     results = []
-    for path, type, matched in _find_files(env, paths, glob_filter, flat):
+    for path, type, matched in _find_files(env.base_dirs, paths, glob, flat):
         if matched == FindResult.include:
             results.append(path)
     return results
 
 
+# Rather than regenerating the build files whenever anything changes in the
+# directories we searched, the build first runs `bfg9000-findcheck`, which
+# repeats each search and only updates a stamp file (which the build files
+# depend on) if the results differ. To do this, we record each search along
+# with its results. User-defined filters can't be run outside of bfg9000, so
+# for those, we record the results of the glob alone; if those are unchanged,
+# so are the final results.
+
+def _glob_spec(env, paths, name, type, extra, exclude, flat, filter):
+    platform = None
+    if getattr(filter, '__wrapped__', None) is filter_by_platform:
+        platform = [env.target_platform.genus, env.target_platform.family]
+
+    return {'paths': paths, 'name': listify(name), 'type': type,
+            'extra': listify(extra), 'exclude': listify(exclude), 'flat': flat,
+            'platform': platform, 'results': []}
+
+
+def _search_spec(spec, variables, seen_dirs=None):
+    glob = _Glob(spec['type'], spec['name'], spec['extra'], spec['exclude'])
+    filter = (_make_platform_filter(*spec['platform']) if spec['platform']
+              else None)
+    return [(path, type, matched) for path, type, matched in _find_files(
+        variables, spec['paths'], glob, spec['flat'], seen_dirs,
+        filter=filter
+    ) if matched != FindResult.exclude]
+
+
+def _results_to_json(results):
+    return sorted([list(path.to_json()), type, int(matched)]
+                  for path, type, matched in results)
+
+
+def globs_to_json(env, build_inputs):
+    return {
+        'version': globs_version,
+        'variables': {i.name: env.base_dirs[i].string() for i in
+                      (Root.srcdir, Root.builddir)},
+        'dirs': sorted(list(i.to_json()) for i in build_inputs['find_dirs']),
+        'globs': [{
+            'paths': [i.to_json() for i in spec['paths']],
+            'name': spec['name'],
+            'type': spec['type'],
+            'extra': spec['extra'],
+            'exclude': spec['exclude'],
+            'flat': spec['flat'],
+            'platform': spec['platform'],
+            'results': _results_to_json(spec['results']),
+        } for spec in build_inputs['find_globs']],
+    }
+
+
+def globs_changed(data):
+    """Return True if repeating the searches described by `data` (as
+    returned from `globs_to_json`) would produce different results."""
+
+    if data.get('version') != globs_version:
+        return True
+
+    variables = {Root[k]: v for k, v in data['variables'].items()}
+    seen_dirs = []
+    for glob in data['globs']:
+        spec = dict(glob, paths=[Path.from_json(i) for i in glob['paths']])
+        results = _search_spec(spec, variables, seen_dirs)
+        if _results_to_json(results) != glob['results']:
+            return True
+
+    seen_dirs = sorted(list(i) for i in set(i.to_json() for i in seen_dirs))
+    return seen_dirs != data['dirs']
+
+
 @builtin.function()
 def find_files(context, path='.', name='*', type='*', extra=None,
                exclude=exclude_globs, filter=None, flat=False, file_type=None,
                dir_type=None, *, dist=True, cache=True):
-    final_filter = _make_filter_from_glob(type, name, extra, exclude)
-    if filter:
-        final_filter = _combine_filters(final_filter, filter)
-
+    glob = _Glob(type, name, extra, exclude)
     types = {'f': file_type or context['auto_file'],
              'd': dir_type or context['directory']}
     extra_types = {'f': context['generic_file'], 'd': context['directory']}
@@ -153,17 +419,39 @@ def find_files(context, path='.', name='*', type='*', extra=None,
     paths = [i.path if isinstance(i, File) else context['relpath'](i)
              for i in iterate(path)]
 
+    scandir = _scandir
+    if cache and context.find_cache:
+        scandir = partial(context.find_cache.listdir, listdir=_scandir)
+
+    spec = None
+    if cache:
+        spec = _glob_spec(context.env, paths, name, type, extra, exclude, flat,
+                          filter)
+
     found, seen_dirs = [], []
-    for path, type, matched in _find_files(context.env, paths, final_filter,
-                                           flat, seen_dirs):
+    for path, type, checked in _find_files(context.env.base_dirs, paths, glob,
+                                           flat, seen_dirs, scandir):
+        matched = checked
+        if filter and checked != FindResult.exclude:
+            matched = max(checked, filter(path, type))
+
         if matched == FindResult.include:
             found.append(types[type](path, dist=dist))
         elif matched == FindResult.not_now and dist:
             extra_types[type](path, dist=dist)
 
+        if spec:
+            if spec['platform']:
+                checked = matched
+            if checked != FindResult.exclude:
+                spec['results'].append((path, type, checked))
+
     if cache:
         context.build['find_dirs'].update(seen_dirs)
-        context.build['regenerate'].depfile = depfile_name
+        context.build['find_globs'].append(spec)
+        deps = context.build['regenerate'].deps
+        if Path(stamp_name) not in deps:
+            deps.append(Path(stamp_name))
     return found
 
 
@@ -172,16 +460,55 @@ def find_paths(context, *args, **kwargs):
     return [i.path for i in context['find_files'](*args, **kwargs)]
 
 
+def write_globs(env, build_inputs):
+    with write_if_changed(Path(globs_name).string(env.base_dirs)) as f:
+        json.dump(globs_to_json(env, build_inputs), f)
+
+    # The stamp must exist (and be older than the build files) so that the
+    # build files aren't regenerated the first time we build.
+    stamp = Path(stamp_name).string(env.base_dirs)
+    if not os.path.exists(stamp):
+        open(stamp, 'w').close()
+
+
 @make.post_rule
 def make_find_dirs(build_inputs, buildfile, env):
     if build_inputs['find_dirs']:
-        write_depfile(env, Path(depfile_name), make.filepath,
+        findcheck = env.tool('findcheck')
+        write_globs(env, build_inputs)
+        write_depfile(env, Path(depfile_name), Path(check_name),
                       build_inputs['find_dirs'], makeify=True)
         buildfile.include(depfile_name)
 
+        # Make has no equivalent of Ninja's `restat`, so `findcheck` touches a
+        # separate file every time it runs. The stamp depends on this file and
+        # has an empty recipe; if `findcheck` didn't touch the stamp, it stays
+        # older than the Makefile and nothing is regenerated.
+        buildfile.rule(
+            target=Path(check_name),
+            recipe=[findcheck(Path(globs_name), Path(stamp_name),
+                              Path(check_name))]
+        )
+        buildfile.rule(target=Path(stamp_name), deps=[Path(check_name)],
+                       recipe=[])
+
 
 @ninja.post_rule
 def ninja_find_dirs(build_inputs, buildfile, env):
     if build_inputs['find_dirs']:
-        write_depfile(env, Path(depfile_name), ninja.filepath,
+        findcheck = env.tool('findcheck')
+        write_globs(env, build_inputs)
+        write_depfile(env, Path(depfile_name), Path(stamp_name),
                       build_inputs['find_dirs'])
+
+        buildfile.rule(
+            name='findcheck',
+            command=findcheck(Path(globs_name), Path(stamp_name)),
+            depfile=depfile_name,
+            restat=True
+        )
+        buildfile.build(
+            output=Path(stamp_name),
+            rule='findcheck',
+            implicit=[Path(globs_name)]
+        )
@@ -7,6 +7,7 @@ from . import builtin
 from .. import options as opts
 from .file_types import static_file
 from .path import relname
+from .pool import get_pool, link_pool
 from ..backends.make import writer as make
 from ..backends.ninja import writer as ninja
 from ..build_inputs import build_input, Edge
@@ -28,7 +29,7 @@ class Link(Edge):
     extra_kwargs = ()
 
     def __init__(self, context, name, files, libs, packages, link_options,
-                 lang=None, extra_deps=None, description=None):
+                 lang=None, extra_deps=None, description=None, pool=None):
         build = context.build
         name = relname(context, name)
         self.name = self.__name(name)
@@ -90,7 +91,10 @@ class Link(Edge):
         public_output = self.linker.post_output(context, options, output, self)
         primary.post_install = self.linker.post_install(options, output, self)
 
-        super().__init__(build, output, public_output, extra_deps, description)
+        if pool is None:
+            pool = link_pool(build)
+        super().__init__(build, output, public_output, extra_deps, description,
+                         pool)
 
         build['defaults'].add(primary)
 
@@ -101,6 +105,7 @@ class Link(Edge):
         convert_each(kwargs, 'libs', context['library'],
                      kind=cls._preferred_lib, lang=lang)
         convert_each(kwargs, 'packages', context['package'], lang=lang)
+        convert_one(kwargs, 'pool', lambda x: get_pool(context.build, x))
 
         kwargs['link_options'] = pshell.listify(kwargs.get('link_options'),
                                                 type=opts.option_list)
@@ -441,6 +446,29 @@ def _get_flags(backend, rule, build_inputs, buildfile):
     return variables, cmd_kwargs
 
 
+def _use_response_file(rule, env):
+    # Pass the inputs via a response file if they'd make the command line too
+    # long. This is just an estimate, since the build file may spell each path
+    # a bit differently.
+    threshold = env.response_file_threshold
+    return (threshold > 0 and rule.linker.supports_response_file and
+            sum(len(i.path.suffix) + 1 for i in rule.files) > threshold)
+
+
+def _toc_path(library, env):
+    # With Ninja, we write a table of contents (see bfg9000/toc.py) for each
+    # ELF shared library we build. Anything linking to the library depends on
+    # the TOC instead, so it's only relinked if the library's interface
+    # changed.
+    while isinstance(library, LinkLibrary):
+        library = library.library
+    if ( env.target_platform.object_format == 'elf' and
+         isinstance(library, SharedLibrary) and
+         isinstance(getattr(library, 'creator', None), SharedLink) ):
+        return library.path.addext('.TOC')
+    return None
+
+
 @make.rule_handler(StaticLink, DynamicLink, SharedLink)
 def make_link(rule, build_inputs, buildfile, env):
     linker = rule.linker
@@ -466,6 +494,11 @@ def make_link(rule, build_inputs, buildfile, env):
     if hasattr(linker, 'transform_input'):
         files = linker.transform_input(files)
 
+    rspfile = []
+    if _use_response_file(rule, env):
+        rspfile = [make.response_file(buildfile, rule.output[0], files)]
+        files = '@' + rspfile[0]
+
     package_build_deps = flatten(i.deps for i in rule.packages)
     module_defs = listify(getattr(rule, 'module_defs', None))
     manifest = listify(getattr(rule, 'manifest', None))
@@ -473,10 +506,11 @@ def make_link(rule, build_inputs, buildfile, env):
         buildfile,
         targets=rule.output,
         deps=(rule.files + rule.libs + package_build_deps + module_defs +
-              manifest + rule.extra_deps),
-        order_only=make.directory_deps(rule.output),
+              manifest + rule.extra_deps + rspfile),
+        order_only=make.directory_deps(buildfile, rule.output),
         recipe=make.Call(recipename, files, *output_params),
-        variables=variables
+        variables=variables,
+        private_variables=make.pool_variables(env, rule.pool)
     )
 
 
@@ -486,6 +520,8 @@ def ninja_link(rule, build_inputs, buildfile, env):
     variables, cmd_kwargs = _get_flags(ninja, rule, build_inputs, buildfile)
     if rule.description:
         variables['description'] = rule.description
+    if rule.pool:
+        variables['pool'] = buildfile.pool(*rule.pool)
 
     if linker.num_outputs == 'all':
         output_vars = ninja.var('out')
@@ -505,23 +541,54 @@ def ninja_link(rule, build_inputs, buildfile, env):
     else:
         input_var = ninja.var('in')
 
-    if not buildfile.has_rule(linker.rule_name):
-        buildfile.rule(name=linker.rule_name, command=linker(
-            input_var, output_vars, **cmd_kwargs
-        ), description=rule.desc_verb + ' => ' + first(output_vars))
+    rule_name = linker.rule_name
+    rule_kwargs = {}
+    if _use_response_file(rule, env):
+        rule_name += '_rsp'
+        rule_kwargs = {'rspfile': first(output_vars) + '.rsp',
+                       'rspfile_content': input_var}
+        input_var = '@' + ninja.var('rspfile')
+
+    if not buildfile.has_rule(rule_name):
+        buildfile.rule(
+            name=rule_name,
+            command=linker(input_var, output_vars, **cmd_kwargs),
+            description=rule.desc_verb + ' => ' + first(output_vars),
+            **rule_kwargs
+        )
+
+    # Depend on the TOCs of any libraries we build instead of the libraries
+    # themselves. We still need the libraries to exist before linking, though.
+    libs, lib_order_only = [], []
+    for i in rule.libs:
+        toc = _toc_path(i, env)
+        if toc:
+            libs.append(toc)
+            lib_order_only.append(i)
+        else:
+            libs.append(i)
 
     package_build_deps = flatten(i.deps for i in rule.packages)
     module_defs = listify(getattr(rule, 'module_defs', None))
     manifest = listify(getattr(rule, 'manifest', None))
     buildfile.build(
         output=rule.output,
-        rule=linker.rule_name,
+        rule=rule_name,
         inputs=rule.files,
-        implicit=(rule.libs + package_build_deps + module_defs + manifest +
+        implicit=(libs + package_build_deps + module_defs + manifest +
                   rule.extra_deps),
+        order_only=lib_order_only,
         variables=variables
     )
 
+    toc = _toc_path(first(rule.output), env)
+    if toc:
+        if not buildfile.has_rule('toc'):
+            buildfile.rule(name='toc', command=env.tool('toc')(
+                ninja.var('out'), env.tool('readelf')(ninja.var('in'))
+            ), description='toc => ' + ninja.var('out'), restat=True)
+        buildfile.build(output=toc, rule='toc', inputs=first(rule.output))
+
 
 try:
     from .compile import CompileHeader
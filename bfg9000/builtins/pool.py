@@ -0,0 +1,50 @@
+import re
+from collections import namedtuple, OrderedDict
+
+from . import builtin
+from ..build_inputs import build_input
+
+Pool = namedtuple('Pool', ['name', 'depth'])
+
+build_input('pools')(lambda build_inputs, env: OrderedDict())
+
+_name_re = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+
+def add_pool(build, name, depth):
+    if not isinstance(name, str) or not _name_re.match(name):
+        raise ValueError('invalid pool name {!r}'.format(name))
+    if name == 'console':
+        raise ValueError("'console' is a reserved pool name")
+    if not isinstance(depth, int) or isinstance(depth, bool):
+        raise TypeError('pool depth must be an integer')
+    if depth < 1:
+        raise ValueError('pool depth must be at least 1')
+
+    pool = Pool(name, depth)
+    existing = build['pools'].setdefault(name, pool)
+    if existing != pool:
+        raise ValueError('pool {!r} already defined with depth {}'
+                         .format(name, existing.depth))
+    return pool
+
+
+def get_pool(build, pool):
+    if pool is None or isinstance(pool, Pool):
+        return pool
+    try:
+        return build['pools'][pool]
+    except KeyError:
+        raise ValueError('unknown pool {!r}'.format(pool))
+
+
+def link_pool(build):
+    depth = build['project']['link_pool_depth']
+    if depth is None:
+        return None
+    return add_pool(build, 'link', depth)
+
+
+@builtin.function()
+def pool(context, name, depth):
+    return add_pool(context.build, name, depth)
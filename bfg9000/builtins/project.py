@@ -11,6 +11,7 @@ class ProjectInfo:
         self._options = {
             'intermediate_dirs': True,
             'lang': 'c',
+            'link_pool_depth': None,
         }
 
     def __getitem__(self, key):
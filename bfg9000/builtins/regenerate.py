@@ -1,3 +1,5 @@
+import os
+
 from ..backends.make import writer as make
 from ..backends.ninja import writer as ninja
 from ..build_inputs import build_input
@@ -9,18 +11,28 @@ from ..path import Path
 class Regenerate:
     def __init__(self, build_inputs, env):
         self.outputs = []
-        self.depfile = None
+        self.deps = []
 
 
 @make.post_rule
 def make_regenerate_rule(build_inputs, buildfile, env):
     bfg9000 = env.tool('bfg9000')
+    targets = [Path('Makefile')] + build_inputs['regenerate'].outputs
+
+    # `refresh --if-changed` leaves the Makefile alone when nothing changed, so
+    # treat this like Ninja's `restat`. The stamp must exist (and be newer than
+    # our dependencies) so that the first build doesn't regenerate anything.
+    stamp = make.stamp_path(targets[0]).string(env.base_dirs)
+    if not os.path.exists(stamp):
+        open(stamp, 'w').close()
 
     make.multitarget_rule(
         buildfile,
-        targets=[Path('Makefile')] + build_inputs['regenerate'].outputs,
-        deps=build_inputs.bootstrap_paths + listify(env.toolchain.path),
-        recipe=[bfg9000(Path('.'))]
+        targets=targets,
+        deps=(build_inputs.bootstrap_paths + listify(env.toolchain.path) +
+              build_inputs['regenerate'].deps),
+        recipe=[bfg9000(Path('.'), if_changed=True)],
+        restat=True
     )
 
 
@@ -33,13 +45,14 @@ def ninja_regenerate_rule(build_inputs, buildfile, env):
         rule_kwargs['pool'] = 'console'
     buildfile.rule(
         name='regenerate',
-        command=bfg9000(Path('.')),
+        command=bfg9000(Path('.'), if_changed=True),
         generator=True,
-        depfile=build_inputs['regenerate'].depfile,
+        restat=True,
         **rule_kwargs
     )
     buildfile.build(
         output=[Path('build.ninja')] + build_inputs['regenerate'].outputs,
         rule='regenerate',
-        implicit=build_inputs.bootstrap_paths + listify(env.toolchain.path)
+        implicit=(build_inputs.bootstrap_paths + listify(env.toolchain.path) +
+                  build_inputs['regenerate'].deps)
     )
@@ -1,6 +1,7 @@
+import re
 import sys
-
 from enum import Enum
+from io import BytesIO
 
 from .app_version import version
 from .arguments import parser as argparse
@@ -10,9 +11,11 @@ from .arguments import parser as argparse
 # don't get an error if a dep is removed. For a more-detailed discussion of why
 # this is necessary, see <http://scottmcpeak.com/autodepend/autodepend.html>.
 
-Token = Enum('Token', ['char', 'colon', 'space', 'newline'])
+Token = Enum('Token', ['word', 'colon', 'space', 'newline'])
 State = Enum('State', ['target', 'between_targets', 'dep', 'between_deps'])
 
+chunk_size = 65536
+
 
 class ParseError(ValueError):
     pass
@@ -23,97 +26,140 @@ class UnexpectedTokenError(ParseError):
         super().__init__("unexpected token '{}'".format(tok))
 
 
-def tokenize(s):
+class _Syntax:
     # The depfile syntax is a bit weird, since it seems no one quite
     # understands the correct ways to escape characters for Make in all cases
     # (made worse by the fact that even GNU Make's behavior varies across
     # versions). For our purposes though, we only need to recognize when
     # unescaped colons (always followed by whitespace in the depfile
-    # generators) and unescaped spaces are emitted.
+    # generators) and unescaped spaces are emitted. Backslashes escape the
+    # next character (which is kept as-is), except for newlines, which are
+    # swallowed. A colon followed by another colon is just part of a word.
+    #
+    # Escaped newlines after a space are folded into the space, since that's
+    # where compilers put them; this saves us from handling an extra (empty)
+    # word for each line.
+    _token = (r'(?P<space>[ \t]+(?:\\\n[ \t]*)*)|(?P<newline>\n)|'
+              r'(?P<colon>:(?=[ \t\n]|\Z))|'
+              r'(?P<word>(?:[^ \t\n:\\]|::|:(?=[^ \t\n])|\\[^\n]|\\\n|\\\Z)+)')
+
+    def __init__(self, convert):
+        self.token = re.compile(convert(self._token))
+        self.continuation = convert('\\\n')
+        self.newline = convert('\n')
+        self.backslash = convert('\\')
+        self.empty = convert('')
+        self.dep_end = convert(':\n')
+
+
+_syntaxes = {
+    str: _Syntax(lambda s: s),
+    bytes: _Syntax(lambda s: s.encode('latin-1')),
+}
+
+
+def _safe_end(syntax, buf):
+    # Find the end of the last complete line in `buf`, i.e. the last newline
+    # that isn't escaped. Every token before this point is unaffected by
+    # whatever comes after it.
+    end = buf.rfind(syntax.newline)
+    while end != -1:
+        start = end
+        while start and buf[start - 1:start] == syntax.backslash:
+            start -= 1
+        if (end - start) % 2 == 0:
+            return end + 1
+        end = buf.rfind(syntax.newline, 0, start)
+    return 0
+
+
+def _emit_chunk(syntax, chunk, state):
+    output = []
+    for match in syntax.token.finditer(chunk):
+        kind = match.lastgroup
+        if kind == 'word':
+            word = match.group().replace(syntax.continuation, syntax.empty)
+            if not word:
+                continue
+            if state == State.between_targets:
+                state = State.target
+            elif state in (State.dep, State.between_deps):
+                state = State.dep
+                output.append(word)
+        elif kind == 'space':
+            if state == State.target:
+                state = State.between_targets
+            elif state == State.dep:
+                output.append(syntax.dep_end)
+                state = State.between_deps
+        elif kind == 'newline':
+            if state in (State.target, State.between_targets):
+                raise UnexpectedTokenError(Token.newline)
+            elif state == State.dep:
+                output.append(syntax.dep_end)
+            state = State.target
+        else:  # kind == 'colon'
+            if state in (State.dep, State.between_deps):
+                raise UnexpectedTokenError(Token.colon)
+            state = State.between_deps
 
-    s = iter(s)
-    while True:
-        c = next(s, None)
-        if c is None:
-            return
-
-        if c == ':':
-            c = next(s, None)
-            if c is None or c in ' \t\n':
-                yield (Token.colon, None)
-                if c is None:
-                    return
-            else:
-                yield (Token.char, ':')
-
-        if c == '\\':
-            c = next(s, None)
-            if c != '\n':  # Swallow escaped newlines.
-                yield (Token.char, '\\')
-                if c is None:
-                    return
-                yield (Token.char, c)
-        elif c in ' \t':
-            yield (Token.space, None)
-        elif c == '\n':
-            yield (Token.newline, None)
-        else:
-            yield (Token.char, c)
+    return syntax.empty.join(output), state
 
 
 def emit_deps(instream, outstream):
     state = State.target
+    syntax = None
+    buf = None
 
-    for tok, value in tokenize(instream.read()):
-        if state == State.target:
-            if tok == Token.space:
-                state = State.between_targets
-            elif tok == Token.colon:
-                state = State.between_deps
-            elif tok != Token.char:
-                raise UnexpectedTokenError(tok)
-        elif state == State.between_targets:
-            if tok == Token.char:
-                state = State.target
-            elif tok == Token.colon:
-                state = State.between_deps
-            elif tok != Token.space:
-                raise UnexpectedTokenError(tok)
-        elif state == State.dep:
-            if tok == Token.char:
-                outstream.write(value)
-            elif tok == Token.space:
-                outstream.write(':\n')
-                state = State.between_deps
-            elif tok == Token.newline:
-                outstream.write(':\n')
-                state = State.target
-            else:
-                raise UnexpectedTokenError(tok)
-        else:  # state == State.between_deps
-            if tok == Token.char:
-                state = State.dep
-                outstream.write(value)
-            elif tok == Token.newline:
-                state = State.target
-            elif tok != Token.space:
-                raise UnexpectedTokenError(tok)
+    while True:
+        data = instream.read(chunk_size)
+        if syntax is None:
+            syntax = _syntaxes[type(data)]
+            buf = syntax.empty
+        buf += data
+
+        # Only parse complete lines until we hit the end of the file.
+        end = _safe_end(syntax, buf) if data else len(buf)
+        if end:
+            output, state = _emit_chunk(syntax, buf[:end], state)
+            outstream.write(output)
+            buf = buf[end:]
+        if not data:
+            break
 
     if state != State.target:
         raise ParseError('unexpected end of file')
 
 
+def fix_depfile(path):
+    # Read the whole depfile before appending to it so that we don't parse
+    # our own output.
+    output = BytesIO()
+    with open(path, 'rb') as f:
+        emit_deps(f, output)
+    with open(path, 'ab') as f:
+        f.write(output.getvalue())
+
+
 def main():
     parser = argparse.ArgumentParser(
         prog='bfg9000-depfixer',
         description='Read in a depfile (in Makefile syntax) on stdin and ' +
-                    'output all the dependencies as targets on stdout.'
+                    'output all the dependencies as targets on stdout. If ' +
+                    'any DEPFILEs are specified, append these targets to ' +
+                    'each of them instead.'
     )
     parser.add_argument('--version', action='version',
                         version='%(prog)s ' + version)
-    parser.parse_args()
+    parser.add_argument('depfiles', nargs='*', metavar='DEPFILE',
+                        help='depfiles to fix in place')
+    args = parser.parse_args()
 
     try:
-        emit_deps(sys.stdin, sys.stdout)
+        if args.depfiles:
+            for i in args.depfiles:
+                fix_depfile(i)
+        else:
+            emit_deps(sys.stdin.buffer, sys.stdout.buffer)
     except Exception as e:
         parser.error(e)
@@ -1,12 +1,17 @@
+import functools
 import os
 import sys
 
 from . import build
 from . import log
 from . import path
+from . import tracing
 from .arguments import parser as argparse
-from .backends import list_backends
+from .backends import default_backend, get_backend, list_backends
 from .environment import Environment, EnvVersionError
+from .file_types import File
+from .fingerprint import Fingerprint
+from .iterutils import listify
 from .platforms.target import platform_info
 from .app_version import version
 
@@ -60,10 +65,11 @@ def environment_from_args(args):
     # Get the bin directory holding bfg's executables.
     bfgdir = path.abspath(sys.argv[0]).parent()
 
-    backend = list_backends()[args.backend]
+    backend_name = args.backend or default_backend()
+    backend = get_backend(backend_name)
     env = Environment(
         bfgdir=bfgdir,
-        backend=args.backend,
+        backend=backend_name,
         backend_version=backend.version(),
         srcdir=args.srcdir,
         builddir=args.builddir,
@@ -80,6 +86,43 @@ def finalize_environment(env, args, extra_args=None):
     )
 
 
+def save_fingerprint(env, backend, build_inputs):
+    # Backends without a `filepath` (i.e. MSBuild) never regenerate
+    # themselves, so there's no need to fingerprint them.
+    if not hasattr(backend, 'filepath'):
+        return
+
+    files = (build_inputs.bootstrap_paths + listify(env.toolchain.path) +
+             [path.Path(build.optsfile, path.Root.srcdir),
+              path.Path(Environment.envfile)])
+    outputs = [backend.filepath] + [
+        i.path if isinstance(i, File) else i
+        for i in build_inputs['regenerate'].outputs
+    ]
+
+    Fingerprint(
+        files=[i.string(env.base_dirs) for i in files],
+        dirs=[i.string(env.base_dirs) for i in build_inputs['find_dirs']],
+        outputs=[i.string(env.base_dirs) for i in outputs]
+    ).save(env.builddir.string())
+
+
+def profiled(fn):
+    @functools.wraps(fn)
+    def wrapper(parser, subparser, args, extra):
+        if not args.profile:
+            return fn(parser, subparser, args, extra)
+
+        tracing.enable()
+        try:
+            with tracing.span(fn.__name__, 'phase'):
+                return fn(parser, subparser, args, extra)
+        finally:
+            tracing.save(args.profile)
+
+    return wrapper
+
+
 def directory_pair(srcname, buildname):
     class DirectoryPair(argparse.Action):
         def __call__(self, parser, namespace, values, option_string=None):
@@ -132,18 +175,39 @@ def add_generic_args(parser):
                         help='only emit a given warning once')
 
 
-def add_configure_args(parser):
-    backends = list_backends()
+def add_profile_arg(parser):
+    parser.add_argument('--profile', metavar='FILE',
+                        help=('write a Chrome trace of where time was spent ' +
+                              'to FILE'))
+
+
+class _BackendChoices:
+    # Listing every backend means scanning all the installed packages'
+    # metadata, which we'd rather not do just to build the argument parser.
+    # Instead, only check the backend that was actually requested, and only
+    # list them all when showing help or an error.
+    def __contains__(self, name):
+        try:
+            get_backend(name)
+            return True
+        # An ImportError is thrown if a backend's optional dependencies (e.g.
+        # lxml for the MSBuild backend) aren't installed.
+        except (KeyError, ImportError):
+            return False
 
+    def __iter__(self):
+        return iter(list_backends())
+
+
+def add_configure_args(parser):
     parser.add_argument('-h', '--help', action=ConfigureHelp,
                         help='show this help message and exit')
 
     build = parser.add_argument_group('build arguments')
     build.add_argument('--backend', metavar='BACKEND',
-                       choices=list(backends.keys()),
-                       default=list(backends.keys())[0],
+                       choices=_BackendChoices(),
                        help=('build backend (one of %(choices)s; default: ' +
-                             '%(default)s)'))
+                             'the first one installed)'))
     build.add_argument('--toolchain', metavar='FILE',
                        type=argparse.File(must_exist=True),
                        help=('a file defining the toolchain to use for this ' +
@@ -152,6 +216,27 @@ def add_configure_args(parser):
                        help='build shared libraries (default: enabled)')
     build.add_argument('--static', action='enable', default=False,
                        help='build static libraries (default: disabled)')
+    build.add_argument('--no-probe-cache', action='store_false',
+                       dest='probe_cache',
+                       help=('always re-run toolchain probes instead of ' +
+                             'using cached results'))
+    build.add_argument('--cache-submodules', action='store_true',
+                       dest='submodule_cache',
+                       help=('replay the results of unchanged submodules ' +
+                             'instead of re-executing them when regenerating'))
+    build.add_argument('--split-build-files', action='store_true',
+                       help=('write a separate build file for each ' +
+                             'submodule (Ninja only)'))
+    build.add_argument('--fast-makefile', action='store_true',
+                       help=('disable built-in rules and create output ' +
+                             'directories when configuring (Make only)'))
+    build.add_argument('--response-file-threshold', metavar='N', type=int,
+                       default=8000,
+                       help=('pass link inputs via a response file when ' +
+                             'they would take more than N characters on ' +
+                             'the command line; 0 to disable (default: ' +
+                             '%(default)s)'))
+    add_profile_arg(build)
 
     common_path_help = 'installation path for {} (default: {{}})'
     path_help = {
@@ -172,6 +257,7 @@ def add_configure_args(parser):
                              help=help)
 
 
+@profiled
 def configure(parser, subparser, args, extra):
     if ( path.exists(args.builddir) and
          path.samefile(args.srcdir, args.builddir) ):
@@ -190,15 +276,30 @@ def configure(parser, subparser, args, extra):
         if args.toolchain:
             build.load_toolchain(env, args.toolchain)
         finalize_environment(env, args, extra)
+        env.init_probe_cache(args.probe_cache)
+        env.submodule_cache = args.submodule_cache
+        env.split_build_files = args.split_build_files
+        env.fast_makefile = args.fast_makefile
+        env.response_file_threshold = args.response_file_threshold
         env.save(args.builddir.string())
 
-        build_inputs = build.configure_build(env)
-        backend.write(env, build_inputs)
+        with tracing.span('configure_build', 'phase'):
+            build_inputs = build.configure_build(env)
+        with tracing.span('write', 'phase'):
+            backend.write(env, build_inputs)
+
+        # Save the environment again to record what we learned while
+        # configuring the build (e.g. the builders that were used).
+        env.save(args.builddir.string())
+        save_fingerprint(env, backend, build_inputs)
+        if env.probe_cache:
+            env.probe_cache.save()
     except Exception as e:
         logger.exception(e)
         return e.code if isinstance(e, build.ScriptExitError) else 1
 
 
+@profiled
 def refresh(parser, subparser, args, extra):
     if extra:
         subparser.error('unrecognized arguments: {}'.format(' '.join(extra)))
@@ -207,15 +308,27 @@ def refresh(parser, subparser, args, extra):
         subparser.error('build directory must not contain a {} file'
                         .format(build.bfgfile))
 
+    if args.if_changed and Fingerprint.is_current(args.builddir.string()):
+        return
+
     try:
         env = Environment.load(args.builddir.string())
         if env.toolchain.path:
             build.load_toolchain(env, env.toolchain.path, reload=True)
         env.save(args.builddir.string())
 
-        backend = list_backends()[env.backend]
-        build_inputs = build.configure_build(env)
-        backend.write(env, build_inputs)
+        backend = get_backend(env.backend)
+        with tracing.span('configure_build', 'phase'):
+            build_inputs = build.configure_build(env)
+        with tracing.span('write', 'phase'):
+            backend.write(env, build_inputs)
+
+        # Save the environment again to record what we learned while
+        # configuring the build (e.g. the builders that were used).
+        env.save(args.builddir.string())
+        save_fingerprint(env, backend, build_inputs)
+        if env.probe_cache:
+            env.probe_cache.save()
     except Exception as e:
         return handle_reload_exception(e, suggest_rerun=True)
 
@@ -284,6 +397,10 @@ def main():
         'refresh', description=refresh_desc, help='regenerate build files'
     )
     refresh_p.set_defaults(func=refresh, parser=refresh_p)
+    refresh_p.add_argument('--if-changed', action='store_true',
+                           help=('only regenerate if the contents of the ' +
+                                 'build\'s inputs have changed'))
+    add_profile_arg(refresh_p)
     refresh_p.add_argument('builddir',
                            type=argparse.Directory(must_exist=True),
                            metavar='BUILDDIR', nargs='?', default='.',
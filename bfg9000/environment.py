@@ -1,15 +1,20 @@
 import json
 import os
 import platform
+import threading
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
+from . import log
 from . import platforms
 from . import tools
 from . import shell
-from .backends import list_backends
+from . import tracing
+from .backends import get_backend
 from .file_types import Executable, Node
 from .iterutils import first, isiterable, listify
 from .path import InstallRoot, Path, Root
+from .probe_cache import ProbeCache
 from .tools.common import Command
 from .versioning import Version
 
@@ -53,7 +58,7 @@ class Toolchain:
 
 
 class Environment:
-    version = 14
+    version = 20
     envfile = '.bfg_environ'
 
     Mode = shell.Mode
@@ -62,7 +67,10 @@ class Environment:
         env = object.__new__(cls)
         tools.init()
         env.__builders = {}
+        env.__builder_locks = {}
+        env.__builder_locks_lock = threading.Lock()
         env.__tools = {}
+        env.probe_cache = None
         return env
 
     def __init__(self, bfgdir, backend, backend_version, srcdir, builddir):
@@ -77,6 +85,11 @@ class Environment:
         self.builddir = builddir
         self.install_dirs = {}
         self.toolchain = Toolchain()
+        self.prefetch_langs = []
+        self.submodule_cache = False
+        self.split_build_files = False
+        self.fast_makefile = False
+        self.response_file_threshold = 8000
 
         self.initial_variables = dict(os.environ)
         self.init_variables()
@@ -101,6 +114,14 @@ class Environment:
     def init_variables(self):
         self.variables = EnvVarDict(self.initial_variables)
 
+    def init_probe_cache(self, enable=True):
+        if enable:
+            path = (self.getvar('BFG9000_PROBE_CACHE') or
+                    self.builddir.append(ProbeCache.filename).string())
+            self.probe_cache = ProbeCache(path)
+        else:
+            self.probe_cache = None
+
     @property
     def is_cross(self):
         return self.host_platform != self.target_platform
@@ -117,16 +138,53 @@ class Environment:
     def getvar(self, key, default=None):
         return self.variables.get(key, default)
 
+    def __builder_lock(self, lang):
+        with self.__builder_locks_lock:
+            return self.__builder_locks.setdefault(lang, threading.RLock())
+
     def builder(self, lang):
-        if lang not in self.__builders:
-            self.__builders[lang] = tools.get_builder(self, lang)
+        # Builders can be requested from several threads at once (see
+        # `prefetch_builders`), so make sure we only create each one once.
+        with self.__builder_lock(lang):
+            if lang not in self.__builders:
+                with tracing.span(lang, 'builder'):
+                    self.__builders[lang] = tools.get_builder(self, lang)
         return self.__builders[lang]
 
+    @property
+    def builder_langs(self):
+        return list(self.__builders.keys())
+
+    def prefetch_builders(self, langs):
+        # Most builders spend nearly all their construction time waiting on
+        # probe subprocesses, so create them in parallel. Any errors are only
+        # logged here; they'll be raised again when the builder is actually
+        # requested.
+        langs = [i for i in langs if i not in self.__builders]
+        if not langs:
+            return
+
+        def make_builder(lang):
+            try:
+                self.builder(lang)
+            except Exception as e:
+                log.debug('unable to prefetch builder for {!r}: {}'
+                          .format(lang, e), show_stack=False)
+
+        with ThreadPoolExecutor(max_workers=len(langs)) as executor:
+            for lang in langs:
+                executor.submit(make_builder, lang)
+
     def tool(self, name):
         if name not in self.__tools:
-            self.__tools[name] = tools.get_tool(self, name)
+            with tracing.span(name, 'tool'):
+                self.__tools[name] = tools.get_tool(self, name)
         return self.__tools[name]
 
+    @property
+    def tool_names(self):
+        return list(self.__tools.keys())
+
     def _runner(self, lang):
         try:
             return self.builder(lang).runner
@@ -158,49 +216,74 @@ class Environment:
                             .format(lang))
         return args
 
-    def execute(self, args, *, env=None, extra_env=None, **kwargs):
+    def _execute_env(self, env, extra_env):
         if env is None:
             env = self.variables
         if extra_env:
             env = env.copy()
             env.update(extra_env)
+        return env
 
+    def execute(self, args, *, env=None, extra_env=None, **kwargs):
+        env = self._execute_env(env, extra_env)
         if not kwargs.get('shell', False):
             args = Command.convert_args(args, lambda x: x.command)
 
         return shell.execute(args, env=env, base_dirs=self.base_dirs,
                              **kwargs)
 
+    def probe(self, args, *, env=None, extra_env=None, **kwargs):
+        # Like `execute`, but for commands whose output only depends on the
+        # tool being run and its environment (e.g. `cc --version`). These can
+        # be cached across runs of bfg9000.
+        if self.probe_cache is None or kwargs.get('shell', False):
+            return self.execute(args, env=env, extra_env=extra_env, **kwargs)
+
+        env = self._execute_env(env, extra_env)
+        args = shell.convert_args(
+            Command.convert_args(args, lambda x: x.command), self.base_dirs
+        )
+        return self.probe_cache.execute(args, env=env, **kwargs)
+
     def run(self, args, lang=None, *posargs, **kwargs):
         return self.execute(self.run_arguments(args, lang), *posargs, **kwargs)
 
+    def to_json(self):
+        return {
+            'version': self.version,
+            'data': {
+                'bfgdir': self.bfgdir.to_json(),
+                'backend': self.backend,
+                'backend_version': str(self.backend_version),
+
+                'host_platform': self.host_platform.to_json(),
+                'target_platform': self.target_platform.to_json(),
+
+                'srcdir': self.srcdir.to_json(),
+                'builddir': self.builddir.to_json(),
+                'install_dirs': {
+                    k.name: try_to_json(v)
+                    for k, v in self.install_dirs.items()
+                },
+                'toolchain': self.toolchain.to_json(),
+
+                'library_mode': self.library_mode,
+                'extra_args': self.extra_args,
+                'probe_cache': self.probe_cache is not None,
+                'prefetch_langs': self.prefetch_langs,
+                'submodule_cache': self.submodule_cache,
+                'split_build_files': self.split_build_files,
+                'fast_makefile': self.fast_makefile,
+                'response_file_threshold': self.response_file_threshold,
+
+                'initial_variables': self.initial_variables,
+                'variables': self.variables,
+            }
+        }
+
     def save(self, path):
         with open(os.path.join(path, self.envfile), 'w') as out:
-            json.dump({
-                'version': self.version,
-                'data': {
-                    'bfgdir': self.bfgdir.to_json(),
-                    'backend': self.backend,
-                    'backend_version': str(self.backend_version),
-
-                    'host_platform': self.host_platform.to_json(),
-                    'target_platform': self.target_platform.to_json(),
-
-                    'srcdir': self.srcdir.to_json(),
-                    'builddir': self.builddir.to_json(),
-                    'install_dirs': {
-                        k.name: try_to_json(v)
-                        for k, v in self.install_dirs.items()
-                    },
-                    'toolchain': self.toolchain.to_json(),
-
-                    'library_mode': self.library_mode,
-                    'extra_args': self.extra_args,
-
-                    'initial_variables': self.initial_variables,
-                    'variables': self.variables,
-                }
-            }, out)
+            json.dump(self.to_json(), out)
 
     @classmethod
     def load(cls, path):
@@ -220,7 +303,7 @@ class Environment:
         # v6 adds persistence for the backend's version and converts bfgpath to
         # a Path object internally.
         if version < 6:
-            backend = list_backends()[data['backend']]
+            backend = get_backend(data['backend'])
             data['backend_version'] = str(backend.version())
             data['bfgpath'] = Path(data['bfgpath']).to_json()
 
@@ -269,6 +352,30 @@ class Environment:
                 data[i] = {'genus': genus, 'species': species,
                            'arch': platform.machine()}
 
+        # v15 adds caching of toolchain probes.
+        if version < 15:
+            data['probe_cache'] = True
+
+        # v16 adds the list of languages to prefetch builders for.
+        if version < 16:
+            data['prefetch_langs'] = []
+
+        # v17 adds the option to cache the results of submodules.
+        if version < 17:
+            data['submodule_cache'] = False
+
+        # v18 adds the option to split build files by submodule.
+        if version < 18:
+            data['split_build_files'] = False
+
+        # v19 adds the option to generate a faster Makefile.
+        if version < 19:
+            data['fast_makefile'] = False
+
+        # v20 adds response files for long link commands.
+        if version < 20:
+            data['response_file_threshold'] = 0
+
         # Now that we've upgraded, initialize the Environment object.
         env = Environment.__new__(Environment)
 
@@ -277,7 +384,9 @@ class Environment:
             data['target_platform']
         )
 
-        for i in ('backend', 'extra_args', 'initial_variables', 'variables'):
+        for i in ('backend', 'extra_args', 'initial_variables', 'variables',
+                  'prefetch_langs', 'submodule_cache', 'split_build_files',
+                  'fast_makefile', 'response_file_threshold'):
             setattr(env, i, data[i])
 
         for i in ('bfgdir', 'srcdir', 'builddir'):
@@ -290,5 +399,6 @@ class Environment:
         }
         env.toolchain = Toolchain.from_json(data['toolchain'])
         env.library_mode = LibraryMode(*data['library_mode'])
+        env.init_probe_cache(data['probe_cache'])
 
         return env
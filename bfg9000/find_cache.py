@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import time
+
+__all__ = ['FindCache']
+
+
+class FindCache:
+    version = 1
+    filename = '.bfg_find_cache'
+
+    # If a directory was modified this recently (in nanoseconds), another
+    # change could happen without updating its mtime, so don't trust it.
+    racy_window = 2 * 10**9
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+        self._used = {}
+        self._dirty = False
+
+        try:
+            with open(self.path) as inp:
+                state = json.load(inp)
+            if state['version'] == self.version:
+                self._entries = state['entries']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+            return [st.st_mtime_ns, st.st_ino]
+        except OSError:
+            return None
+
+    def listdir(self, path, listdir):
+        """Return the listing of the directory at `path`, calling `listdir`
+        to get it if the directory has changed since we last listed it."""
+
+        stat = self._stat(path)
+        if stat is None:
+            return listdir(path)
+
+        entry = self._entries.get(path)
+        if entry is None or entry['stat'] != stat:
+            dirs, nondirs, links = listdir(path)
+            entry = {'stat': stat, 'dirs': dirs, 'nondirs': nondirs,
+                     'links': sorted(links)}
+            self._dirty = True
+            if time.time() * 10**9 - stat[0] < self.racy_window:
+                return dirs, nondirs, links
+            self._entries[path] = entry
+
+        self._used[path] = entry
+        return entry['dirs'], entry['nondirs'], set(entry['links'])
+
+    def save(self):
+        # Only keep the directories we looked at this time; the rest are no
+        # longer being searched.
+        if not self._dirty and len(self._used) == len(self._entries):
+            return
+
+        dirname = os.path.dirname(os.path.abspath(self.path))
+        fd, tmppath = tempfile.mkstemp(dir=dirname, prefix=self.filename)
+        try:
+            with os.fdopen(fd, 'w') as out:
+                json.dump({'version': self.version,
+                           'entries': self._used}, out)
+            os.replace(tmppath, self.path)
+        except Exception:
+            os.remove(tmppath)
+            raise
+        self._entries = dict(self._used)
+        self._dirty = False
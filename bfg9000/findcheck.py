@@ -0,0 +1,48 @@
+import json
+import os
+
+from .app_version import version
+from .arguments import parser as argparse
+from .builtins.find import globs_changed
+
+
+def touch(path):
+    with open(path, 'a'):
+        os.utime(path, None)
+
+
+def check(globs, stamp):
+    try:
+        with open(globs) as f:
+            changed = globs_changed(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        # If we can't tell what changed, assume the worst.
+        changed = True
+
+    if changed:
+        touch(stamp)
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='bfg9000-findcheck',
+        description='Repeat the searches made by find_files() and update ' +
+                    'STAMP if any of their results have changed.'
+    )
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s ' + version)
+    parser.add_argument('globs', metavar='GLOBS',
+                        help='the file describing the searches to repeat')
+    parser.add_argument('stamp', metavar='STAMP',
+                        help='the file to update if the results changed')
+    parser.add_argument('--touch', metavar='FILE',
+                        help='a file to update after every check')
+    args = parser.parse_args()
+
+    try:
+        check(args.globs, args.stamp)
+        if args.touch:
+            touch(args.touch)
+    except Exception as e:
+        parser.error(e)
@@ -0,0 +1,62 @@
+import hashlib
+import json
+import os
+
+from .app_version import version
+
+__all__ = ['Fingerprint']
+
+
+def _hash_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _hash_dir(path):
+    try:
+        names = sorted(os.listdir(path))
+    except OSError:
+        return None
+    data = '\0'.join(names).encode('utf-8', 'surrogateescape')
+    return hashlib.sha256(data).hexdigest()
+
+
+class Fingerprint:
+    """A record of the contents of all the inputs used to generate a set of
+    build files. If none of the inputs have changed, regenerating the build
+    files would be a no-op, so we can skip it."""
+
+    filename = '.bfg_fingerprint'
+
+    def __init__(self, files, dirs, outputs):
+        self.version = version
+        self.files = {i: _hash_file(i) for i in files}
+        self.dirs = {i: _hash_dir(i) for i in dirs}
+        self.outputs = sorted(outputs)
+
+    def to_json(self):
+        return {
+            'version': self.version,
+            'files': self.files,
+            'dirs': self.dirs,
+            'outputs': self.outputs,
+        }
+
+    def save(self, path):
+        with open(os.path.join(path, self.filename), 'w') as out:
+            json.dump(self.to_json(), out)
+
+    @classmethod
+    def is_current(cls, path):
+        try:
+            with open(os.path.join(path, cls.filename)) as inp:
+                data = json.load(inp)
+            current = cls(data['files'], data['dirs'], data['outputs'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+        return ( current.to_json() == data and
+                 all(os.path.exists(i) for i in current.outputs) )
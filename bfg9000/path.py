@@ -1,6 +1,8 @@
+import filecmp
 import functools
 import os
 from contextlib import contextmanager
+from io import BytesIO, StringIO
 
 from .platforms.basepath import BasePath, Root, InstallRoot, DestDir  # noqa
 from .platforms.host import platform_info
@@ -70,3 +72,49 @@ def pushd(dirname, makedirs=False, mode=0o777, exist_ok=False):
         yield
     finally:
         os.chdir(old)
+
+
+@contextmanager
+def write_if_changed(filename, binary=False):
+    # Write the data to memory first and only replace the file if its contents
+    # changed. This preserves the file's mtime when nothing changed, so that
+    # build tools don't think they need to do anything.
+    out = BytesIO() if binary else StringIO()
+    yield out
+    data = out.getvalue()
+
+    mode = 'b' if binary else ''
+    try:
+        with open(filename, 'r' + mode) as f:
+            if f.read() == data:
+                return
+    except (OSError, UnicodeDecodeError):
+        pass
+
+    tmpname = filename + '.tmp'
+    with open(tmpname, 'w' + mode) as f:
+        f.write(data)
+    os.replace(tmpname, filename)
+
+
+@contextmanager
+def stream_if_changed(filename):
+    # Like `write_if_changed`, but write straight to a temporary file instead
+    # of holding everything in memory.
+    tmpname = filename + '.tmp'
+    try:
+        with open(tmpname, 'w') as out:
+            yield out
+    except BaseException:
+        os.remove(tmpname)
+        raise
+
+    try:
+        same = filecmp.cmp(filename, tmpname, shallow=False)
+    except OSError:
+        same = False
+
+    if same:
+        os.remove(tmpname)
+    else:
+        os.replace(tmpname, filename)
@@ -108,6 +108,24 @@ class BasePath(safe_str.safe_string):
             path = self.__join(self.suffix, path)
         return type(self)(drive + path, self.root, self.destdir)
 
+    def append_name(self, name):
+        # This is a faster version of `append` for a single path component,
+        # such as a name from a directory listing, where there's nothing to
+        # normalize.
+        if ( not name or name in (self.curdir, self.pardir) or
+             name[0] == '~' or any(i in name for i in '/\\:') ):
+            return self.append(name)
+
+        suffix = self.suffix
+        if suffix and not suffix.endswith(self.sep):
+            suffix += self.sep
+
+        result = type(self).__new__(type(self))
+        result.suffix = suffix + name
+        result.root = self.root
+        result.destdir = self.destdir
+        return result
+
     def ext(self):
         return posixpath.splitext(self.suffix)[1]
 
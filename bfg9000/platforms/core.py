@@ -2,9 +2,9 @@ import platform
 import re
 import subprocess
 from collections import namedtuple
-from pkg_resources import get_entry_info
 
 from ..objutils import memoize
+from ..plugins import entry_point
 from ..versioning import SpecifierSet, Version
 
 __all__ = ['known_native_object_formats', 'known_platforms', 'parse_triplet',
@@ -135,12 +135,12 @@ class Platform:
 
 @memoize
 def _get_platform_info(kind, genus, species, arch):
-    entry_point = 'bfg9000.platforms.{}'.format(kind)
-    entry = get_entry_info('bfg9000', entry_point, genus)
+    group = 'bfg9000.platforms.{}'.format(kind)
+    entry = entry_point(group, genus)
     if entry is None:
         # Fall back to a generic POSIX system if we don't recognize the
         # platform name.
-        entry = get_entry_info('bfg9000', entry_point, 'posix')
+        entry = entry_point(group, 'posix')
     return entry.load()(genus, species, arch)
 
 
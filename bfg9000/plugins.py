@@ -0,0 +1,101 @@
+import importlib
+import os
+from collections import namedtuple, OrderedDict
+
+from .objutils import memoize
+
+__all__ = ['entry_point', 'entry_points', 'EntryPoint']
+
+
+class EntryPoint(namedtuple('EntryPoint', ['name', 'value'])):
+    def load(self):
+        # Entry point values look like `module:attr.subattr [extra]`; we don't
+        # care about the extras, since we'll find out soon enough whether
+        # their dependencies are installed when we import the module.
+        module, _, attrs = self.value.split('[')[0].strip().partition(':')
+        result = importlib.import_module(module.strip())
+        for i in filter(None, attrs.strip().split('.')):
+            result = getattr(result, i)
+        return result
+
+
+@memoize
+def _static_entry_points():
+    # This module is generated when building bfg9000 (see `setup.py`), and
+    # lets us find our own plugins even without any package metadata.
+    try:
+        from ._entry_points import entry_points
+        return entry_points
+    except ImportError:  # pragma: no cover
+        return _egg_info_entry_points()
+
+
+def _egg_info_entry_points():
+    # When running from a source checkout (e.g. after `pip install -e .`),
+    # there's no generated table, but our own metadata is right next to the
+    # package, so read that directly instead of scanning every package.
+    import configparser
+
+    filename = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        'bfg9000.egg-info', 'entry_points.txt'
+    )
+    parser = configparser.ConfigParser(delimiters=('=',), interpolation=None)
+    parser.optionxform = str
+    try:
+        with open(filename) as f:
+            parser.read_file(f)
+    except (OSError, configparser.Error):
+        return {}
+    return {i: OrderedDict(parser.items(i)) for i in parser.sections()
+            if i.startswith('bfg9000.')}
+
+
+def _metadata_entry_points():
+    # Importing `importlib.metadata` takes a noticeable amount of time, so
+    # only do so once we know we need it.
+    try:
+        from importlib import metadata
+    except ImportError:  # pragma: no cover
+        try:
+            import importlib_metadata as metadata
+        except ImportError:
+            return []
+
+    eps = metadata.entry_points()
+    # Before Python 3.12, this returns a dict mapping groups to entry points.
+    if isinstance(eps, dict):
+        return [(group, i.name, i.value) for group, values in eps.items()
+                for i in values]
+    return [(i.group, i.name, i.value) for i in eps]
+
+
+@memoize
+def _all_entry_points():
+    result = {}
+    # If a plugin is found more than once (e.g. when bfg9000 is installed
+    # and also run from a source checkout), prefer the first one we see, just
+    # like Python's import system does.
+    for group, name, value in _metadata_entry_points():
+        result.setdefault(group, OrderedDict()).setdefault(
+            name, EntryPoint(name, value)
+        )
+    for group, values in _static_entry_points().items():
+        for name, value in values.items():
+            result.setdefault(group, OrderedDict()).setdefault(
+                name, EntryPoint(name, value)
+            )
+    return result
+
+
+def entry_points(group):
+    return list(_all_entry_points().get(group, {}).values())
+
+
+def entry_point(group, name):
+    # Check our own plugins first so that we can usually avoid scanning all
+    # the installed packages' metadata.
+    value = _static_entry_points().get(group, {}).get(name)
+    if value is not None:
+        return EntryPoint(name, value)
+    return _all_entry_points().get(group, {}).get(name)
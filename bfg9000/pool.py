@@ -0,0 +1,124 @@
+import errno
+import os
+import re
+import select
+import stat
+import subprocess
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from .app_version import version
+from .arguments import parser as argparse
+
+_jobserver_re = re.compile(r'--jobserver-(?:auth|fds)=(\S+)')
+
+
+class Jobserver:
+    def __init__(self, read_fd, write_fd):
+        self.read_fd = read_fd
+        self.write_fd = write_fd
+
+    @classmethod
+    def from_env(cls, env=os.environ):
+        matches = _jobserver_re.findall(env.get('MAKEFLAGS', ''))
+        if not matches:
+            return None
+
+        auth = matches[-1]
+        try:
+            if auth.startswith('fifo:'):
+                fd = os.open(auth[len('fifo:'):], os.O_RDWR)
+                return cls(fd, fd)
+
+            # Make only passes the jobserver's file descriptors on to recipes
+            # it thinks are recursive makes, so make sure they're really ours.
+            fds = [int(i) for i in auth.split(',')]
+            if all(stat.S_ISFIFO(os.fstat(i).st_mode) for i in fds):
+                return cls(*fds)
+        except (OSError, ValueError, TypeError):
+            pass
+        return None
+
+    def release(self):
+        os.write(self.write_fd, b'+')
+
+    def acquire(self):
+        while True:
+            select.select([self.read_fd], [], [])
+            try:
+                if os.read(self.read_fd, 1):
+                    return
+            except BlockingIOError:
+                pass
+
+
+def acquire_slot(fd, depth, jobserver=None, interval=0.01,
+                 max_interval=0.25):
+    lent = False
+    try:
+        while True:
+            for i in range(depth):
+                try:
+                    fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, i)
+                    return i
+                except OSError as e:
+                    if e.errno not in (errno.EACCES, errno.EAGAIN):
+                        raise
+
+            # While we're waiting for a slot, give our job token back to make
+            # so that it can run something else (e.g. a compilation) instead.
+            if jobserver and not lent:
+                jobserver.release()
+                lent = True
+            time.sleep(interval)
+            interval = min(interval * 2, max_interval)
+    finally:
+        if lent:
+            jobserver.acquire()
+
+
+def run(lockfile, depth, command):
+    if fcntl is None:  # pragma: no cover
+        return subprocess.call(command)
+
+    fd = os.open(lockfile, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        acquire_slot(fd, depth, Jobserver.from_env())
+        return subprocess.call(command)
+    finally:
+        os.close(fd)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='bfg9000-pool',
+        description=('Run a command, waiting until fewer than DEPTH other ' +
+                     'commands using the same lock file are running.')
+    )
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s ' + version)
+    parser.add_argument('-j', type=int, default=1, metavar='DEPTH',
+                        dest='depth',
+                        help=('the number of commands that can run at once ' +
+                              '(default: %(default)s)'))
+    parser.add_argument('lockfile', metavar='LOCKFILE',
+                        help='the lock file shared by commands in this pool')
+    parser.add_argument('command', nargs=argparse.REMAINDER, metavar='COMMAND',
+                        help='the command to execute')
+    args = parser.parse_args()
+
+    if len(args.command) == 0:
+        parser.error('command required')
+    if args.depth < 1:
+        parser.error('depth must be at least 1')
+
+    try:
+        return run(args.lockfile, args.depth, args.command)
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            parser.exit(66, 'command not found: {}\n'.format(args.command[0]))
+        raise  # pragma: no cover
@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+
+from . import shell
+
+__all__ = ['ProbeCache']
+
+
+class ProbeCache:
+    version = 2
+    filename = '.bfg_probe_cache'
+
+    # Environment variables that can change the output of a probe without
+    # changing its command line. Variables like CFLAGS or LDFLAGS are already
+    # part of the command line, so they don't need to be listed here.
+    env_vars = ('PATH', 'CPATH', 'C_INCLUDE_PATH', 'CPLUS_INCLUDE_PATH',
+                'OBJC_INCLUDE_PATH', 'LIBRARY_PATH', 'COMPILER_PATH',
+                'GCC_EXEC_PREFIX', 'SDKROOT', 'MACOSX_DEPLOYMENT_TARGET',
+                'CLASSPATH', 'JAVA_HOME', 'JAVA_OPTS', '_JAVA_OPTIONS',
+                'JAVA_TOOL_OPTIONS', 'INCLUDE', 'LIB', 'LIBPATH')
+
+    # Options that make a compiler driver report on the linker (or the
+    # directories it searches), which isn't named on the command line.
+    linker_options = ('-Wl,', '-print-search-dirs')
+
+    def __init__(self, path):
+        self.path = path
+        self._dirty = False
+        self._entries = {}
+
+        try:
+            with open(self.path) as inp:
+                state = json.load(inp)
+            if state['version'] == self.version:
+                self._entries = state['entries']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    @staticmethod
+    def _stat(command, env):
+        try:
+            fullpath = shell.which(command, env, resolve=True)[0]
+            with open(fullpath, 'rb') as f:
+                # We can't tell what a script will end up running (e.g. a
+                # wrapper around the real compiler), so treat it as unknown.
+                if f.read(2) == b'#!':
+                    return None
+            st = os.stat(fullpath)
+            return [fullpath, st.st_mtime_ns, st.st_size]
+        except (IOError, OSError):
+            return None
+
+    @classmethod
+    def _stats(cls, args, env):
+        stat = cls._stat(args[0], env)
+        if stat is None:
+            return None
+        stats = [stat]
+
+        # Launchers like `ccache cc` run the tool named after them, so that
+        # needs to be unchanged too.
+        for i in args[1:]:
+            if i.startswith('-'):
+                break
+            stat = cls._stat(i, env)
+            if stat is None:
+                break
+            stats.append(stat)
+
+        if any(i.startswith(cls.linker_options) for i in args):
+            fuse_ld = [i[len('-fuse-ld='):] for i in args
+                       if i.startswith('-fuse-ld=')]
+            if not fuse_ld:
+                linker = 'ld'
+            elif os.path.isabs(fuse_ld[-1]):
+                linker = fuse_ld[-1]
+            else:
+                linker = 'ld.' + fuse_ld[-1]
+            stat = cls._stat(linker, env)
+            if stat is not None:
+                stats.append(stat)
+        return stats
+
+    @classmethod
+    def _key(cls, args, env, kwargs):
+        def conv(value):
+            return value.name if isinstance(value, shell.Mode) else value
+
+        return json.dumps([
+            args, {k: env[k] for k in cls.env_vars if k in env},
+            {k: conv(v) for k, v in sorted(kwargs.items())},
+        ], sort_keys=True)
+
+    def execute(self, args, *, env, **kwargs):
+        # If we can't find the tool, we can't tell when it changes, so just
+        # run the command directly.
+        stats = self._stats(args, env)
+        if stats is None:
+            return shell.execute(args, env=env, **kwargs)
+
+        key = self._key(args, env, kwargs)
+        entry = self._entries.get(key)
+        if entry is None or entry['stats'] != stats:
+            entry = {'stats': stats}
+            try:
+                entry['output'] = shell.execute(args, env=env, **kwargs)
+            except shell.CalledProcessError as e:
+                entry['returncode'] = e.returncode
+            self._entries[key] = entry
+            self._dirty = True
+
+        if 'returncode' in entry:
+            raise shell.CalledProcessError(entry['returncode'], args)
+        output = entry['output']
+        return tuple(output) if isinstance(output, list) else output
+
+    def save(self):
+        # Drop any entries for tools that have changed since we probed them,
+        # since they'll never be used again.
+        stats = {}
+        for k, v in list(self._entries.items()):
+            for stat in v['stats']:
+                fullpath = stat[0]
+                if fullpath not in stats:
+                    stats[fullpath] = self._stat(fullpath, os.environ)
+                if stats[fullpath] != stat:
+                    del self._entries[k]
+                    self._dirty = True
+                    break
+
+        if not self._dirty:
+            return
+
+        # Write to a temporary file and then move it into place so that
+        # concurrent builds sharing a cache never see a partial file.
+        dirname = os.path.dirname(os.path.abspath(self.path))
+        fd, tmppath = tempfile.mkstemp(dir=dirname, prefix=self.filename)
+        try:
+            with os.fdopen(fd, 'w') as out:
+                json.dump({'version': self.version,
+                           'entries': self._entries}, out)
+            os.replace(tmppath, self.path)
+        except Exception:
+            os.remove(tmppath)
+            raise
+        self._dirty = False
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+
+from .app_version import version
+from .arguments import parser as argparse
+
+
+def _hash_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def save(state, outputs):
+    data = []
+    for i in outputs:
+        try:
+            mtime = os.stat(i).st_mtime_ns
+            data.append([os.path.abspath(i), mtime, _hash_file(i)])
+        except OSError:
+            pass
+
+    with open(state, 'w') as f:
+        json.dump(data, f)
+
+
+def restore(state):
+    try:
+        with open(state) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        # If we don't know what the outputs looked like before, just leave
+        # them alone.
+        return []
+
+    restored = []
+    for path, mtime, digest in data:
+        try:
+            if _hash_file(path) == digest:
+                os.utime(path, ns=(os.stat(path).st_atime_ns, mtime))
+                restored.append(path)
+        except OSError:
+            pass
+
+    os.remove(state)
+    return restored
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='bfg9000-restat',
+        description=('Record the state of a command\'s outputs before it ' +
+                     'runs, and afterwards, restore the modification time ' +
+                     'of any output whose contents are unchanged.')
+    )
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s ' + version)
+    subparsers = parser.add_subparsers(dest='mode', metavar='COMMAND')
+    subparsers.required = True
+
+    save_p = subparsers.add_parser('save', help='record the outputs\' state')
+    save_p.add_argument('state', metavar='STATE',
+                        help='the file to record the state in')
+    save_p.add_argument('outputs', nargs='*', metavar='OUTPUT',
+                        help='the outputs to record')
+
+    restore_p = subparsers.add_parser(
+        'restore', help='restore the mtimes of unchanged outputs'
+    )
+    restore_p.add_argument('state', metavar='STATE',
+                           help='the file the state was recorded in')
+
+    args = parser.parse_args()
+    if args.mode == 'save':
+        save(args.state, args.outputs)
+    else:
+        restore(args.state)
@@ -3,6 +3,7 @@ import subprocess
 from enum import Enum
 
 from .list import shell_list  # noqa
+from .. import tracing
 from ..iterutils import listify
 from ..path import BasePath, Path
 from ..platforms.host import platform_info
@@ -78,10 +79,13 @@ def execute(args, *, shell=False, env=None, base_dirs=None, stdout=Mode.normal,
     def conv_mode(mode):
         return mode.value if isinstance(mode, Mode) else mode
 
-    proc = subprocess.run(
-        args, universal_newlines=True, shell=shell, env=env,
-        stdout=conv_mode(stdout), stderr=conv_mode(stderr)
-    )
+    name = 'shell' if shell else os.path.basename(args[0])
+    with tracing.span(name, 'subprocess', argv=args) as info:
+        proc = subprocess.run(
+            args, universal_newlines=True, shell=shell, env=env,
+            stdout=conv_mode(stdout), stderr=conv_mode(stderr)
+        )
+        info['returncode'] = proc.returncode
     if not (returncode == 'any' or
             (returncode == 'fail' and proc.returncode != 0) or
             proc.returncode in listify(returncode)):
@@ -0,0 +1,392 @@
+import hashlib
+import io
+import json
+import os
+import pickle
+import tempfile
+import types
+
+from . import tracing
+from .app_version import version as bfg_version
+from .file_types import Node
+from .build_inputs import Edge
+
+__all__ = ['SubmoduleCache']
+
+
+_simple_types = (str, int, float, bool, type(None), list, tuple)
+_unset = object()
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+def _hash_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _hash_dir(path):
+    try:
+        names = sorted(os.listdir(path))
+    except OSError:
+        return None
+    data = '\0'.join(names).encode('utf-8', 'surrogateescape')
+    return hashlib.sha256(data).hexdigest()
+
+
+# Snapshots record just enough about the state of the build's extra inputs
+# (install/default/test registrations, global options, etc) to tell what a
+# submodule changed. We assume that lists and sets only grow, which lets us
+# snapshot a list with just its length and last element.
+
+def _snapshot(value, depth=0):
+    if isinstance(value, list):
+        return ('list', len(value), value[-1] if value else None)
+    elif isinstance(value, set):
+        return ('set', frozenset(value))
+    elif isinstance(value, dict):
+        return ('dict', {k: (v, _snapshot(v, depth + 1))
+                         for k, v in value.items()})
+    elif depth < 2 and hasattr(value, '__dict__') and not callable(value):
+        return ('obj', {k: (v, _snapshot(v, depth + 1))
+                        for k, v in vars(value).items()})
+    return ('leaf',)
+
+
+def _diff(value, snapshot, path=()):
+    kind = snapshot[0]
+    if kind == 'list':
+        _, length, last = snapshot
+        if len(value) < length or (length and value[length - 1] is not last):
+            raise _Uncacheable('list was modified')
+        if len(value) == length:
+            return []
+        return [('extend', path, value[length:])]
+    elif kind == 'set':
+        if not value >= snapshot[1]:
+            raise _Uncacheable('set was modified')
+        added = value - snapshot[1]
+        return [('update', path, added)] if added else []
+    elif kind in ('dict', 'obj'):
+        items = value if kind == 'dict' else vars(value)
+        old = snapshot[1]
+        if not all(k in items for k in old):
+            raise _Uncacheable('item was removed')
+
+        ops = []
+        op = 'setitem' if kind == 'dict' else 'setattr'
+        sub = 'item' if kind == 'dict' else 'attr'
+        for k, v in items.items():
+            if k not in old or v is not old[k][0]:
+                ops.append((op, path, k, v))
+            else:
+                ops.extend(_diff(v, old[k][1], path + ((sub, k),)))
+        return ops
+    return []
+
+
+def _apply(root, ops):
+    for op, path, *args in ops:
+        target = root
+        for kind, key in path:
+            target = target[key] if kind == 'item' else getattr(target, key)
+
+        if op == 'extend':
+            target.extend(args[0])
+        elif op == 'update':
+            target.update(args[0])
+        elif op == 'setitem':
+            target[args[0]] = args[1]
+        else:  # op == 'setattr'
+            setattr(target, args[0], args[1])
+
+
+class _Pickler(pickle.Pickler):
+    # Objects that belong to the environment (builders, tools, etc), the
+    # build context, or that were created before the submodule ran are saved
+    # as references, so that replaying a submodule links up with the objects
+    # in the current build.
+    def __init__(self, file, build, refs, own=frozenset()):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.build = build
+        self.refs = refs
+        self.own = own
+        self.builders = set()
+
+    def _is_output(self, node):
+        return ( id(node) not in self.own and
+                 self.build._outputs.get(node.path) is node )
+
+    def persistent_id(self, obj):
+        ref = self.refs.get(id(obj))
+        if ref is not None:
+            if ref[0] == 'builder':
+                self.builders.add(ref[1])
+            return ref
+        if isinstance(obj, Edge):
+            if obj.output and self._is_output(obj.output[0]):
+                return ('edge', obj.output[0].path)
+        elif isinstance(obj, Node) and obj.creator:
+            if self._is_output(obj):
+                return ('output', obj.path)
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, context):
+        super().__init__(file)
+        self.context = context
+
+    def persistent_load(self, pid):
+        kind = pid[0]
+        env = self.context.env
+        if kind == 'env':
+            return env
+        elif kind == 'context':
+            return self.context
+        elif kind == 'builtin':
+            return self.context.builtins[pid[1]]
+        elif kind == 'builder':
+            builder = env.builder(pid[1])
+            if len(pid) == 2:
+                return builder
+            value = getattr(builder, pid[2])
+            return value if len(pid) == 3 else value[pid[3]]
+        elif kind == 'tool':
+            return env.tool(pid[1])
+        elif kind == 'output':
+            return self.context.build.output(pid[1])
+        elif kind == 'edge':
+            return self.context.build.output(pid[1]).creator
+        raise pickle.UnpicklingError('unknown reference {!r}'.format(pid))
+
+
+class _Recording:
+    def __init__(self, context):
+        build = context.build
+        self.journal = []
+        self.seen_start = len(context.seen_paths)
+        self.extra_inputs = _snapshot(build._extra_inputs)
+        self.globals = dict(context.builtins)
+
+
+class SubmoduleCache:
+    """Record the effects each submodule has on the build so that unchanged
+    submodules can be replayed instead of re-executed."""
+
+    version = 1
+    filename = '.bfg_submodules'
+
+    def __init__(self, path, env, argv):
+        self.path = path
+        self.env = env
+        self._records = {}
+        self._new_records = {}
+        self._stack = []
+
+        try:
+            self._context_key = self._hash_context(env, argv)
+        except Exception:
+            # If we can't hash the inputs common to all the submodules, we
+            # can't cache anything.
+            self._context_key = None
+            return
+
+        try:
+            with open(self.path, 'rb') as inp:
+                state = pickle.load(inp)
+            if ( state['version'] == self.version and
+                 state['context'] == self._context_key ):
+                self._records = state['records']
+        except Exception:
+            pass
+
+    @staticmethod
+    def _hash_context(env, argv):
+        data = env.to_json()['data']
+        for i in ('probe_cache', 'prefetch_langs', 'submodule_cache'):
+            data.pop(i, None)
+        return hashlib.sha256(
+            json.dumps([bfg_version, data], sort_keys=True).encode('utf-8') +
+            pickle.dumps(sorted(vars(argv).items()))
+        ).hexdigest()
+
+    def _refs(self, context, globals):
+        env = self.env
+        refs = {id(env): ('env',), id(context): ('context',)}
+        # Functions in the global namespace are generally builtins bound to
+        # this context; if they're defined by the user, they still refer to
+        # the same name when we replay.
+        for k, v in globals.items():
+            if isinstance(v, types.FunctionType):
+                refs[id(v)] = ('builtin', k)
+
+        for lang in env.builder_langs:
+            builder = env.builder(lang)
+            refs[id(builder)] = ('builder', lang)
+            for k, v in vars(builder).items():
+                if isinstance(v, dict):
+                    for kk, vv in v.items():
+                        refs.setdefault(id(vv), ('builder', lang, k, kk))
+                elif not isinstance(v, _simple_types):
+                    refs.setdefault(id(v), ('builder', lang, k))
+        for name in env.tool_names:
+            refs[id(env.tool(name))] = ('tool', name)
+        return refs
+
+    def _parent_state(self, context):
+        build = context.build
+        out = io.BytesIO()
+        _Pickler(out, build, self._refs(context, context.builtins)).dump([
+            build['project'], build['compile_options'], build['link_options'],
+        ])
+        return hashlib.sha256(out.getvalue()).hexdigest()
+
+    def _inputs(self, context, path, parent_state):
+        seen = context.seen_paths[self._stack[-1].seen_start:]
+        return {
+            'parent': parent_state,
+            'files': {i: _hash_file(i) for i in (
+                p.string(self.env.base_dirs) for p in seen
+            )},
+        }
+
+    def _is_current(self, record, context, parent_state):
+        inputs = record['inputs']
+        if inputs['parent'] != parent_state:
+            return False
+        for k, v in inputs['files'].items():
+            if _hash_file(k) != v:
+                return False
+        for k, v in inputs['dirs'].items():
+            if _hash_dir(k) != v:
+                return False
+        for lang, info in inputs['builders'].items():
+            try:
+                builder = self.env.builder(lang)
+            except Exception:
+                return False
+            if [builder.brand, str(builder.version)] != info:
+                return False
+        return True
+
+    def _replay(self, context, record):
+        build = context.build
+        data = _Unpickler(io.BytesIO(record['effects']), context).load()
+
+        for kind, value in data['journal']:
+            getattr(build, 'add_' + kind)(value)
+        _apply(build._extra_inputs, data['extra_inputs'])
+        context.builtins.update(data['globals'])
+        context.seen_paths.extend(data['seen_paths'])
+        return data['exports']
+
+    def _record(self, context, recording, exports, inputs):
+        build = context.build
+        own = set()
+        for kind, value in recording.journal:
+            own.add(id(value))
+            if kind == 'edge':
+                own.update(id(i) for i in value.output)
+
+        globals = {k: v for k, v in context.builtins.items()
+                   if not k.startswith('__') and
+                   recording.globals.get(k, _unset) is not v}
+        extra_inputs = _diff(build._extra_inputs, recording.extra_inputs)
+        seen_paths = context.seen_paths[recording.seen_start:]
+
+        find_dirs = [i for op, path, *args in extra_inputs
+                     if op == 'update' and path == (('item', 'find_dirs'),)
+                     for i in args[0]]
+        inputs['dirs'] = {i: _hash_dir(i) for i in (
+            p.string(self.env.base_dirs) for p in find_dirs
+        )}
+
+        out = io.BytesIO()
+        pickler = _Pickler(out, build, self._refs(context, recording.globals),
+                           own)
+        pickler.dump({
+            'journal': recording.journal,
+            'extra_inputs': extra_inputs,
+            'globals': globals,
+            'seen_paths': seen_paths,
+            'exports': exports,
+        })
+
+        inputs['builders'] = {}
+        for lang in pickler.builders:
+            builder = self.env.builder(lang)
+            inputs['builders'][lang] = [builder.brand, str(builder.version)]
+        return {'inputs': inputs, 'effects': out.getvalue()}
+
+    def execute(self, context, path, execute):
+        if self._context_key is None:
+            return execute()
+
+        key = path.string(self.env.base_dirs)
+        try:
+            parent_state = self._parent_state(context)
+        except Exception:
+            parent_state = None
+
+        record = self._records.get(key)
+        if record and parent_state and self._is_current(record, context,
+                                                        parent_state):
+            try:
+                with tracing.span(path.suffix, 'replay'):
+                    exports = self._replay(context, record)
+                self._new_records[key] = record
+                return exports
+            except Exception:
+                # If we couldn't replay the submodule, just execute it
+                # normally. Anything we replayed before failing is harmless,
+                # since executing the submodule will overwrite it.
+                pass
+
+        recording = _Recording(context)
+        self._stack.append(recording)
+        build_journal = context.build._journal
+        context.build._journal = recording.journal
+        try:
+            exports = execute()
+            inputs = self._inputs(context, path, parent_state)
+        finally:
+            self._stack.pop()
+            context.build._journal = build_journal
+            if build_journal is not None:
+                build_journal.extend(recording.journal)
+
+        if parent_state:
+            try:
+                self._new_records[key] = self._record(
+                    context, recording, exports, inputs
+                )
+            except Exception:
+                # Submodules whose effects we can't save are just executed
+                # every time.
+                pass
+        return exports
+
+    def save(self):
+        if self._context_key is None:
+            return
+
+        # Only keep records for the submodules used in this run; the rest are
+        # stale.
+        dirname = os.path.dirname(os.path.abspath(self.path))
+        fd, tmppath = tempfile.mkstemp(dir=dirname, prefix=self.filename)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                pickle.dump({'version': self.version,
+                             'context': self._context_key,
+                             'records': self._new_records}, out,
+                            pickle.HIGHEST_PROTOCOL)
+            os.replace(tmppath, self.path)
+        except Exception:
+            os.remove(tmppath)
+            raise
@@ -0,0 +1,84 @@
+import errno
+import re
+import subprocess
+
+from .app_version import version
+from .arguments import parser as argparse
+from .path import write_if_changed
+
+# A shared library's "table of contents" lists everything about it that other
+# binaries linking to it care about: its soname and the dynamic symbols it
+# defines. If the TOC is unchanged after relinking the library, there's no need
+# to relink anything that depends on it.
+
+_soname_re = re.compile(r'\(SONAME\)\s+Library soname: \[(.*)\]$')
+_symbol_re = re.compile(
+    r'\s*\d+:\s+\S+\s+(?P<size>\S+)\s+(?P<type>\S+)\s+(?P<bind>\S+)\s+' +
+    r'(?P<vis>\S+)\s+(?:\[.*?\]\s+)?(?P<ndx>\S+)\s+(?P<name>.*)$'
+)
+
+
+def toc(readelf_output):
+    """Get the TOC from the output of `readelf -dW --dyn-syms`."""
+
+    soname = None
+    symbols = set()
+    in_dynsym = False
+    for line in readelf_output.splitlines():
+        if line.startswith('Symbol table '):
+            in_dynsym = "'.dynsym'" in line
+            continue
+
+        if in_dynsym:
+            m = _symbol_re.match(line)
+            if not m or m.group('ndx') == 'UND' or m.group('bind') == 'LOCAL':
+                continue
+            symbol = [m.group('name'), m.group('type'), m.group('bind')]
+            # Executables may get a copy of a variable defined in a shared
+            # library, so they need to be relinked if its size changes.
+            if m.group('type') == 'OBJECT':
+                symbol.append(m.group('size'))
+            symbols.add(' '.join(symbol))
+        else:
+            m = _soname_re.search(line)
+            if m:
+                soname = m.group(1)
+
+    result = ['soname: {}'.format(soname)] if soname else []
+    return result + sorted(symbols)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='bfg9000-toc',
+        description=('Read the output of `readelf -dW --dyn-syms` for a ' +
+                     'shared library and write its table of contents to a ' +
+                     'file, leaving the file untouched if the table of ' +
+                     'contents hasn\'t changed.')
+    )
+    parser.add_argument('--version', action='version',
+                        version='%(prog)s ' + version)
+    parser.add_argument('-o', required=True, dest='output',
+                        help='the file to write the table of contents to')
+    parser.add_argument('command', nargs=argparse.REMAINDER, metavar='COMMAND',
+                        help='the command to execute')
+    args = parser.parse_args()
+
+    if len(args.command) == 0:
+        parser.error('command required')
+
+    try:
+        p = subprocess.run(args.command, universal_newlines=True,
+                           stdout=subprocess.PIPE)
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            parser.exit(66, 'command not found: {}\n'.format(args.command[0]))
+        raise  # pragma: no cover
+
+    if p.returncode:
+        return p.returncode
+
+    with write_if_changed(args.output) as out:
+        for i in toc(p.stdout):
+            out.write(i + '\n')
+    return 0
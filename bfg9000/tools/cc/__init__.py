@@ -64,7 +64,7 @@ class CcBuilder(Builder):
         # grab the command line.
         ld_command = None
         try:
-            stdout, stderr = env.execute(
+            stdout, stderr = env.probe(
                 command + ldflags + ['-v', '-Wl,--version'],
                 stdout=shell.Mode.pipe, stderr=shell.Mode.pipe,
                 returncode='any'
@@ -110,7 +110,7 @@ class CcBuilder(Builder):
             brand = 'gcc'
             version = detect_version(version_output)
             if env.is_cross:
-                triplet = parse_triplet(env.execute(
+                triplet = parse_triplet(env.probe(
                     command + ['-dumpmachine'],
                     stdout=shell.Mode.pipe, stderr=shell.Mode.devnull
                 ).rstrip())
@@ -140,8 +140,8 @@ class CcBuilder(Builder):
 
     @staticmethod
     def check_command(env, command):
-        return env.execute(command + ['--version'], stdout=shell.Mode.pipe,
-                           stderr=shell.Mode.devnull)
+        return env.probe(command + ['--version'], stdout=shell.Mode.pipe,
+                         stderr=shell.Mode.devnull)
 
     @property
     def flavor(self):
@@ -15,6 +15,10 @@ class CcBaseCompiler(BuildCommand):
     def deps_flavor(self):
         return None if self.lang in ('f77', 'f95') else 'gcc'
 
+    @property
+    def supports_phony_deps(self):
+        return self.deps_flavor == 'gcc'
+
     @property
     def needs_libs(self):
         return False
@@ -27,12 +31,15 @@ class CcBaseCompiler(BuildCommand):
         return [abspath(i) for i in
                 self.env.getvar('CPATH', '').split(os.pathsep)]
 
-    def _call(self, cmd, input, output, deps=None, flags=None):
+    def _call(self, cmd, input, output, deps=None, flags=None,
+              phony_deps=False):
         result = list(chain(
             cmd, self._always_flags, iterate(flags), ['-c', input]
         ))
         if deps:
             result.extend(['-MMD', '-MF', deps])
+            if phony_deps:
+                result.append('-MP')
         result.extend(['-o', output])
         return result
 
@@ -52,6 +52,10 @@ class CcLinker(BuildCommand):
         relevant_langs = self.__known_langs.intersection(langs)
         return self.__allowed_langs[self.lang].issuperset(relevant_langs)
 
+    @property
+    def supports_response_file(self):
+        return True
+
     @property
     def needs_libs(self):
         return True
@@ -71,7 +75,7 @@ class CcLinker(BuildCommand):
     def sysroot(self, strict=False):
         try:
             # XXX: clang doesn't support -print-sysroot.
-            return self.env.execute(
+            return self.env.probe(
                 self.command + self.global_flags + ['-print-sysroot'],
                 stdout=shell.Mode.pipe, stderr=shell.Mode.devnull
             ).rstrip()
@@ -82,7 +86,7 @@ class CcLinker(BuildCommand):
 
     def search_dirs(self, strict=False):
         try:
-            output = self.env.execute(
+            output = self.env.probe(
                 self.command + self.global_flags + ['-print-search-dirs'],
                 stdout=shell.Mode.pipe, stderr=shell.Mode.devnull
             )
@@ -154,6 +154,18 @@ class BuildCommand(Command):
     def num_outputs(self):
         return 'all'
 
+    @property
+    def supports_phony_deps(self):
+        # Whether this command can add phony targets for each dependency to
+        # its (GCC-style) depfile, like `-MP`.
+        return False
+
+    @property
+    def supports_response_file(self):
+        # Whether this command can read its inputs from a response file passed
+        # as `@file`.
+        return False
+
     def pre_output(self, context, name, step):
         return opts.option_list()
 
@@ -10,8 +10,11 @@ class Bfg9000(SimpleCommand):
         super().__init__(env, name='bfg9000', env_var='BFG9000',
                          default=env.bfgdir.append('bfg9000'))
 
-    def _call(self, cmd, builddir):
-        return cmd + ['refresh', builddir]
+    def _call(self, cmd, builddir, if_changed=False):
+        result = cmd + ['refresh']
+        if if_changed:
+            result.append('--if-changed')
+        return result + [builddir]
 
 
 @tool('depfixer')
@@ -25,6 +28,19 @@ class Depfixer(SimpleCommand):
                                  shell_literal('>>'), depfile])
 
 
+@tool('findcheck')
+class FindCheck(SimpleCommand):
+    def __init__(self, env):
+        super().__init__(env, name='findcheck', env_var='FINDCHECK',
+                         default=env.bfgdir.append('bfg9000-findcheck'))
+
+    def _call(self, cmd, globs, stamp, touch=None):
+        result = cmd + [globs, stamp]
+        if touch:
+            result += ['--touch', touch]
+        return result
+
+
 @tool('jvmoutput')
 class JvmOutput(SimpleCommand):
     def __init__(self, env):
@@ -35,6 +51,16 @@ class JvmOutput(SimpleCommand):
         return cmd + ['-o', output] + subcmd
 
 
+@tool('pool')
+class Pool(SimpleCommand):
+    def __init__(self, env):
+        super().__init__(env, name='pool', env_var='POOL',
+                         default=env.bfgdir.append('bfg9000-pool'))
+
+    def _call(self, cmd, lockfile, depth, subcmd):
+        return cmd + ['-j', str(depth), lockfile] + subcmd
+
+
 @tool('rccdep')
 class RccDep(SimpleCommand):
     def __init__(self, env):
@@ -43,3 +69,23 @@ class RccDep(SimpleCommand):
 
     def _call(self, cmd, subcmd, depfile):
         return cmd + subcmd + ['-d', depfile]
+
+
+@tool('restat')
+class Restat(SimpleCommand):
+    def __init__(self, env):
+        super().__init__(env, name='restat', env_var='RESTAT',
+                         default=env.bfgdir.append('bfg9000-restat'))
+
+    def _call(self, cmd, mode, state, outputs=[]):
+        return cmd + [mode, state] + outputs
+
+
+@tool('toc')
+class Toc(SimpleCommand):
+    def __init__(self, env):
+        super().__init__(env, name='toc', env_var='TOC',
+                         default=env.bfgdir.append('bfg9000-toc'))
+
+    def _call(self, cmd, output, subcmd):
+        return cmd + ['-o', output] + subcmd
@@ -71,7 +71,7 @@ class JvmBuilder(Builder):
             try:
                 # Get the brand from the run command (rather than the compile
                 # command).
-                output = env.execute(
+                output = env.probe(
                     run_command + ['-version'], stdout=shell.Mode.pipe,
                     stderr=shell.Mode.stdout
                 )
@@ -93,8 +93,8 @@ class JvmBuilder(Builder):
 
     @staticmethod
     def check_command(env, command):
-        return env.execute(command + ['-version'], stdout=shell.Mode.pipe,
-                           stderr=shell.Mode.stdout)
+        return env.probe(command + ['-version'], stdout=shell.Mode.pipe,
+                         stderr=shell.Mode.stdout)
 
     @property
     def flavor(self):
@@ -292,7 +292,7 @@ class JvmPackageResolver:
             returncode = 0
 
         try:
-            output = env.execute(
+            output = env.probe(
                 command + args, extra_env=extra_env, stdout=shell.Mode.devnull,
                 stderr=shell.Mode.pipe, returncode=returncode
             )
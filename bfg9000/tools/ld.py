@@ -36,7 +36,7 @@ class LdLinker:
 
     def search_dirs(self, sysroot='/', strict=False):
         try:
-            output = self.env.execute(
+            output = self.env.probe(
                 self.command + ['--verbose'], stdout=shell.Mode.pipe,
                 stderr=shell.Mode.devnull
             )
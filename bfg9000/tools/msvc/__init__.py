@@ -86,8 +86,8 @@ class MsvcBuilder(Builder):
 
     @staticmethod
     def check_command(env, command):
-        return env.execute(command + ['/?'], stdout=shell.Mode.pipe,
-                           stderr=shell.Mode.stdout)
+        return env.probe(command + ['/?'], stdout=shell.Mode.pipe,
+                         stderr=shell.Mode.stdout)
 
     @property
     def flavor(self):
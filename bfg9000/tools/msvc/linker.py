@@ -40,6 +40,10 @@ class MsvcLinker(BuildCommand):
         relevant_langs = self.__known_langs.intersection(langs)
         return self.__allowed_langs[self.lang].issuperset(relevant_langs)
 
+    @property
+    def supports_response_file(self):
+        return True
+
     @property
     def needs_libs(self):
         return True
@@ -213,6 +217,10 @@ class MsvcStaticLinker(SimpleBuildCommand):
     def can_link(self, format, langs):
         return format == self.builder.object_format
 
+    @property
+    def supports_response_file(self):
+        return True
+
     def _call(self, cmd, input, output, flags=None):
         return list(chain(
             cmd, iterate(flags), iterate(input), ['/OUT:' + output]
@@ -0,0 +1,12 @@
+from . import tool
+from .common import SimpleCommand
+
+
+@tool('readelf')
+class ReadElf(SimpleCommand):
+    def __init__(self, env):
+        super().__init__(env, name='readelf', env_var='READELF',
+                         default=['readelf', 'llvm-readelf'])
+
+    def _call(self, cmd, file):
+        return cmd + ['-dW', '--dyn-syms', file]
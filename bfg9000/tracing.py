@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+import time
+
+__all__ = ['enable', 'enabled', 'save', 'span']
+
+_tracer = None
+
+
+class _NullSpan:
+    def __init__(self, args):
+        self.args = args
+
+    def __enter__(self):
+        return self.args
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+class _Span:
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self.args
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer.add(self.name, self.category, self.start,
+                        time.perf_counter(), self.args)
+
+
+class Tracer:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.events = []
+        self.summary = {}
+        self._lock = threading.Lock()
+
+    def span(self, name, category, args):
+        return _Span(self, name, category, args)
+
+    def add(self, name, category, start, end, args):
+        # Chrome's trace-event format uses microseconds for all times.
+        event = {
+            'name': name, 'cat': category, 'ph': 'X',
+            'ts': (start - self.start) * 1e6, 'dur': (end - start) * 1e6,
+            'pid': os.getpid(), 'tid': threading.get_ident(),
+        }
+        if args:
+            event['args'] = {k: _jsonify(v) for k, v in args.items()}
+
+        with self._lock:
+            self.events.append(event)
+            stats = self.summary.setdefault(category, {}).setdefault(
+                name, {'count': 0, 'total_ms': 0}
+            )
+            stats['count'] += 1
+            stats['total_ms'] += (end - start) * 1e3
+
+    def to_json(self):
+        return {
+            'traceEvents': self.events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'summary': self.summary},
+        }
+
+
+def _jsonify(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    elif isinstance(value, (list, tuple)):
+        return [_jsonify(i) for i in value]
+    return str(value)
+
+
+def enable():
+    global _tracer
+    _tracer = Tracer()
+
+
+def enabled():
+    return _tracer is not None
+
+
+def span(name, category, **args):
+    if _tracer is None:
+        return _NullSpan(args)
+    return _tracer.span(name, category, args)
+
+
+def save(filename):
+    with open(filename, 'w') as out:
+        json.dump(_tracer.to_json(), out)
@@ -3,6 +3,7 @@ import os
 import re
 import subprocess
 from setuptools import setup, find_packages, Command
+from setuptools.command.build_py import build_py
 
 from bfg9000.app_version import version
 
@@ -43,7 +44,24 @@ class Coverage(Command):
         subprocess.check_call(['coverage', 'combine'])
 
 
+class BuildPy(build_py):
+    # Write out a static table of our entry points so that bfg9000 can find
+    # its plugins quickly (and even without any package metadata).
+    def run(self):
+        super().run()
+        if self.dry_run:
+            return
+
+        entry_points = {k: dict(map(str.strip, i.split('=', 1)) for i in v)
+                        for k, v in self.distribution.entry_points.items()
+                        if k.startswith('bfg9000.')}
+        filename = os.path.join(self.build_lib, 'bfg9000', '_entry_points.py')
+        with open(filename, 'w') as f:
+            f.write('entry_points = {!r}\n'.format(entry_points))
+
+
 custom_cmds = {
+    'build_py': BuildPy,
     'coverage': Coverage,
 }
 
@@ -164,7 +182,8 @@ setup(
     packages=find_packages(exclude=['test', 'test.*']),
 
     install_requires=(
-        ['colorama', 'packaging >= 17.0', 'setuptools'] + more_requires
+        ['colorama', 'importlib_metadata;python_version<"3.8"',
+         'packaging >= 17.0'] + more_requires
     ),
     extras_require={
         'dev': ['coverage', 'flake8 >= 3.7', 'lxml', 'mike >= 0.3.1',
@@ -178,8 +197,12 @@ setup(
             'bfg9000=bfg9000.driver:main',
             '9k=bfg9000.driver:simple_main',
             'bfg9000-depfixer=bfg9000.depfixer:main',
+            'bfg9000-findcheck=bfg9000.findcheck:main',
             'bfg9000-jvmoutput=bfg9000.jvmoutput:main',
+            'bfg9000-pool=bfg9000.pool:main',
             'bfg9000-rccdep=bfg9000.rccdep:main',
+            'bfg9000-restat=bfg9000.restat:main',
+            'bfg9000-toc=bfg9000.toc:main',
         ],
         'bfg9000.backends': [
             'make=bfg9000.backends.make.writer',
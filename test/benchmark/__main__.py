@@ -0,0 +1,209 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bfg9000.app_version import version
+from bfg9000.backends import list_backends
+from bfg9000.platforms.host import platform_info
+
+from .fake_tools import write_fake_tools
+from .project import generate_project, ProjectShape
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+description = """
+Measure how long bfg9000 takes to configure synthetic projects of various
+shapes, and print the results as JSON. All compiler and pkg-config probes are
+answered by fake tools, so this works offline and without a real toolchain.
+"""
+
+# The toolchain to use for each backend; MSBuild only works with MSVC.
+_toolchains = {'make': 'cc', 'ninja': 'cc', 'msbuild': 'msvc'}
+
+# The fake MSVC tools aren't enough to convince bfg9000 that it's using MSVC
+# on other platforms, so only run these backends on Windows by default.
+_windows_backends = {'msbuild'}
+
+# Run bfg9000 with each build file's shared variables disabled, so that every
+# build step gets its own copy of its flags again. This lets us see how much
+# smaller sharing them makes the generated build files.
+_unshared_script = """
+import sys
+from bfg9000 import driver
+from bfg9000.backends.make.syntax import Makefile
+from bfg9000.backends.ninja.syntax import NinjaFile
+
+def shared_variable(self, name, value, section=None):
+    return value
+
+Makefile.shared_variable = NinjaFile.shared_variable = shared_variable
+sys.argv[0] = 'bfg9000'
+sys.exit(driver.main())
+"""
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(base, f))
+               for base, dirs, files in os.walk(path) for f in files)
+
+
+def _run(args, env):
+    # Send stderr to a file so that a noisy child can't fill up a pipe and
+    # block while we're waiting on it.
+    with tempfile.TemporaryFile('w+') as stderr:
+        start = time.perf_counter()
+        proc = subprocess.Popen(args, env=env, stdout=subprocess.DEVNULL,
+                                stderr=stderr)
+        if resource and hasattr(os, 'wait4'):
+            # Use wait4 so that we get the peak RSS of this process alone, not
+            # the max of all the children we've ever run.
+            _, status, usage = os.wait4(proc.pid, 0)
+            returncode = os.WEXITSTATUS(status)
+            scale = 1 if sys.platform == 'darwin' else 1024
+            peak_rss = usage.ru_maxrss * scale
+        else:  # pragma: no cover
+            returncode = proc.wait()
+            peak_rss = None
+        wall_time = time.perf_counter() - start
+
+        if returncode != 0:
+            stderr.seek(0)
+            raise RuntimeError('command failed: {}\n{}'.format(
+                ' '.join(args), stderr.read()
+            ))
+    return wall_time, peak_rss
+
+
+def _phases(profile):
+    # Get the time spent in each phase of configuration, e.g. executing the
+    # build scripts ("configure_build") and writing the build files ("write").
+    with open(profile) as f:
+        summary = json.load(f)['otherData']['summary']
+    return {name: i['total_ms'] / 1000
+            for name, i in summary.get('phase', {}).items()}
+
+
+def run_benchmark(bfg9000, backend, shape, workdir, repeat=1,
+                  compare_shared=False):
+    srcdir = os.path.join(workdir, 'src')
+    builddir = os.path.join(workdir, 'build')
+    bindir = os.path.join(workdir, 'bin')
+    profile = os.path.join(workdir, 'profile.json')
+
+    generate_project(srcdir, shape)
+    env = dict(os.environ)
+    env.update(write_fake_tools(bindir, _toolchains[backend]))
+    env['PATH'] = bindir + os.pathsep + env.get('PATH', '')
+
+    configure_args = ['configure-into', '--backend=' + backend,
+                      '--no-probe-cache', '--profile=' + profile, srcdir,
+                      builddir]
+
+    runs = []
+    for i in range(repeat):
+        shutil.rmtree(builddir, ignore_errors=True)
+        wall_time, peak_rss = _run(bfg9000 + configure_args, env)
+        runs.append({'wall_time': wall_time, 'peak_rss': peak_rss,
+                     'phases': _phases(profile)})
+    output_size = _dir_size(builddir)
+
+    result = {
+        'backend': backend,
+        'shape': shape.to_json(),
+        'runs': runs,
+        'wall_time': min(i['wall_time'] for i in runs),
+        'peak_rss': max((i['peak_rss'] or 0) for i in runs) or None,
+        'phases': {k: min(i['phases'][k] for i in runs)
+                   for k in runs[0]['phases']},
+        'output_size': output_size,
+    }
+
+    if compare_shared:
+        shutil.rmtree(builddir, ignore_errors=True)
+        _run([sys.executable, '-c', _unshared_script] + configure_args, env)
+        result['output_size_unshared'] = _dir_size(builddir)
+    return result
+
+
+def main():
+    defaults = ProjectShape()
+
+    parser = argparse.ArgumentParser(prog='python -m test.benchmark',
+                                     description=description)
+    parser.add_argument('--backend', action='append', dest='backends',
+                        choices=list(_toolchains),
+                        help=('backend to benchmark (may be passed multiple ' +
+                              'times; default: all installed backends that ' +
+                              'work on this platform)'))
+    for name in ProjectShape._fields:
+        parser.add_argument('--' + name, type=int, action='append',
+                            metavar='N',
+                            help=('{} (may be passed multiple times; ' +
+                                  'default: {})').format(
+                                      name, getattr(defaults, name)
+                                  ))
+    parser.add_argument('--repeat', type=int, default=3, metavar='N',
+                        help='number of runs of each benchmark ' +
+                        '(default: %(default)s)')
+    parser.add_argument('--bfg9000', default='bfg9000', metavar='CMD',
+                        help='bfg9000 command to run (default: %(default)s)')
+    parser.add_argument('--compare-shared-variables', action='store_true',
+                        help=('also report the size of the build files when ' +
+                              'flags aren\'t shared between build steps ' +
+                              '(this run ignores --bfg9000 and imports ' +
+                              'bfg9000 into this Python)'))
+    parser.add_argument('-o', '--output', metavar='FILE',
+                        help='file to write results to (default: stdout)')
+    args = parser.parse_args()
+
+    # Run every combination of the shape parameters that were passed.
+    shapes = [defaults]
+    for name in ProjectShape._fields:
+        values = getattr(args, name)
+        if values:
+            shapes = [i._replace(**{name: v}) for i in shapes for v in values]
+
+    skipped = []
+    if args.backends:
+        backends = args.backends
+    else:
+        is_windows = platform_info().family == 'windows'
+        backends = []
+        for i in _toolchains:
+            if i not in list_backends():
+                continue
+            if i in _windows_backends and not is_windows:
+                skipped.append(i)
+            else:
+                backends.append(i)
+
+    results = {'version': version, 'benchmarks': [], 'skipped': skipped}
+    for backend in skipped:
+        print('skipping {} benchmarks: only supported on Windows'
+              .format(backend), file=sys.stderr)
+    for backend in backends:
+        for shape in shapes:
+            with tempfile.TemporaryDirectory() as workdir:
+                results['benchmarks'].append(run_benchmark(
+                    args.bfg9000.split(), backend, shape, workdir, args.repeat,
+                    args.compare_shared_variables
+                ))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
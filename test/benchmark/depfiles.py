@@ -0,0 +1,108 @@
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+description = """
+Measure the per-file overhead of making GCC-style depfiles usable by Make:
+either running `bfg9000-depfixer` after each compilation or passing `-MP` to
+the compiler. Each run compiles a set of synthetic source files that all
+include the same headers, and the results are printed as JSON.
+"""
+
+_modes = ('none', 'depfixer', 'phony')
+
+
+def _write_tree(base, sources, headers):
+    incdir = os.path.join(base, 'include')
+    os.mkdir(incdir)
+    for i in range(headers):
+        with open(os.path.join(incdir, 'header{}.h'.format(i)), 'w') as f:
+            f.write('int header{}(void);\n'.format(i))
+
+    srcs = []
+    for i in range(sources):
+        src = os.path.join(base, 'file{}.c'.format(i))
+        with open(src, 'w') as f:
+            for j in range(headers):
+                f.write('#include "header{}.h"\n'.format(j))
+            f.write('int file{}(void) {{ return 0; }}\n'.format(i))
+        srcs.append(src)
+    return incdir, srcs
+
+
+def _commands(mode, compiler, depfixer, incdir, src):
+    obj = src[:-2] + '.o'
+    deps = obj + '.d'
+    cmd = compiler + ['-I' + incdir, '-c', src, '-MMD', '-MF', deps]
+    if mode == 'phony':
+        cmd.append('-MP')
+    cmd.extend(['-o', obj])
+
+    # Run each step via the shell, since that's what Make would do.
+    cmds = [' '.join(shlex.quote(i) for i in cmd)]
+    if mode == 'depfixer':
+        cmds.append(' '.join(shlex.quote(i) for i in depfixer) +
+                    ' < {0} >> {0}'.format(shlex.quote(deps)))
+    return cmds
+
+
+def run_benchmark(mode, compiler, depfixer, sources, headers, repeat=1):
+    runs = []
+    with tempfile.TemporaryDirectory() as base:
+        incdir, srcs = _write_tree(base, sources, headers)
+        cmds = [_commands(mode, compiler, depfixer, incdir, i) for i in srcs]
+        for i in range(repeat):
+            start = time.perf_counter()
+            for steps in cmds:
+                for step in steps:
+                    subprocess.run(step, shell=True, check=True)
+            runs.append(time.perf_counter() - start)
+    return min(runs) / sources
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m test.benchmark.depfiles',
+                                     description=description)
+    parser.add_argument('--mode', action='append', dest='modes',
+                        choices=_modes,
+                        help=('how to handle depfiles (may be passed ' +
+                              'multiple times; default: all)'))
+    parser.add_argument('--compiler', default=os.environ.get('CC', 'cc'),
+                        metavar='CMD',
+                        help='C compiler to use (default: %(default)s)')
+    parser.add_argument('--depfixer',
+                        default=os.environ.get('DEPFIXER',
+                                               'bfg9000-depfixer'),
+                        metavar='CMD',
+                        help='depfixer to use (default: %(default)s)')
+    parser.add_argument('--sources', type=int, default=100, metavar='N',
+                        help='number of source files (default: %(default)s)')
+    parser.add_argument('--headers', type=int, default=50, metavar='N',
+                        help=('number of headers each file includes ' +
+                              '(default: %(default)s)'))
+    parser.add_argument('--repeat', type=int, default=3, metavar='N',
+                        help='number of runs of each benchmark ' +
+                        '(default: %(default)s)')
+    args = parser.parse_args()
+
+    compiler = shlex.split(args.compiler)
+    depfixer = shlex.split(args.depfixer)
+
+    results = []
+    for mode in args.modes or _modes:
+        per_file = run_benchmark(mode, compiler, depfixer, args.sources,
+                                 args.headers, args.repeat)
+        results.append(dict(mode=mode, sources=args.sources,
+                            headers=args.headers, per_file=per_file))
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import json
+import sys
+import time
+from io import BytesIO
+
+from bfg9000 import depfixer
+
+description = """
+Measure how long `bfg9000-depfixer` takes to parse large depfiles, like those
+generated for code that includes Boost or Qt headers, and print the results as
+JSON. By default, this uses a synthetic depfile; pass `--file` to use real ones
+instead.
+"""
+
+_dirs = ['/usr/include/boost/{}/detail/'.format(i) for i in (
+    'fusion', 'mpl', 'preprocessor', 'type_traits', 'spirit/home/qi'
+)] + ['/opt/Qt/6.5.0/gcc_64/include/Qt{}/'.format(i) for i in (
+    'Core', 'Gui', 'Widgets'
+)] + ['/home/user/My Projects/include/']
+
+
+def synthetic_depfile(deps):
+    out = BytesIO()
+    out.write(b'obj/src/file.cpp.o: /home/user/src/file.cpp')
+    for i in range(deps):
+        dep = '{}header_{}.hpp'.format(_dirs[i % len(_dirs)], i)
+        out.write(b' \\\n  ' + dep.replace(' ', '\\ ').encode())
+    out.write(b'\n')
+    return out.getvalue()
+
+
+def run_benchmark(data, repeat=1):
+    runs = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        depfixer.emit_deps(BytesIO(data), BytesIO())
+        runs.append(time.perf_counter() - start)
+    return min(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m test.benchmark.depfixer',
+                                     description=description)
+    parser.add_argument('--file', action='append', dest='files',
+                        metavar='FILE',
+                        help=('depfile to parse (may be passed multiple ' +
+                              'times)'))
+    parser.add_argument('--deps', type=int, default=3000, metavar='N',
+                        help=('number of dependencies in the synthetic ' +
+                              'depfile (default: %(default)s)'))
+    parser.add_argument('--repeat', type=int, default=10, metavar='N',
+                        help='number of runs of each benchmark ' +
+                        '(default: %(default)s)')
+    args = parser.parse_args()
+
+    if args.files:
+        inputs = []
+        for i in args.files:
+            with open(i, 'rb') as f:
+                inputs.append((i, f.read()))
+    else:
+        inputs = [('synthetic', synthetic_depfile(args.deps))]
+
+    results = []
+    for name, data in inputs:
+        seconds = run_benchmark(data, args.repeat)
+        results.append(dict(file=name, size=len(data), seconds=seconds,
+                            mb_per_second=len(data) / seconds / 1e6))
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import os
+import stat
+
+__all__ = ['write_fake_tools']
+
+# These scripts stand in for a real toolchain so that benchmarks can run
+# offline (and quickly) on any machine. They only need to answer the probes
+# bfg9000 makes while configuring a build; none of them ever compile anything.
+
+_gcc_script = """\
+#!/bin/sh
+for i in "$@"; do
+  case "$i" in
+    --version)
+      echo "gcc (GCC) 10.2.0"
+      echo "Copyright (C) 2020 Free Software Foundation, Inc."
+      exit 0 ;;
+    -Wl,--version)
+      echo "{bindir}/ld --version" >&2
+      exit 0 ;;
+    -print-sysroot)
+      echo "/"
+      exit 0 ;;
+    -print-search-dirs)
+      echo "libraries: =/usr/lib"
+      exit 0 ;;
+  esac
+done
+exit 0
+"""
+
+_ld_script = """\
+#!/bin/sh
+echo 'SEARCH_DIR("=/usr/lib")'
+"""
+
+_ar_script = """\
+#!/bin/sh
+echo "GNU ar (GNU Binutils) 2.35"
+"""
+
+_cl_script = """\
+#!/bin/sh
+echo "Microsoft (R) C/C++ Optimizing Compiler Version 19.28.29334 for x64"
+"""
+
+_pkg_config_script = """\
+#!/bin/sh
+name=
+for i in "$@"; do
+  case "$i" in
+    -*) ;;
+    *) name="$i" ;;
+  esac
+done
+
+case "$name" in
+  *-uninstalled) exit 1 ;;
+esac
+
+for i in "$@"; do
+  case "$i" in
+    --modversion) echo "1.0" ;;
+    --variable=pcfiledir) echo "/opt/$name/lib/pkgconfig" ;;
+    --cflags) echo "-I/opt/$name/include" ;;
+    --libs-only-L) echo "-L/opt/$name/lib" ;;
+    --libs-only-l) echo "-l$name" ;;
+  esac
+done
+exit 0
+"""
+
+_toolchains = {
+    'cc': {
+        'gcc': _gcc_script, 'g++': _gcc_script, 'ld': _ld_script,
+        'ar': _ar_script,
+    },
+    'msvc': {
+        'cl': _cl_script, 'link': '#!/bin/sh\n', 'lib': '#!/bin/sh\n',
+    },
+}
+
+_variables = {
+    'cc': {'CC': 'gcc', 'CXX': 'g++'},
+    'msvc': {'CC': 'cl', 'CXX': 'cl'},
+}
+
+
+def _write_script(path, data):
+    with open(path, 'w') as f:
+        f.write(data)
+    mode = os.stat(path).st_mode
+    os.chmod(path, mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def write_fake_tools(bindir, toolchain='cc'):
+    """Write fake tools for `toolchain` (either 'cc' or 'msvc') to `bindir`
+    and return the environment variables needed to use them."""
+
+    os.makedirs(bindir, exist_ok=True)
+    scripts = dict(_toolchains[toolchain], **{
+        'pkg-config': _pkg_config_script,
+    })
+    for name, data in scripts.items():
+        _write_script(os.path.join(bindir, name),
+                      data.replace('{bindir}', bindir))
+
+    return dict(_variables[toolchain], PKG_CONFIG='pkg-config')
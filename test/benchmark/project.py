@@ -0,0 +1,96 @@
+import os
+from collections import namedtuple
+
+__all__ = ['generate_project', 'ProjectShape']
+
+
+class ProjectShape(namedtuple('ProjectShape', [
+    'sources', 'libraries', 'depth', 'globs', 'packages', 'tests'
+])):
+    """The shape of a synthetic project: `sources` source files for each
+    executable and library, `libraries` libraries per module, submodules
+    nested `depth` levels deep, `globs` calls to `find_files()` per module,
+    `packages` pkg-config packages, and `tests` tests per module."""
+
+    def __new__(cls, sources=10, libraries=2, depth=1, globs=1, packages=1,
+                tests=1):
+        return super().__new__(cls, sources, libraries, depth, globs,
+                               packages, tests)
+
+    def to_json(self):
+        return self._asdict()
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(data)
+
+
+def _write_sources(path, prefix, count):
+    names = []
+    for i in range(count):
+        name = '{}{}.cpp'.format(prefix, i)
+        _write(os.path.join(path, name), (
+            '#include "common.hpp"\n' +
+            'int {}{}() {{ return {}; }}\n'.format(prefix, i, i)
+        ))
+        names.append(name)
+    return names
+
+
+def _generate_module(path, shape, level):
+    _write(os.path.join(path, 'include', 'common.hpp'), '#pragma once\n')
+    lines = ['# -*- python -*-', '',
+             "inc = header_directory('include')",
+             'pkgs = [package(i) for i in {!r}]'.format(
+                 ['pkg{}'.format(i) for i in range(shape.packages)]
+             )]
+
+    # Submodules are nested, so each module (besides the deepest one) has one
+    # child submodule whose exported libraries we link to.
+    if level < shape.depth:
+        _generate_module(os.path.join(path, 'sub'), shape, level + 1)
+        lines.append("sub = submodule('sub')")
+        lines.append("libs = sub['libs']")
+    else:
+        lines.append('libs = []')
+
+    for i in range(shape.libraries):
+        srcdir = 'lib{}'.format(i)
+        files = _write_sources(os.path.join(path, srcdir),
+                               'lib{}_'.format(i), shape.sources)
+        lines.append(
+            'libs.append(library({!r}, files=[{}], includes=[inc], '
+            'packages=pkgs))'.format(
+                srcdir, ', '.join(repr(srcdir + '/' + f) for f in files)
+            )
+        )
+
+    # Each glob searches its own directory so that the results are disjoint.
+    for i in range(shape.globs):
+        srcdir = 'glob{}'.format(i)
+        _write_sources(os.path.join(path, srcdir), 'glob{}_'.format(i),
+                       shape.sources)
+        lines.append(
+            "executable({0!r}, files=find_files({0!r}, '*.cpp'), "
+            'includes=[inc], libs=libs, packages=pkgs)'.format(srcdir)
+        )
+
+    for i in range(shape.tests):
+        srcdir = 'test{}'.format(i)
+        files = _write_sources(os.path.join(path, srcdir),
+                               'test{}_'.format(i), 1)
+        lines.append(
+            'test(executable({!r}, files=[{!r}], includes=[inc], '
+            'libs=libs))'.format(srcdir, srcdir + '/' + files[0])
+        )
+
+    if level > 0:
+        lines.append('export(libs=libs)')
+    _write(os.path.join(path, 'build.bfg'), '\n'.join(lines) + '\n')
+
+
+def generate_project(path, shape):
+    """Generate a synthetic project with the given `shape` in `path`."""
+    _generate_module(path, shape, 0)
@@ -0,0 +1,85 @@
+import argparse
+import json
+import sys
+import time
+from io import StringIO
+
+from bfg9000.backends.make import syntax as make
+from bfg9000.backends.ninja import syntax as ninja
+from bfg9000.path import Path, Root
+
+description = """
+Measure how long each backend's build file takes to write a large synthetic
+graph where every build step shares the same set of headers, with and without
+caching how paths are rendered, and print the results as JSON.
+"""
+
+
+def _make_ninja(sources, headers):
+    buildfile = ninja.NinjaFile('build.bfg')
+    buildfile.rule('cc', ['cc', ninja.var('in'), '-o', ninja.var('out')])
+    for src, obj in sources:
+        buildfile.build(obj, 'cc', inputs=src, implicit=headers)
+    return buildfile
+
+
+def _make_make(sources, headers):
+    buildfile = make.Makefile('build.bfg')
+    for src, obj in sources:
+        buildfile.rule(obj, deps=[src] + headers,
+                       recipe=[['cc', src, '-o', obj]])
+    return buildfile
+
+
+_backends = {'ninja': _make_ninja, 'make': _make_make}
+
+
+def run_benchmark(backend, sources, headers, cache, repeat=1):
+    headers = [Path('include/header{}.hpp'.format(i), Root.srcdir)
+               for i in range(headers)]
+    sources = [(Path('src/file{}.cpp'.format(i), Root.srcdir),
+                Path('obj/file{}.o'.format(i))) for i in range(sources)]
+
+    runs = []
+    for i in range(repeat):
+        buildfile = _backends[backend](sources, headers)
+        if not cache:
+            buildfile._path_cache = None
+
+        start = time.perf_counter()
+        buildfile.write(StringIO())
+        runs.append(time.perf_counter() - start)
+    return min(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m test.benchmark.write',
+                                     description=description)
+    parser.add_argument('--backend', action='append', dest='backends',
+                        choices=list(_backends),
+                        help=('backend to benchmark (may be passed multiple ' +
+                              'times; default: all)'))
+    parser.add_argument('--sources', type=int, default=5000, metavar='N',
+                        help='number of build steps (default: %(default)s)')
+    parser.add_argument('--headers', type=int, default=50, metavar='N',
+                        help=('number of headers each step depends on ' +
+                              '(default: %(default)s)'))
+    parser.add_argument('--repeat', type=int, default=3, metavar='N',
+                        help='number of runs of each benchmark ' +
+                        '(default: %(default)s)')
+    args = parser.parse_args()
+
+    results = []
+    for backend in args.backends or list(_backends):
+        times = {('cached' if cache else 'uncached'): run_benchmark(
+            backend, args.sources, args.headers, cache, args.repeat
+        ) for cache in (False, True)}
+        results.append(dict(backend=backend, sources=args.sources,
+                            headers=args.headers, **times))
+
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
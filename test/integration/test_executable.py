@@ -24,11 +24,13 @@ class TestExecutable(IntegrationTest):
 
         self.clean()
         files = {
-            'ninja': {'.bfg_environ', '.ninja_deps', '.ninja_log',
-                      'build.ninja'},
-            'make': {'.bfg_environ', 'Makefile', pjoin('simple.int', '.dir')},
+            'ninja': {'.bfg_environ', '.bfg_fingerprint', '.bfg_probe_cache',
+                      '.ninja_deps', '.ninja_log', 'build.ninja'},
+            'make': {'.bfg_environ', '.bfg_fingerprint', '.bfg_probe_cache',
+                     'Makefile', 'Makefile.stamp',
+                     pjoin('simple.int', '.dir')},
             'msbuild': {
-                '.bfg_environ', '.bfg_uuid', 'simple.sln',
+                '.bfg_environ', '.bfg_probe_cache', '.bfg_uuid', 'simple.sln',
                 pjoin('simple', 'simple.vcxproj'),
                 pjoin('simple', 'Default', 'simple.Build.CppClean.log')
             },
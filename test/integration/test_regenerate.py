@@ -1,4 +1,4 @@
-import os.path
+import os
 import shutil
 
 from . import *
@@ -60,6 +60,18 @@ class TestRegenerateGlob(IntegrationTest):
         self.assertOutput([executable('goodbye')],
                           'Goodbye!\nAuf Wiedersehen!\nAu revoir!\n')
 
+    def test_add_unmatched_file(self):
+        # Regenerating the build always rewrites the environment file.
+        envfile = pjoin(self.builddir, '.bfg_environ')
+        mtime = os.path.getmtime(envfile)
+
+        self.wait()
+        with open(pjoin(self.srcdir, 'src', 'hello', 'notes.txt'), 'w'):
+            pass
+
+        self.build(executable('hello'))
+        self.assertEqual(os.path.getmtime(envfile), mtime)
+
     def test_remove_file(self):
         self.wait()
         os.unlink(pjoin(self.srcdir, 'src', 'hello', 'hello.cpp'))
@@ -0,0 +1,95 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+from . import *
+
+# Run bfg9000's driver and report which of the given modules it imported.
+run_driver = """
+import json, sys
+from bfg9000 import driver
+
+modules, sys.argv = json.loads(sys.argv[1]), ['bfg9000'] + sys.argv[2:]
+try:
+    driver.main()
+except SystemExit:
+    pass
+print(json.dumps([i for i in modules if i in sys.modules]))
+"""
+
+
+class TestStartup(TestCase):
+    # The total time we're willing to spend importing the driver, in
+    # microseconds. On a typical machine this takes well under 100ms, about a
+    # quarter of which is spent importing `packaging`; this leaves some room
+    # for slow CI machines.
+    import_budget = 150000
+
+    # Modules that are too slow to import on every run of bfg9000.
+    slow_modules = ['importlib.metadata', 'importlib_metadata',
+                    'pkg_resources']
+
+    # Modules that commands which don't create a build shouldn't need.
+    unneeded_modules = slow_modules + ['bfg9000.backends.msbuild']
+
+    # Take the fastest of a few runs to filter out noise from the machine.
+    runs = 3
+
+    def setUp(self):
+        # Make sure we have bytecode for everything, even if the environment
+        # doesn't want it written alongside the source, so that we don't end
+        # up timing the compiler.
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.env = dict(os.environ, PYTHONPYCACHEPREFIX=self.cache_dir.name)
+        self.env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def _import_times(self, module):
+        output = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            universal_newlines=True, check=True, env=self.env
+        ).stderr
+
+        result = {}
+        for line in output.splitlines():
+            m = re.match(r'import time:\s*(\d+) \|\s*(\d+) \| (\s*)(\S+)$',
+                         line)
+            if m:
+                result[m.group(4)] = int(m.group(2))
+        return result
+
+    def import_times(self, module):
+        self._import_times(module)
+        runs = [self._import_times(module) for i in range(self.runs)]
+        return {k: min(i[k] for i in runs if k in i) for k in runs[0]}
+
+    def test_import_time(self):
+        times = self.import_times('bfg9000.driver')
+        for i in self.slow_modules:
+            self.assertNotIn(i, times)
+        self.assertLess(times['bfg9000.driver'], self.import_budget)
+
+    def run_driver(self, *args):
+        output = subprocess.run(
+            [sys.executable, '-c', run_driver,
+             json.dumps(self.unneeded_modules)] + list(args),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True, check=True, env=self.env
+        ).stdout
+        return json.loads(output.splitlines()[-1])
+
+    def test_version(self):
+        self.assertEqual(self.run_driver('--version'), [])
+
+    def test_refresh_unchanged(self):
+        srcdir = os.path.join(examples_dir, '01_executable')
+        builddir = os.path.join(self.cache_dir.name, 'build')
+        self.run_driver('configure-into', srcdir, builddir)
+        self.assertEqual(self.run_driver('refresh', '--if-changed', builddir),
+                         [])
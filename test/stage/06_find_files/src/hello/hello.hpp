@@ -0,0 +1,6 @@
+#ifndef INC_HELLO_HPP
+#define INC_HELLO_HPP
+
+void say_hello();
+
+#endif
@@ -0,0 +1,5 @@
+#include "hello.hpp"
+
+int main() {
+  return 0;
+}
@@ -1,4 +1,5 @@
 from io import StringIO
+from unittest import mock
 
 from ... import *
 
@@ -7,6 +8,7 @@ from bfg9000 import safe_str
 from bfg9000.backends.make.syntax import *
 from bfg9000.file_types import File
 from bfg9000.platforms.host import platform_info
+from bfg9000.versioning import Version
 
 esc_colon = ':' if platform_info().family == 'windows' else '\\:'
 
@@ -392,6 +394,24 @@ class TestWritePath(PathTestCase):
         self.assertEqual(out.stream.getvalue(),
                          self.ospath.join('$(srcdir)', 'foo'))
 
+    def test_cache(self):
+        cache = {}
+        p = self.Path('foo bar', path.Root.srcdir)
+        out = Writer(StringIO(), path_cache=cache)
+        with mock.patch.object(self.Path, 'realize',
+                               wraps=p.realize) as mrealize:
+            out.write(p, Syntax.shell)
+            out.write_literal(' ')
+            Writer(out.stream, path_cache=cache).write(p, Syntax.shell)
+            out.write_literal(' ')
+            out.write(p, Syntax.target)
+        self.assertEqual(mrealize.call_count, 2)
+
+        pathstr = self.ospath.join('$(srcdir)', 'foo bar')
+        self.assertEqual(out.stream.getvalue(), ' '.join([
+            quoted(pathstr), quoted(pathstr), pathstr.replace(' ', '\\ ')
+        ]))
+
 
 class TestWriteInvalid(TestCase):
     def test_invalid_type(self):
@@ -476,6 +496,23 @@ class TestMakefile(TestCase):
         self.makefile._write_variable(out, var, ['command'])
         self.assertEqual(out.stream.getvalue(), 'CMD := command\n')
 
+    def test_shared_variable(self):
+        self.makefile.variable('FLAGS_0', 'taken')
+        var1 = self.makefile.shared_variable('FLAGS', ['-a', '-b'])
+        var2 = self.makefile.shared_variable('FLAGS', ['-c'])
+        self.assertEqual(var1, Variable('FLAGS_1'))
+        self.assertEqual(var2, Variable('FLAGS_2'))
+        self.assertEqual(self.makefile.shared_variable('FLAGS', ['-a', '-b']),
+                         var1)
+        self.assertEqual(self.makefile.shared_variable('OTHER', ['-a', '-b']),
+                         Variable('OTHER_0'))
+        self.assertEqual(self.makefile._global_variables[Section.other], [
+            (Variable('FLAGS_0'), 'taken'),
+            (Variable('FLAGS_1'), ['-a', '-b']),
+            (Variable('FLAGS_2'), ['-c']),
+            (Variable('OTHER_0'), ['-a', '-b']),
+        ])
+
     def test_rule(self):
         self.makefile.rule('target', variables={'name': 'value'},
                            recipe=['cmd'])
@@ -486,6 +523,15 @@ class TestMakefile(TestCase):
                          'target:\n'
                          '\tcmd\n\n')
 
+        self.makefile.rule('private-target', recipe=['cmd'],
+                           private_variables={'SHELL': ['my', 'shell']})
+        out = Writer(StringIO())
+        self.makefile._write_rule(out, self.makefile._rules[-1])
+        self.assertEqual(out.stream.getvalue(),
+                         'private-target: private SHELL := my shell\n'
+                         'private-target:\n'
+                         '\tcmd\n\n')
+
         self.makefile.rule('silent-target', recipe=[Silent('cmd')], phony=True)
         out = Writer(StringIO())
         self.makefile._write_rule(out, self.makefile._rules[-1])
@@ -506,6 +552,15 @@ class TestMakefile(TestCase):
         self.assertEqual(out.stream.getvalue(),
                          'empty-target:\n\n')
 
+        self.makefile.rule('empty-recipe', recipe=[])
+        out = Writer(StringIO())
+        self.makefile._write_rule(out, self.makefile._rules[-1])
+        self.assertEqual(out.stream.getvalue(),
+                         'empty-recipe: ;\n\n')
+
+        self.assertRaises(ValueError, self.makefile.rule,
+                          ['grouped1', 'grouped2'], grouped=True)
+
         # Test duplicate targets.
         self.assertRaises(ValueError, self.makefile.rule, 'target')
         self.assertRaises(ValueError, self.makefile.rule,
@@ -516,6 +571,43 @@ class TestMakefile(TestCase):
         # Test no targets.
         self.assertRaises(ValueError, self.makefile.rule, [])
 
+    def test_grouped_rule(self):
+        makefile = Makefile('build.bfg', Version('4.3'))
+        makefile.rule(['target1', 'target2'], deps=['dep'], recipe=['cmd'],
+                      grouped=True)
+        out = Writer(StringIO())
+        makefile._write_rule(out, makefile._rules[-1])
+        self.assertEqual(out.stream.getvalue(),
+                         'target1 target2 &: dep\n'
+                         '\tcmd\n\n')
+
+        makefile = Makefile('build.bfg', Version('4.2'))
+        self.assertRaises(ValueError, makefile.rule, ['target1', 'target2'],
+                          grouped=True)
+
+    def test_supports(self):
+        self.assertFalse(Makefile('build.bfg').supports('grouped_targets'))
+        self.assertFalse(Makefile('build.bfg', Version('4.2.1'))
+                         .supports('grouped_targets'))
+        self.assertTrue(Makefile('build.bfg', Version('4.3'))
+                        .supports('grouped_targets'))
+
+    def test_write_builtins(self):
+        def header(makefile):
+            out = StringIO()
+            makefile.write(out)
+            return out.getvalue().split('\n\n')[1] + '\n'
+
+        self.assertEqual(header(Makefile('build.bfg')),
+                         '.SUFFIXES:\n' + ', := ,\n')
+        self.assertEqual(header(Makefile('build.bfg', Version('4.3'))),
+                         'MAKEFLAGS += --no-builtin-variables\n' +
+                         ', := ,\n')
+        self.assertEqual(header(Makefile('build.bfg', fast=True)),
+                         '.SUFFIXES:\n' + ', := ,\n')
+        self.assertEqual(header(Makefile('build.bfg', Version('4.3'), True)),
+                         'MAKEFLAGS += -rR\n.SUFFIXES:\n' + ', := ,\n')
+
     def test_write(self):
         out = StringIO()
         self.makefile.write(out)
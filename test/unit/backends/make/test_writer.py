@@ -1,8 +1,15 @@
+import os
+from io import StringIO
 from unittest import mock
 
 from ... import *
 
-from bfg9000.backends.make.writer import version
+from bfg9000 import path, shell
+from bfg9000.backends.make.syntax import Makefile, var, Writer
+from bfg9000.backends.make.writer import (directory_deps, directory_rule,
+                                          multitarget_rule, response_file,
+                                          response_file_rule, version,
+                                          _version)
 from bfg9000.versioning import Version
 
 
@@ -15,12 +22,23 @@ def mock_bad_execute(*args, **kwargs):
 
 
 class TestMakeVersion(TestCase):
+    def setUp(self):
+        _version._reset()
+
     def test_good(self):
         with mock.patch('bfg9000.shell.which', return_value=['command']), \
              mock.patch('bfg9000.shell.execute',
                         return_value='GNU Make 1.23'):  # noqa
             self.assertEqual(version({}), Version('1.23'))
 
+    def test_cached(self):
+        with mock.patch('bfg9000.shell.which', return_value=['command']), \
+             mock.patch('bfg9000.shell.execute',
+                        return_value='GNU Make 1.23') as m:  # noqa
+            self.assertEqual(version({}), Version('1.23'))
+            self.assertEqual(version({}), Version('1.23'))
+        self.assertEqual(m.call_count, 1)
+
     def test_unrecognized_version(self):
         with mock.patch('bfg9000.shell.which', return_value=['command']), \
              mock.patch('bfg9000.shell.execute',
@@ -35,3 +53,134 @@ class TestMakeVersion(TestCase):
         with mock.patch('bfg9000.shell.which', return_value=['command']), \
              mock.patch('bfg9000.shell.execute', mock_bad_execute):  # noqa
             self.assertEqual(version({}), None)
+
+
+class TestMultitargetRule(TestCase):
+    def _write_rules(self, makefile):
+        out = Writer(StringIO())
+        for i in makefile._rules:
+            makefile._write_rule(out, i)
+        return out.stream.getvalue()
+
+    def test_single(self):
+        makefile = Makefile(None, Version('4.3'))
+        multitarget_rule(makefile, [path.Path('foo', path.Root.srcdir)],
+                         recipe=['cmd'])
+        self.assertEqual(self._write_rules(makefile),
+                         '$(srcdir)/foo:\n\tcmd\n\n')
+
+    def test_grouped(self):
+        makefile = Makefile(None, Version('4.3'))
+        multitarget_rule(makefile, [path.Path('foo', path.Root.srcdir),
+                                    path.Path('bar', path.Root.srcdir)],
+                         deps=['dep'], recipe=['cmd'])
+        self.assertEqual(self._write_rules(makefile),
+                         '$(srcdir)/foo $(srcdir)/bar &: dep\n\tcmd\n\n')
+
+    def test_stamp(self):
+        for make_version in [None, Version('4.2')]:
+            makefile = Makefile(None, make_version)
+            multitarget_rule(makefile, [path.Path('foo', path.Root.srcdir),
+                                        path.Path('bar', path.Root.srcdir)],
+                             deps=['dep'], recipe=['cmd'])
+            self.assertEqual(self._write_rules(makefile),
+                             '$(srcdir)/foo $(srcdir)/bar: ' +
+                             '$(srcdir)/foo.stamp\n\n' +
+                             '$(srcdir)/foo.stamp: dep\n' +
+                             "\tcmd\n\t@touch '$@'\n\n")
+
+    def test_restat_single(self):
+        makefile = Makefile(None, Version('4.3'))
+        multitarget_rule(makefile, [path.Path('foo', path.Root.srcdir)],
+                         deps=['dep'], recipe=['cmd'], restat=True)
+        self.assertEqual(self._write_rules(makefile),
+                         '$(srcdir)/foo: $(srcdir)/foo.stamp ;\n\n' +
+                         '$(srcdir)/foo.stamp: dep\n' +
+                         "\tcmd\n\t@touch '$@'\n\n")
+
+    def test_restat(self):
+        makefile = Makefile(None, Version('4.3'))
+        multitarget_rule(makefile, [path.Path('foo', path.Root.srcdir),
+                                    path.Path('bar', path.Root.srcdir)],
+                         deps=['dep'], recipe=['cmd'], restat=True)
+        self.assertEqual(self._write_rules(makefile),
+                         '$(srcdir)/foo $(srcdir)/bar &: ' +
+                         '$(srcdir)/foo.stamp ;\n\n' +
+                         '$(srcdir)/foo.stamp: dep\n' +
+                         "\tcmd\n\t@touch '$@'\n\n")
+
+
+class TestDirectoryDeps(TestCase):
+    def test_sentinels(self):
+        makefile = Makefile(None)
+        self.assertEqual(directory_deps(makefile, [
+            path.Path('file'), path.Path('dir/file1'), path.Path('dir/file2')
+        ]), [path.Path('dir/.dir')])
+        self.assertEqual(makefile.directories, set())
+
+    def test_fast(self):
+        makefile = Makefile(None, fast=True)
+        self.assertEqual(directory_deps(makefile, [
+            path.Path('file'), path.Path('dir/file1'), path.Path('dir/file2')
+        ]), [])
+        self.assertEqual(makefile.directories, {path.Path('dir')})
+
+
+class TestDirectoryRule(TestCase):
+    def test_sentinels(self):
+        env = make_env()
+        makefile = Makefile(None)
+        directory_deps(makefile, [path.Path('dir/file')])
+        with mock.patch('os.makedirs') as mmakedirs:
+            directory_rule(None, makefile, env)
+        mmakedirs.assert_not_called()
+        self.assertEqual(len(makefile._rules), 1)
+
+    def test_fast(self):
+        env = make_env()
+        makefile = Makefile(None, fast=True)
+        directory_deps(makefile, [path.Path('dir1/file'),
+                                  path.Path('dir2/file')])
+        with mock.patch('os.makedirs') as mmakedirs:
+            directory_rule(None, makefile, env)
+        mmakedirs.assert_has_calls([
+            mock.call(path.Path('dir1').string(env.base_dirs), exist_ok=True),
+            mock.call(path.Path('dir2').string(env.base_dirs), exist_ok=True),
+        ])
+        self.assertEqual(makefile._rules, [])
+
+
+class TestResponseFile(TestCase):
+    def test_response_file(self):
+        env = make_env()
+        makefile = Makefile(None)
+        files = [path.Path('dir/file.o'), path.Path('file 2.o')]
+        rspfile = response_file(makefile, path.Path('dir/out'), files)
+        self.assertEqual(rspfile, path.Path('dir/out.rsp'))
+        self.assertEqual(makefile.response_files, {rspfile: files})
+
+        out = StringIO()
+        with mock.patch('os.makedirs') as mmakedirs, \
+             mock.patch('bfg9000.path.write_if_changed') as mwrite:  # noqa
+            mwrite.return_value.__enter__.return_value = out
+            response_file_rule(None, makefile, env)
+        mmakedirs.assert_called_once_with(
+            path.Path('dir').string(env.base_dirs), exist_ok=True
+        )
+        mwrite.assert_called_once_with(rspfile.string(env.base_dirs))
+        self.assertEqual(out.getvalue(),
+                         shell.quote(os.path.join('dir', 'file.o')) + '\n' +
+                         shell.quote('file 2.o') + '\n')
+
+        rule = makefile._rules[-1]
+        self.assertEqual(rule.targets, [rspfile])
+        self.assertEqual(rule.recipe, [
+            [var('BFG9000'), 'refresh', path.Path('.')]
+        ])
+
+    def test_no_response_files(self):
+        makefile = Makefile(None)
+        with mock.patch('bfg9000.path.write_if_changed') as mwrite:
+            response_file_rule(None, makefile, make_env())
+        mwrite.assert_not_called()
+        self.assertEqual(makefile._rules, [])
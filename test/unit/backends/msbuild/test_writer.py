@@ -2,7 +2,7 @@ from unittest import mock
 
 from ... import *
 
-from bfg9000.backends.msbuild.writer import version
+from bfg9000.backends.msbuild.writer import version, _version
 from bfg9000.versioning import Version
 
 
@@ -15,12 +15,23 @@ def mock_bad_execute(*args, **kwargs):
 
 
 class TestMsBuildVersion(TestCase):
+    def setUp(self):
+        _version._reset()
+
     def test_good(self):
         with mock.patch('bfg9000.shell.which', return_value=['command']), \
              mock.patch('bfg9000.shell.execute',
                         return_value='MSBuild 1.23'):  # noqa
             self.assertEqual(version({}), Version('1.23'))
 
+    def test_cached(self):
+        with mock.patch('bfg9000.shell.which', return_value=['command']), \
+             mock.patch('bfg9000.shell.execute',
+                        return_value='MSBuild 1.23') as m:  # noqa
+            self.assertEqual(version({}), Version('1.23'))
+            self.assertEqual(version({}), Version('1.23'))
+        self.assertEqual(m.call_count, 1)
+
     def test_unrecognized_version(self):
         with mock.patch('bfg9000.shell.which', return_value=['command']), \
              mock.patch('bfg9000.shell.execute',
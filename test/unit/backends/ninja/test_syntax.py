@@ -1,4 +1,6 @@
+import os
 from io import StringIO
+from unittest import mock
 
 from ... import *
 
@@ -7,6 +9,7 @@ from bfg9000 import safe_str
 from bfg9000.backends.ninja.syntax import *
 from bfg9000.file_types import File
 from bfg9000.platforms.host import platform_info
+from bfg9000.versioning import Version
 
 quote_char = '"' if platform_info().family == 'windows' else "'"
 
@@ -173,6 +176,24 @@ class TestWritePath(PathTestCase):
         self.assertEqual(out.stream.getvalue(),
                          self.ospath.join('${srcdir}', 'foo'))
 
+    def test_cache(self):
+        cache = {}
+        p = self.Path('foo bar', path.Root.srcdir)
+        out = Writer(StringIO(), path_cache=cache)
+        with mock.patch.object(self.Path, 'realize',
+                               wraps=p.realize) as mrealize:
+            out.write(p, Syntax.shell)
+            out.write_literal(' ')
+            Writer(out.stream, path_cache=cache).write(p, Syntax.shell)
+            out.write_literal(' ')
+            out.write(p, Syntax.output)
+        self.assertEqual(mrealize.call_count, 2)
+
+        pathstr = self.ospath.join('${srcdir}', 'foo bar')
+        self.assertEqual(out.stream.getvalue(), ' '.join([
+            quoted(pathstr), quoted(pathstr), pathstr.replace(' ', '$ ')
+        ]))
+
 
 class TestWriteInvalid(TestCase):
     def test_invalid_type(self):
@@ -224,6 +245,23 @@ class TestNinjaFile(TestCase):
         self.ninjafile._write_variable(out, var, ['command'])
         self.assertEqual(out.stream.getvalue(), 'cmd = command\n')
 
+    def test_shared_variable(self):
+        self.ninjafile.variable('flags_0', 'taken')
+        var1 = self.ninjafile.shared_variable('flags', ['-a', '-b'])
+        var2 = self.ninjafile.shared_variable('flags', ['-c'])
+        self.assertEqual(var1, Variable('flags_1'))
+        self.assertEqual(var2, Variable('flags_2'))
+        self.assertEqual(self.ninjafile.shared_variable('flags', ['-a', '-b']),
+                         var1)
+        self.assertEqual(self.ninjafile.shared_variable('other', ['-a', '-b']),
+                         Variable('other_0'))
+        self.assertEqual(self.ninjafile._variables[Section.other], [
+            (Variable('flags_0'), 'taken'),
+            (Variable('flags_1'), ['-a', '-b']),
+            (Variable('flags_2'), ['-c']),
+            (Variable('other_0'), ['-a', '-b']),
+        ])
+
     def test_rule(self):
         self.ninjafile.rule('my_rule', ['cmd'])
         out = Writer(StringIO())
@@ -256,6 +294,18 @@ class TestNinjaFile(TestCase):
                          '  pool = console\n'
                          '  restat = 1\n')
 
+        self.ninjafile.rule('rsp_rule', ['cmd', '@' + var('rspfile')],
+                            rspfile=var('out') + '.rsp',
+                            rspfile_content=var('in'))
+        out = Writer(StringIO())
+        self.ninjafile._write_rule(out, 'rsp_rule',
+                                   self.ninjafile._rules['rsp_rule'])
+        self.assertEqual(out.stream.getvalue(),
+                         'rule rsp_rule\n'
+                         '  command = cmd @${rspfile}\n'
+                         '  rspfile = ${out}.rsp\n'
+                         '  rspfile_content = ${in}\n')
+
         # Test duplicate rules.
         self.assertRaises(ValueError, self.ninjafile.rule, 'my_rule', ['cmd'])
 
@@ -263,6 +313,35 @@ class TestNinjaFile(TestCase):
         self.assertRaises(ValueError, self.ninjafile.rule, 'my_rule!', ['cmd'])
         self.assertRaises(ValueError, self.ninjafile.rule, 'pool_rule',
                           ['cmd'], pool='pool')
+        self.assertRaises(ValueError, self.ninjafile.rule, 'rsp_rule2',
+                          ['cmd'], rspfile='out.rsp')
+
+    def test_pool(self):
+        self.assertEqual(self.ninjafile.pool('my_pool', 2), 'my_pool')
+        self.assertTrue(self.ninjafile.has_pool('my_pool'))
+        self.assertFalse(self.ninjafile.has_pool('other_pool'))
+
+        # Redeclaring a pool with the same depth is fine.
+        self.assertEqual(self.ninjafile.pool('my_pool', 2), 'my_pool')
+        self.assertRaises(ValueError, self.ninjafile.pool, 'my_pool', 4)
+
+        # Test invalid args.
+        self.assertRaises(ValueError, self.ninjafile.pool, 'my pool', 2)
+        self.assertRaises(ValueError, self.ninjafile.pool, 'console', 2)
+
+        self.ninjafile.rule('pool_rule', ['cmd'], pool='my_pool')
+        out = Writer(StringIO())
+        self.ninjafile._write_rule(out, 'pool_rule',
+                                   self.ninjafile._rules['pool_rule'])
+        self.assertEqual(out.stream.getvalue(),
+                         'rule pool_rule\n'
+                         '  command = cmd\n'
+                         '  pool = my_pool\n')
+
+        self.ninjafile.build('output', 'pool_rule',
+                             variables={'pool': 'my_pool'})
+        self.assertRaises(ValueError, self.ninjafile.build, 'output2',
+                          'pool_rule', variables={'pool': 'other_pool'})
 
     def test_build(self):
         self.ninjafile.rule('my_rule', ['cmd'])
@@ -299,6 +378,18 @@ class TestNinjaFile(TestCase):
         self.assertRaises(ValueError, self.ninjafile.build, 'output2',
                           'unknown_rule')
 
+    def test_dyndep(self):
+        self.ninjafile.rule('my_rule', ['cmd'])
+        self.ninjafile.build('output', 'my_rule', order_only='output.dd',
+                             variables={'dyndep': 'output.dd'})
+        self.assertEqual(self.ninjafile._min_version, Version('1.10'))
+
+        out = Writer(StringIO())
+        self.ninjafile._write_build(out, self.ninjafile._builds[-1])
+        self.assertEqual(out.stream.getvalue(),
+                         'build output: my_rule || output.dd\n'
+                         '  dyndep = output.dd\n')
+
     def test_write(self):
         out = StringIO()
         self.ninjafile.write(out)
@@ -322,3 +413,85 @@ class TestNinjaFile(TestCase):
             'build output: my_rule\n\n'
             'default output\n'
         )
+
+    def test_write_pool(self):
+        out = StringIO()
+        self.ninjafile.write(out)
+        base_ninjafile = out.getvalue()
+
+        out = StringIO()
+        self.ninjafile.pool('my_pool', 2)
+        self.ninjafile.rule('my_rule', ['cmd'])
+        self.ninjafile.build('output', 'my_rule',
+                             variables={'pool': 'my_pool'})
+        self.ninjafile.write(out)
+
+        self.assertEqual(
+            out.getvalue(),
+            base_ninjafile +
+            'pool my_pool\n'
+            '  depth = 2\n\n'
+            'rule my_rule\n'
+            '  command = cmd\n\n'
+            'build output: my_rule\n'
+            '  pool = my_pool\n\n'
+        )
+
+    def test_stream_builds(self):
+        self.ninjafile.rule('my_rule', ['cmd'])
+        self.ninjafile.build('output', 'my_rule')
+
+        stream = StringIO()
+        self.ninjafile.stream_builds(stream,
+                                     path.Path('edges.ninja',
+                                               path.Root.builddir))
+        self.ninjafile.build('output2', 'my_rule', inputs='output')
+        self.assertEqual(stream.getvalue(),
+                         'build output: my_rule\n\n'
+                         'build output2: my_rule output\n\n')
+        self.assertEqual(self.ninjafile._builds, [])
+
+        # Test duplicate targets.
+        self.assertRaises(ValueError, self.ninjafile.build, 'output',
+                          'my_rule')
+
+        out = StringIO()
+        self.ninjafile.default('output2')
+        self.ninjafile.write(out)
+        self.assertTrue(out.getvalue().endswith(
+            'rule my_rule\n'
+            '  command = cmd\n\n'
+            'include edges.ninja\n\n'
+            'default output2\n'
+        ))
+
+    def test_shard(self):
+        shard = path.Path('sub/build.ninja', path.Root.builddir)
+        self.ninjafile.rule('my_rule', ['cmd'])
+        self.ninjafile.add_shard(shard)
+        self.ninjafile.build('output', 'my_rule')
+        with self.ninjafile.shard(shard):
+            self.ninjafile.build('sub_output', 'my_rule', inputs='output')
+            with self.ninjafile.shard(None):
+                self.ninjafile.build('output2', 'my_rule')
+        self.assertEqual(self.ninjafile.shards(), [shard])
+
+        # Test duplicate targets across shards.
+        self.assertRaises(ValueError, self.ninjafile.build, 'sub_output',
+                          'my_rule')
+
+        out = StringIO()
+        self.ninjafile.write_shard(out, shard, 'sub/build.bfg')
+        self.assertEqual(out.getvalue().split('\n\n', 1)[1],
+                         'build sub_output: my_rule output\n\n')
+        self.assertIn('sub/build.bfg', out.getvalue())
+
+        out = StringIO()
+        self.ninjafile.write(out)
+        self.assertTrue(out.getvalue().endswith(
+            'rule my_rule\n'
+            '  command = cmd\n\n'
+            'subninja ' + os.path.join('sub', 'build.ninja') + '\n\n'
+            'build output: my_rule\n\n'
+            'build output2: my_rule\n\n'
+        ))
@@ -0,0 +1,47 @@
+from unittest import mock
+
+from .. import *
+
+from bfg9000 import backends
+from bfg9000.backends import default_backend, get_backend, list_backends
+
+
+def mock_backend(priority, version):
+    return mock.Mock(priority=priority,
+                     version=mock.Mock(return_value=version))
+
+
+class TestBackends(TestCase):
+    def setUp(self):
+        list_backends._reset()
+
+    def tearDown(self):
+        list_backends._reset()
+
+    def test_list_backends(self):
+        with mock.patch('bfg9000.shell.execute') as m:
+            self.assertIn('make', list_backends())
+            self.assertIn('ninja', list_backends())
+        m.assert_not_called()
+
+    def test_get_backend(self):
+        with mock.patch('bfg9000.plugins._metadata_entry_points') as m:
+            self.assertEqual(get_backend('make').__name__,
+                             'bfg9000.backends.make.writer')
+        m.assert_not_called()
+        self.assertRaises(KeyError, get_backend, 'nonexist')
+
+    def test_default_backend(self):
+        low = mock_backend(1, '1.0')
+        high = mock_backend(2, '1.0')
+        with mock.patch.object(backends, 'list_backends', return_value={
+            'high': high, 'low': low,
+        }):
+            self.assertEqual(default_backend(), 'high')
+            low.version.assert_not_called()
+
+            high.version.return_value = None
+            self.assertEqual(default_backend(), 'low')
+
+            low.version.return_value = None
+            self.assertEqual(default_backend(), 'high')
@@ -1,11 +1,13 @@
 from unittest import mock
 
-from .common import AttrDict, BuiltinTest, TestCase
+from .common import AlwaysEqual, AttrDict, BuiltinTest, TestCase
 from bfg9000 import file_types
 from bfg9000.builtins import command as _command
 from bfg9000.builtins.command import Placeholder
+from bfg9000.backends.make import syntax as make
 from bfg9000.path import Path, Root
-from bfg9000.safe_str import literal, jbos
+from bfg9000.shell import shell_list
+from bfg9000.safe_str import literal, jbos, shell_literal as lit
 
 
 class TestBaseCommand(BuiltinTest):
@@ -155,6 +157,19 @@ class TestCommand(TestBaseCommand):
             self.env.tool('python')(script)
         ], extra_deps=[script, dep])
 
+    def test_pool(self):
+        pool = self.context['pool']('heavy', 2)
+        result = self.context['command']('foo', cmd=['echo', 'foo'],
+                                         pool='heavy')
+        self.assertEqual(result.creator.pool, pool)
+
+        result = self.context['command']('bar', cmd=['echo', 'bar'],
+                                         pool=pool)
+        self.assertEqual(result.creator.pool, pool)
+
+        self.assertRaises(ValueError, self.context['command'], 'baz',
+                          cmd=['echo', 'baz'], pool='unknown')
+
     def test_cmd_and_cmds(self):
         self.assertRaises(ValueError, self.context['command'], 'foo',
                           cmd='echo foo', cmds=['echo bar'])
@@ -349,6 +364,31 @@ class TestBuildStep(TestBaseCommand):
         self.assertRaises(ValueError, self.context['build_step'],
                           'lex.yy.c', cmd=['lex', 'foo.lex'], type=lambda x: x)
 
+    def test_pool(self):
+        pool = self.context['pool']('heavy', 2)
+        result = self.context['build_step']('lex.yy.c', cmd=['lex'],
+                                            pool='heavy')
+        self.assertEqual(result.creator.pool, pool)
+
+    def test_restat(self):
+        result = self.context['build_step']('lex.yy.c', cmd=['lex'])
+        self.assertEqual(result.creator.restat, False)
+
+        result = self.context['build_step']('parse.c', cmd=['yacc'],
+                                            restat=True)
+        self.assertEqual(result.creator.restat, True)
+
+    def test_dyndep(self):
+        dd = self.context['build_step']('gen.dd', cmd=['scan'])
+        result = self.context['build_step']('gen.c', cmd=['gen'], dyndep=dd)
+        self.assertEqual(result.creator.dyndep, dd)
+        self.assertEqual(result.creator.extra_deps, [])
+
+        result = self.context['build_step']('gen2.c', cmd=['gen'],
+                                            dyndep='gen2.dd')
+        self.assertSameFile(result.creator.dyndep,
+                            file_types.File(Path('gen2.dd', Root.srcdir)))
+
     def test_cmd_and_cmds(self):
         self.assertRaises(ValueError, self.context['build_step'], 'foo',
                           cmd='echo foo', cmds=['echo bar'])
@@ -451,7 +491,53 @@ class TestMakeBackend(BuiltinTest):
         result = self.context['command']('foo', cmd=['echo', 'foo'])
         _command.make_command(result.creator, self.build, makefile, self.env)
         makefile.rule.assert_called_once_with(
-            result, [], [], [['echo', 'foo']], None, True
+            result, [], [], [['echo', 'foo']], None, True, None
+        )
+
+    def test_pool(self):
+        makefile = mock.Mock()
+        self.context['pool']('heavy', 2)
+        result = self.context['command']('foo', cmd=['echo', 'foo'],
+                                         pool='heavy')
+        _command.make_command(result.creator, self.build, makefile, self.env)
+        makefile.rule.assert_called_once_with(
+            result, [], [], [['echo', 'foo']], None, True, {
+                'SHELL': self.env.tool('pool')(Path('.heavy.pool'), 2,
+                                               ['/bin/sh'])
+            }
+        )
+
+    def test_restat(self):
+        makefile = mock.Mock()
+        result = self.context['build_step']('foo', cmd=['gen', 'foo'],
+                                            restat=True)
+        _command.make_command(result.creator, self.build, makefile, self.env)
+
+        restat = self.env.tool('restat')
+        state = Path('foo.restat')
+        stamp = Path('foo.stamp')
+        self.assertEqual(makefile.rule.mock_calls, [
+            mock.call(target=[result], deps=[stamp], recipe=[],
+                      grouped=False),
+            mock.call(stamp, [], [], AlwaysEqual(), None, False, None),
+        ])
+
+        recipe = makefile.rule.mock_calls[1][1][3]
+        self.assertEqual(recipe[0], shell_list(
+            restat('save', state, [result]) +
+            [lit('&&'), lit('('), 'gen', 'foo', lit(')'), lit('&&')] +
+            restat('restore', state)
+        ))
+        self.assertEqual(recipe[1].data, ['touch', make.qvar('@')])
+
+    def test_dyndep(self):
+        makefile = mock.Mock()
+        dd = self.context['build_step']('foo.dd', cmd=['scan'])
+        result = self.context['build_step']('foo', cmd=['gen', 'foo'],
+                                            dyndep=dd)
+        _command.make_command(result.creator, self.build, makefile, self.env)
+        makefile.rule.assert_called_once_with(
+            result, [], [dd], [['gen', 'foo']], None, False, None
         )
 
 
@@ -464,3 +550,52 @@ class TestNinjaBackend(BuiltinTest):
             output=[result], rule='command', inputs=[], implicit=['PHONY'],
             order_only=None, variables={'cmd': ['echo', 'foo']}
         )
+
+    def test_pool(self):
+        ninjafile = mock.Mock()
+        ninjafile.pool.return_value = 'heavy'
+        self.context['pool']('heavy', 2)
+        result = self.context['command']('foo', cmd=['echo', 'foo'],
+                                         pool='heavy')
+        _command.ninja_command(result.creator, self.build, ninjafile, self.env)
+        ninjafile.pool.assert_called_once_with('heavy', 2)
+        ninjafile.build.assert_called_once_with(
+            output=[result], rule='command', inputs=[], implicit=['PHONY'],
+            order_only=None, variables={'cmd': ['echo', 'foo'],
+                                        'pool': 'heavy'}
+        )
+
+    def test_restat(self):
+        ninjafile = mock.Mock()
+        result = self.context['build_step']('foo', cmd=['gen', 'foo'],
+                                            restat=True)
+        _command.ninja_command(result.creator, self.build, ninjafile, self.env)
+
+        restat = self.env.tool('restat')
+        state = Path('foo.restat')
+        ninjafile.build.assert_called_once_with(
+            output=[result], rule='command', inputs=[], implicit=[],
+            order_only=None, variables={
+                'cmd': shell_list(restat('save', state, [result]) +
+                                  [lit('&&'), lit('('), 'gen', 'foo',
+                                   lit(')'), lit('&&')] +
+                                  restat('restore', state)),
+                'description': 'build => foo',
+                'restat': '1',
+            }
+        )
+
+    def test_dyndep(self):
+        ninjafile = mock.Mock()
+        dd = self.context['build_step']('foo.dd', cmd=['scan'])
+        result = self.context['build_step']('foo', cmd=['gen', 'foo'],
+                                            dyndep=dd)
+        _command.ninja_command(result.creator, self.build, ninjafile, self.env)
+        ninjafile.build.assert_called_once_with(
+            output=[result], rule='command', inputs=[], implicit=[],
+            order_only=[dd], variables={
+                'cmd': ['gen', 'foo'],
+                'description': 'build => foo',
+                'dyndep': dd,
+            }
+        )
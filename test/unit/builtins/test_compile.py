@@ -263,6 +263,14 @@ class TestObjectFile(CompileTest):
         )
         self.assertEqual(result.creator.description, 'my description')
 
+    def test_pool(self):
+        pool = self.context['pool']('heavy', 2)
+        result = self.context['object_file'](file='main.cpp', pool='heavy')
+        self.assertEqual(result.creator.pool, pool)
+
+        self.assertRaises(ValueError, self.context['object_file'],
+                          file='main.cpp', pool='unknown')
+
 
 class TestPrecompiledHeader(CompileTest):
     class MockFile:
@@ -623,7 +631,7 @@ class TestMakeBackend(BuiltinTest):
             compile.make_compile(result.creator, self.build, makefile,
                                  self.env)
             mrule.assert_called_once_with(
-                result, [src], [], AlwaysEqual(), AlwaysEqual(), None
+                result, [src], [], AlwaysEqual(), AlwaysEqual(), None, None
             )
 
     def test_dir_sentinel(self):
@@ -637,7 +645,7 @@ class TestMakeBackend(BuiltinTest):
                                  self.env)
             mrule.assert_called_once_with(
                 result, [src], [Path('dir/.dir')], AlwaysEqual(),
-                AlwaysEqual(), None,
+                AlwaysEqual(), None, None
             )
 
     def test_extra_deps(self):
@@ -652,6 +660,7 @@ class TestMakeBackend(BuiltinTest):
                                  self.env)
             makefile.rule.assert_called_once_with(
                 result, [src, dep], [], AlwaysEqual(), AlwaysEqual(), None,
+                None
             )
 
     def test_local_options(self):
@@ -671,10 +680,37 @@ class TestMakeBackend(BuiltinTest):
              mock.patch('logging.log'):  # noqa
             compile.make_compile(result.creator, build, makefile, env)
             mrule.assert_called_once_with(result, [src], [], AlwaysEqual(), {
-                make.var('CXXFLAGS'): [make.var('GLOBAL_CXXFLAGS'), '/MTd']
-            }, None)
+                make.var('CXXFLAGS'): make.var('CXXFLAGS_0')
+            }, None, None)
             mvar.assert_any_call('GLOBAL_CXXFLAGS', ['/Zi'],
                                  make.Section.flags, True)
+            mvar.assert_any_call('CXXFLAGS_0',
+                                 [make.var('GLOBAL_CXXFLAGS'), '/MTd'],
+                                 make.Section.other)
+
+    def test_phony_deps(self):
+        makefile = make.Makefile(None)
+        result = self.context['object_file'](file='main.cpp')
+        compile.make_compile(result.creator, self.build, makefile, self.env)
+        name, recipe = makefile._defines[0]
+        self.assertEqual(name, make.var('RULE_CXX'))
+        self.assertEqual(len(recipe), 1)
+        self.assertEqual('-MP' in recipe[0],
+                         result.creator.compiler.supports_phony_deps)
+
+    def test_depfixer(self):
+        with mock.patch('bfg9000.shell.which', mock_which), \
+             mock.patch('bfg9000.shell.execute', mock_execute):  # noqa
+            result = self.context['generated_source'](file='file.qrc')
+
+        makefile = make.Makefile(None)
+        compile.make_compile(result.creator, self.build, makefile, self.env)
+        name, recipe = makefile._defines[0]
+        self.assertEqual(name, make.var('RULE_RCC'))
+        self.assertEqual(len(recipe), 2)
+        self.assertEqual(recipe[1].data, makefile._convert_args(
+            self.env.tool('depfixer')(make.qvar('@') + '.d')
+        ))
 
 
 class TestNinjaBackend(BuiltinTest):
@@ -722,9 +758,10 @@ class TestNinjaBackend(BuiltinTest):
             compile.ninja_compile(result.creator, build, ninjafile, env)
             mbuild.assert_called_once_with(
                 output=[result], rule='cxx', inputs=[src], implicit=[],
-                variables={ninja.var('cxxflags'): [
-                    ninja.var('global_cxxflags'), '/MTd'
-                ]},
+                variables={ninja.var('cxxflags'): ninja.var('cxxflags_0')},
             )
             mvar.assert_any_call('global_cxxflags', ['/Zi'],
                                  ninja.Section.flags, True)
+            mvar.assert_any_call('cxxflags_0',
+                                 [ninja.var('global_cxxflags'), '/MTd'],
+                                 ninja.Section.other)
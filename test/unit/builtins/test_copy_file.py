@@ -166,7 +166,7 @@ class TestMakeBackend(BuiltinTest):
         )
 
     def test_dir_sentinel(self):
-        makefile = mock.Mock()
+        makefile = mock.Mock(fast=False)
         src = self.context['generic_file']('dir/file.txt')
 
         result = self.context['copy_file'](file=src)
@@ -177,6 +177,18 @@ class TestMakeBackend(BuiltinTest):
             recipe=AlwaysEqual()
         )
 
+    def test_fast_dir(self):
+        makefile = mock.Mock(fast=True, directories=set())
+        src = self.context['generic_file']('dir/file.txt')
+
+        result = self.context['copy_file'](file=src)
+        _copy_file.make_copy_file(result.creator, self.build, makefile,
+                                  self.env)
+        makefile.rule.assert_called_once_with(
+            target=[result], deps=[src], order_only=[], recipe=AlwaysEqual()
+        )
+        self.assertEqual(makefile.directories, {Path('dir')})
+
     def test_extra_deps(self):
         makefile = mock.Mock()
         dep = self.context['generic_file']('dep.txt')
@@ -3,7 +3,7 @@ import traceback
 from unittest import mock
 
 from .common import BuiltinTest
-from bfg9000.builtins import core  # noqa
+from bfg9000.builtins import builtin, core  # noqa
 from bfg9000 import exceptions
 from bfg9000.path import Path, Root
 from bfg9000.safe_str import safe_str, safe_format
@@ -110,6 +110,20 @@ class TestCore(BuiltinTest):
             m.assert_called_once_with(self.context,
                                       Path('dir/sub/build.bfg', Root.srcdir))
 
+    def test_submodule_options(self):
+        def mock_execute(context, path):
+            return context.PathEntry(path)
+
+        context = builtin.OptionsContext(self.env, None)
+        context.path_stack.append(builtin.OptionsContext.PathEntry(
+            Path('options.bfg', Root.srcdir)
+        ))
+        with mock.patch('bfg9000.build.execute_file',
+                        mock.MagicMock(wraps=mock_execute)) as m:
+            self.assertEqual(context['submodule']('dir'), {})
+            m.assert_called_once_with(context,
+                                      Path('dir/options.bfg', Root.srcdir))
+
     def test_export(self):
         with self.context.push_path(Path('foo/build.bfg', Root.srcdir)) as p:
             self.context['export'](foo='foo')
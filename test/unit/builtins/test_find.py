@@ -1,3 +1,4 @@
+import json
 import os
 from contextlib import contextmanager
 from unittest import mock
@@ -7,6 +8,7 @@ from .common import BuiltinTest
 
 from bfg9000.builtins import find, regenerate  # noqa
 from bfg9000.file_types import Directory, File, HeaderDirectory, SourceFile
+from bfg9000.find_cache import FindCache
 from bfg9000.path import Path, Root
 from bfg9000.platforms import known_platforms
 
@@ -20,24 +22,55 @@ def srcpath(p):
     return Path(p, Root.srcdir)
 
 
-def mock_listdir(path):
+class MockDirEntry:
+    def __init__(self, name, is_dir, is_symlink=False):
+        self.name = name
+        self._is_dir = is_dir
+        self._is_symlink = is_symlink
+
+    def is_dir(self):
+        return self._is_dir
+
+    def is_symlink(self):
+        return self._is_symlink
+
+
+class MockScandir:
+    def __init__(self, entries):
+        self.entries = entries
+
+    def __enter__(self):
+        return iter(self.entries)
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+
+def mock_scandir(path, links=()):
     if os.path.basename(path) == 'dir':
-        return ['file2.txt']
-    return ['file.cpp', 'dir']
+        names = ['file2.txt']
+    else:
+        names = ['file.cpp', 'dir']
+    return MockScandir([MockDirEntry(i, not i.startswith('file'), i in links)
+                        for i in names])
 
 
-def mock_isdir(path, variables=None):
-    return not path.basename().startswith('file')
+def mock_deep_scandir(path):
+    names = {
+        'a': ['mid.cpp', 'x'],
+        'x': ['y.cpp', 'z'],
+        'z': ['w.cpp'],
+    }.get(os.path.basename(path), ['top.cpp', 'a'])
+    return MockScandir([MockDirEntry(i, not i.endswith('.cpp'))
+                        for i in names])
 
 
 @contextmanager
-def mock_context():
+def mock_context(scandir=mock_scandir):
     find = 'bfg9000.builtins.find'
-    with mock.patch('os.listdir', mock_listdir) as a, \
-         mock.patch(find + '.exists', return_value=True) as b, \
-         mock.patch(find + '.isdir', mock_isdir) as c, \
-         mock.patch(find + '.islink', return_value=False) as d:  # noqa
-        yield a, b, c, d
+    with mock.patch('os.scandir', scandir) as a, \
+         mock.patch(find + '.exists', return_value=True) as b:  # noqa
+        yield a, b
 
 
 class TestListdir(TestCase):
@@ -48,12 +81,22 @@ class TestListdir(TestCase):
             ))
 
     def test_not_found(self):
-        def mock_listdir(path):
+        def mock_scandir(path):
             raise OSError()
 
-        with mock.patch('os.listdir', mock_listdir):
+        with mock.patch('os.scandir', mock_scandir):
             self.assertEqual(find._listdir(Path('.'), path_vars), ([], []))
 
+    def test_bad_entry(self):
+        def mock_is_dir():
+            raise OSError()
+
+        entry = MockDirEntry('file.cpp', False)
+        entry.is_dir = mock_is_dir
+        with mock.patch('os.scandir', return_value=MockScandir([entry])):
+            self.assertEqual(find._listdir(Path('.'), path_vars),
+                             ([], [Path('file.cpp')]))
+
 
 class TestWalkFlat(TestCase):
     def test_exists(self):
@@ -82,62 +125,188 @@ class TestWalkRecursive(TestCase):
                              [])
 
     def test_link(self):
-        def mock_islink(path, variables=None):
-            return path.basename() == 'dir'
+        def mock_scandir_links(path):
+            return mock_scandir(path, links={'dir'})
 
-        with mock.patch('os.listdir', mock_listdir), \
-             mock.patch('bfg9000.builtins.find.exists', return_value=True), \
-             mock.patch('bfg9000.builtins.find.isdir', mock_isdir), \
-             mock.patch('bfg9000.builtins.find.islink', mock_islink):  # noqa
+        with mock.patch('os.scandir', mock_scandir_links), \
+             mock.patch('bfg9000.builtins.find.exists', return_value=True):  # noqa
             self.assertEqual(
                 list(find._walk_recursive(Path('.'), path_vars)),
                 [ (Path('.'), [Path('dir')], [Path('file.cpp')]) ]
             )
 
+    def test_order(self):
+        tree = {
+            '.': ['a', 'b', 'c'],
+            'a': ['a1', 'a2'],
+            'a/a1': [],
+            'a/a2': [],
+            'b': ['b1'],
+            'b/b1': [],
+            'c': [],
+        }
+
+        def mock_scandir(path):
+            return MockScandir([MockDirEntry(i, True) for i in tree[path]])
+
+        with mock.patch('os.scandir', mock_scandir), \
+             mock.patch('bfg9000.builtins.find.exists', return_value=True):  # noqa
+            self.assertEqual(
+                [i[0] for i in find._walk_recursive(Path('.'), path_vars)],
+                [Path(i) for i in ('.', 'a', 'a/a1', 'a/a2', 'b', 'b/b1', 'c')]
+            )
 
-class TestMakeFilterFromGlob(TestCase):
+    def test_prune(self):
+        tree = {
+            '.': ['a', 'b'],
+            'a': ['a1'],
+            'a/a1': [],
+            'b': ['b1'],
+            'b/b1': [],
+        }
+
+        def mock_scandir(path):
+            return MockScandir([MockDirEntry(i, True) for i in tree[path]])
+
+        with mock.patch('os.scandir', mock_scandir), \
+             mock.patch('bfg9000.builtins.find.exists', return_value=True):  # noqa
+            walked = []
+            for base, dirs, files in find._walk_recursive(Path('.'),
+                                                          path_vars):
+                walked.append(base)
+                dirs[:] = [i for i in dirs if i != Path('a')]
+            self.assertEqual(walked, [Path(i) for i in ('.', 'b', 'b/b1')])
+
+
+class TestGlob(TestCase):
     def test_file(self):
-        f = find._make_filter_from_glob('f', '*', None, None)
+        f = find._Glob('f', '*', None, None)
         self.assertEqual(f(Path('foo'), 'f'), find.FindResult.include)
         self.assertEqual(f(Path('foo'), 'd'), find.FindResult.exclude)
 
     def test_dir(self):
-        f = find._make_filter_from_glob('d', '*', None, None)
+        f = find._Glob('d', '*', None, None)
         self.assertEqual(f(Path('foo'), 'f'), find.FindResult.exclude)
         self.assertEqual(f(Path('foo'), 'd'), find.FindResult.include)
 
     def test_either(self):
-        f = find._make_filter_from_glob('*', '*', None, None)
+        f = find._Glob('*', '*', None, None)
         self.assertEqual(f(Path('foo'), 'f'), find.FindResult.include)
         self.assertEqual(f(Path('foo'), 'd'), find.FindResult.include)
 
     def test_match(self):
-        f = find._make_filter_from_glob('*', '*.hpp', None, None)
+        f = find._Glob('*', '*.hpp', None, None)
         self.assertEqual(f(Path('foo.hpp'), 'f'), find.FindResult.include)
         self.assertEqual(f(Path('foo.cpp'), 'f'), find.FindResult.exclude)
 
     def test_extra(self):
-        f = find._make_filter_from_glob('*', None, '*.hpp', None)
+        f = find._Glob('*', None, '*.hpp', None)
         self.assertEqual(f(Path('foo.hpp'), 'f'), find.FindResult.not_now)
         self.assertEqual(f(Path('foo.cpp'), 'f'), find.FindResult.exclude)
 
     def test_match_extra(self):
-        f = find._make_filter_from_glob('*', '*.hpp', '*.?pp', None)
+        f = find._Glob('*', '*.hpp', '*.?pp', None)
         self.assertEqual(f(Path('foo.hpp'), 'f'), find.FindResult.include)
         self.assertEqual(f(Path('foo.cpp'), 'f'), find.FindResult.not_now)
         self.assertEqual(f(Path('foo.cxx'), 'f'), find.FindResult.exclude)
 
     def test_exclude(self):
-        f = find._make_filter_from_glob('*', '*.?pp', None, '*.cpp')
+        f = find._Glob('*', '*.?pp', None, '*.cpp')
         self.assertEqual(f(Path('foo.hpp'), 'f'), find.FindResult.include)
         self.assertEqual(f(Path('foo.cpp'), 'f'), find.FindResult.exclude)
 
     def test_match_extra_exclude(self):
-        f = find._make_filter_from_glob('*', '*.c??', '*.?pp', '*.hpp')
+        f = find._Glob('*', '*.c??', '*.?pp', '*.hpp')
         self.assertEqual(f(Path('foo.hpp'), 'f'), find.FindResult.exclude)
         self.assertEqual(f(Path('foo.cpp'), 'f'), find.FindResult.include)
         self.assertEqual(f(Path('foo.ipp'), 'f'), find.FindResult.not_now)
 
+    def test_negate(self):
+        f = find._Glob('*', ['*.?pp', '!*.cpp'], None, None)
+        self.assertEqual(f(Path('foo.hpp'), 'f'), find.FindResult.include)
+        self.assertEqual(f(Path('foo.cpp'), 'f'), find.FindResult.exclude)
+
+    def test_wildcard_slash(self):
+        f = find._Glob('*', 'src/*.cpp', None, None)
+        self.assertEqual(f(Path('src/foo.cpp'), 'f'), find.FindResult.include)
+        self.assertEqual(f(Path('src/dir/foo.cpp'), 'f'),
+                         find.FindResult.exclude)
+        self.assertEqual(f(Path('foo.cpp'), 'f'), find.FindResult.exclude)
+
+    def test_double_star(self):
+        f = find._Glob('*', 'src/**/test_*.cpp', None, None)
+        for i in ('src/test_foo.cpp', 'src/dir/test_foo.cpp',
+                  'src/dir/subdir/test_foo.cpp'):
+            self.assertEqual(f(Path(i), 'f'), find.FindResult.include)
+        for i in ('test_foo.cpp', 'lib/test_foo.cpp', 'src/foo.cpp'):
+            self.assertEqual(f(Path(i), 'f'), find.FindResult.exclude)
+
+        f = find._Glob('*', '**/*.cpp', None, None)
+        self.assertEqual(f(Path('foo.cpp'), 'f'), find.FindResult.include)
+        self.assertEqual(f(Path('dir/foo.cpp'), 'f'), find.FindResult.include)
+
+    def test_double_star_name(self):
+        f = find._Glob('*', '**.cpp', None, None)
+        for i in ('foo.cpp', 'dir/foo.cpp', 'dir/subdir/foo.cpp'):
+            self.assertEqual(f(Path(i), 'f'), find.FindResult.include)
+        self.assertEqual(f(Path('foo.hpp'), 'f'), find.FindResult.exclude)
+        self.assertFalse(f.prune('dir'))
+
+    def test_exclude_tree(self):
+        f = find._Glob('*', ['*', '!build/**'], None, None)
+        self.assertEqual(f(Path('build'), 'd'), find.FindResult.include)
+        self.assertEqual(f(Path('build/foo.cpp'), 'f'),
+                         find.FindResult.exclude)
+        self.assertEqual(f(Path('src/build.cpp'), 'f'),
+                         find.FindResult.include)
+
+    def test_trailing_double_star(self):
+        f = find._Glob('*', 'a/**', None, None)
+        for i in ('a/mid.cpp', 'a/x/y.cpp', 'a/x/z/w.cpp'):
+            self.assertEqual(f(Path(i), 'f'), find.FindResult.include)
+        self.assertEqual(f(Path('top.cpp'), 'f'), find.FindResult.exclude)
+        for i in ('a', 'a/x', 'a/x/z'):
+            self.assertFalse(f.prune(i))
+        self.assertTrue(f.prune('b'))
+
+        f = find._Glob('*', 'a/x/**', None, None)
+        self.assertEqual(f(Path('a/x/z/w.cpp'), 'f'),
+                         find.FindResult.include)
+        self.assertEqual(f(Path('a/mid.cpp'), 'f'), find.FindResult.exclude)
+        for i in ('a', 'a/x', 'a/x/z'):
+            self.assertFalse(f.prune(i))
+        self.assertTrue(f.prune('a/y'))
+
+        f = find._Glob('*', '/**', None, None)
+        self.assertFalse(f.prune('a/x/z'))
+
+    def test_char_class(self):
+        f = find._Glob('*', ['[!a]*.cpp', 'dir/[a-c].hpp'], None, None)
+        self.assertEqual(f(Path('foo.cpp'), 'f'), find.FindResult.include)
+        self.assertEqual(f(Path('afoo.cpp'), 'f'), find.FindResult.exclude)
+        self.assertEqual(f(Path('dir/b.hpp'), 'f'), find.FindResult.include)
+        self.assertEqual(f(Path('dir/d.hpp'), 'f'), find.FindResult.exclude)
+
+    def test_prune(self):
+        f = find._Glob('*', '*', None, None)
+        self.assertFalse(f.prune('dir'))
+
+        f = find._Glob('*', ['*', '!build/**', '!**/.git/**'], None, None)
+        self.assertFalse(f.prune('src'))
+        self.assertTrue(f.prune('build'))
+        self.assertTrue(f.prune('.git'))
+        self.assertTrue(f.prune('src/.git'))
+
+        f = find._Glob('*', 'src/**/test_*.cpp', 'include/*.hpp', None)
+        self.assertFalse(f.prune('src'))
+        self.assertFalse(f.prune('src/dir/subdir'))
+        self.assertFalse(f.prune('include'))
+        self.assertTrue(f.prune('include/dir'))
+        self.assertTrue(f.prune('lib'))
+
+        f = find._Glob('*', 'src/**/test_*.cpp', '*.hpp', None)
+        self.assertFalse(f.prune('lib'))
+
 
 class TestFilterByPlatform(BuiltinTest):
     def setUp(self):
@@ -192,6 +361,16 @@ class TestFind(BuiltinTest):
                 srcpath('.'), srcpath('dir')
             ])
 
+    def test_trailing_double_star(self):
+        with mock_context(mock_deep_scandir):
+            self.assertEqual(find.find(self.env, name='a/**', type='f'), [
+                srcpath('a/mid.cpp'), srcpath('a/x/y.cpp'),
+                srcpath('a/x/z/w.cpp')
+            ])
+            self.assertEqual(find.find(self.env, name='a/x/**', type='f'), [
+                srcpath('a/x/y.cpp'), srcpath('a/x/z/w.cpp')
+            ])
+
     def test_flat(self):
         with mock_context():
             self.assertEqual(find.find(self.env, flat=True), [
@@ -307,6 +486,28 @@ class TestFindFiles(BuiltinTest):
             self.assertFound(self.find('.', 'file*', exclude='*.txt'),
                              expected)
 
+    def test_path_glob(self):
+        expected = [File(srcpath('dir/file2.txt'))]
+        with mock_context():
+            self.assertFound(self.find('.', 'dir/*.txt'), expected)
+            self.assertEqual(self.build['find_dirs'], {
+                srcpath('.'), srcpath('dir')
+            })
+
+    def test_double_star_name(self):
+        expected = [File(srcpath('dir/file2.txt'))]
+        with mock_context():
+            self.assertFound(self.find('.', '**.txt'), expected)
+
+    def test_prune(self):
+        expected = [
+            Directory(srcpath('.')), Directory(srcpath('dir')),
+            SourceFile(srcpath('file.cpp'), 'c++')
+        ]
+        with mock_context():
+            self.assertFound(self.find('.', ['*', '!dir/**']), expected)
+            self.assertEqual(self.build['find_dirs'], {srcpath('.')})
+
     def test_flat(self):
         expected = [
             Directory(srcpath('.')), Directory(srcpath('dir')),
@@ -376,6 +577,27 @@ class TestFindFiles(BuiltinTest):
             self.assertFound(self.find(cache=False), expected)
             self.assertEqual(self.build['find_dirs'], set())
 
+    def test_find_cache(self):
+        expected = [
+            Directory(srcpath('.')),
+            Directory(srcpath('dir')),
+            SourceFile(srcpath('file.cpp'), 'c++'),
+            File(srcpath('dir/file2.txt'))
+        ]
+        with mock.patch('builtins.open', side_effect=FileNotFoundError()):
+            self.context.find_cache = FindCache('.bfg_find_cache')
+
+        with mock_context() as (scandir, _), \
+             mock.patch('os.scandir', wraps=scandir) as mscandir, \
+             mock.patch.object(FindCache, '_stat', return_value=[1, 2]), \
+             mock.patch('time.time', return_value=10):  # noqa
+            self.assertFound(self.find(), expected)
+            self.assertEqual(mscandir.call_count, 2)
+            self.find(cache=False)
+            self.assertEqual(mscandir.call_count, 4)
+            self.find()
+            self.assertEqual(mscandir.call_count, 4)
+
 
 class TestFindPaths(TestFindFiles):
     def setUp(self):
@@ -387,3 +609,108 @@ class TestFindPaths(TestFindFiles):
             dist = [self.bfgfile] + expected
         self.assertEqual(result, [i.path for i in expected])
         self.assertEqual(list(self.build.sources()), dist)
+
+
+class TestGlobsChanged(BuiltinTest):
+    def setUp(self):
+        super().setUp()
+        self.find = self.context['find_files']
+
+    def globs(self):
+        # Round-trip through JSON to make sure we can load what we write.
+        return json.loads(json.dumps(find.globs_to_json(self.env,
+                                                        self.build)))
+
+    @contextmanager
+    def mock_extra(self, extra_files=[]):
+        def mock_scandir_extra(path):
+            result = mock_scandir(path)
+            if os.path.basename(path) != 'dir':
+                result.entries += [MockDirEntry(i, False)
+                                   for i in extra_files]
+            return result
+
+        with mock.patch('os.scandir', mock_scandir_extra), \
+             mock.patch('bfg9000.builtins.find.exists', return_value=True):  # noqa
+            yield
+
+    def changed(self, data, extra_files=[]):
+        with self.mock_extra(extra_files):
+            return find.globs_changed(data)
+
+    def test_record(self):
+        with mock_context():
+            self.find(name='*.cpp')
+        self.assertEqual(self.build['regenerate'].deps,
+                         [Path(find.stamp_name)])
+        self.assertEqual(self.build['find_globs'], [{
+            'paths': [srcpath('.')], 'name': ['*.cpp'], 'type': '*',
+            'extra': [], 'exclude': find.exclude_globs, 'flat': False,
+            'platform': None,
+            'results': [(srcpath('file.cpp'), 'f', find.FindResult.include)],
+        }])
+
+    def test_unchanged(self):
+        with mock_context():
+            self.find(name='*.cpp')
+        data = self.globs()
+        self.assertFalse(self.changed(data))
+        self.assertFalse(self.changed(data, ['file.txt', 'file.cpp~']))
+
+    def test_changed(self):
+        with mock_context():
+            self.find(name='*.cpp')
+        self.assertTrue(self.changed(self.globs(), ['file2.cpp']))
+
+    def test_extra(self):
+        with mock_context():
+            self.find(name='*.cpp', extra='*.txt')
+        data = self.globs()
+        self.assertFalse(self.changed(data, ['file.cpp~']))
+        self.assertTrue(self.changed(data, ['file.txt']))
+
+    def test_platform_filter(self):
+        platform = self.env.target_platform
+        other = next(i for i in known_platforms
+                     if i not in {platform.genus, platform.family})
+        other_file = 'file_{}.cpp'.format(other)
+
+        with self.mock_extra([other_file]):
+            self.find(name='*.cpp', filter=self.context['filter_by_platform'])
+        data = self.globs()
+        self.assertEqual(data['globs'][0]['platform'],
+                         [platform.genus, platform.family])
+        self.assertEqual(data['globs'][0]['results'], [
+            [list(srcpath(i).to_json()), 'f', result] for i, result in
+            [('file.cpp', find.FindResult.include),
+             (other_file, find.FindResult.not_now)]
+        ])
+        self.assertFalse(self.changed(data, [other_file]))
+        self.assertTrue(self.changed(data))
+
+    def test_custom_filter(self):
+        def my_filter(path, type):
+            return (find.FindResult.include if path.basename() == 'file.cpp'
+                    else find.FindResult.exclude)
+
+        with mock_context():
+            self.find(name='*.cpp', filter=my_filter)
+        data = self.globs()
+        self.assertFalse(self.changed(data, ['file.txt']))
+        # We can't run the custom filter, so we have to assume that any new
+        # file matching the glob changes the results.
+        self.assertTrue(self.changed(data, ['file2.cpp']))
+
+    def test_changed_dirs(self):
+        with mock_context():
+            self.find(name='*.cpp')
+        data = self.globs()
+        data['dirs'] = data['dirs'][:1]
+        self.assertTrue(self.changed(data))
+
+    def test_bad_version(self):
+        with mock_context():
+            self.find(name='*.cpp')
+        data = self.globs()
+        data['version'] = 0
+        self.assertTrue(self.changed(data))
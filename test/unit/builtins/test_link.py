@@ -217,6 +217,27 @@ class TestExecutable(LinkTest):
                                             description='my description')
         self.assertEqual(result.creator.description, 'my description')
 
+    def test_pool(self):
+        pool = self.context['pool']('heavy', 2)
+        result = self.context['executable']('exe', ['main.cpp'],
+                                            pool='heavy')
+        self.assertEqual(result.creator.pool, pool)
+        self.assertEqual(result.creator.files[0].creator.pool, None)
+
+        self.assertRaises(ValueError, self.context['executable'], 'exe2',
+                          ['main.cpp'], pool='unknown')
+
+    def test_link_pool_depth(self):
+        self.context['project'](link_pool_depth=4)
+        result = self.context['executable']('exe', ['main.cpp'])
+        self.assertEqual(result.creator.pool, ('link', 4))
+        self.assertEqual(result.creator.files[0].creator.pool, None)
+
+        pool = self.context['pool']('heavy', 2)
+        result = self.context['executable']('exe2', ['main.cpp'],
+                                            pool='heavy')
+        self.assertEqual(result.creator.pool, pool)
+
 
 class TestSharedLibrary(LinkTest):
     mode = 'shared_library'
@@ -424,6 +445,12 @@ class TestSharedLibrary(LinkTest):
         self.assertEqual(result.creator.extra_deps, [])
         self.assertEqual(result.creator.files[0].creator.extra_deps, [dep])
 
+    def test_pool(self):
+        pool = self.context['pool']('heavy', 2)
+        result = self.context['shared_library']('shared', ['main.cpp'],
+                                                pool=pool)
+        self.assertEqual(result.creator.pool, pool)
+
 
 class TestStaticLibrary(LinkTest):
     mode = 'static_library'
@@ -876,7 +903,7 @@ class TestMakeBackend(BuiltinTest):
         with mock.patch.object(make.Makefile, 'rule') as mrule:
             link.make_link(result.creator, self.build, makefile, self.env)
         mrule.assert_called_once_with(result, [obj], [], AlwaysEqual(),
-                                      self._variables(), None)
+                                      self._variables(), None, None)
 
     def test_dir_sentinel(self):
         obj = self.context['object_file']('main.o')
@@ -886,7 +913,8 @@ class TestMakeBackend(BuiltinTest):
         with mock.patch.object(make.Makefile, 'rule') as mrule:
             link.make_link(result.creator, self.build, makefile, self.env)
         mrule.assert_called_once_with(result, [obj], [Path('dir/.dir')],
-                                      AlwaysEqual(), self._variables(), None)
+                                      AlwaysEqual(), self._variables(), None,
+                                      None)
 
     def test_extra_deps(self):
         dep = self.context['generic_file']('dep.txt')
@@ -897,7 +925,34 @@ class TestMakeBackend(BuiltinTest):
         with mock.patch.object(make.Makefile, 'rule') as mrule:
             link.make_link(result.creator, self.build, makefile, self.env)
         mrule.assert_called_once_with(result, [obj, dep], [], AlwaysEqual(),
-                                      self._variables(), None)
+                                      self._variables(), None, None)
+
+    def test_pool(self):
+        obj = self.context['object_file']('main.o')
+        pool = self.context['pool']('link', 2)
+        result = self.context['executable']('exe', obj, pool=pool)
+
+        makefile = make.Makefile(None)
+        with mock.patch.object(make.Makefile, 'rule') as mrule:
+            link.make_link(result.creator, self.build, makefile, self.env)
+        mrule.assert_called_once_with(result, [obj], [], AlwaysEqual(),
+                                      self._variables(), None, {
+            'SHELL': self.env.tool('pool')(Path('.link.pool'), 2, ['/bin/sh'])
+        })
+
+    def test_response_file(self):
+        self.env.response_file_threshold = 1
+        obj = self.context['object_file']('main.o')
+        result = self.context['executable']('exe', obj)
+        rspfile = result.path.addext('.rsp')
+
+        makefile = make.Makefile(None)
+        with mock.patch.object(make.Makefile, 'rule') as mrule:
+            link.make_link(result.creator, self.build, makefile, self.env)
+        mrule.assert_called_once_with(result, [obj, rspfile], [],
+                                      AlwaysEqual(), self._variables(), None,
+                                      None)
+        self.assertEqual(makefile.response_files, {rspfile: [obj]})
 
 
 class TestNinjaBackend(BuiltinTest):
@@ -918,7 +973,7 @@ class TestNinjaBackend(BuiltinTest):
 
         mbuild.assert_called_once_with(
             output=[result], rule='cc_link', inputs=[obj], implicit=[],
-            variables=self._variables()
+            order_only=[], variables=self._variables()
         )
 
     def test_extra_deps(self):
@@ -931,9 +986,60 @@ class TestNinjaBackend(BuiltinTest):
             link.ninja_link(result.creator, self.build, ninjafile, self.env)
         mbuild.assert_called_once_with(
             output=[result], rule='cc_link', inputs=[obj], implicit=[dep],
-            variables=self._variables()
+            order_only=[], variables=self._variables()
         )
 
+    def test_pool(self):
+        obj = self.context['object_file']('main.o')
+        pool = self.context['pool']('link', 2)
+        result = self.context['executable']('exe', obj, pool=pool)
+
+        ninjafile = ninja.NinjaFile(None)
+        with mock.patch.object(ninja.NinjaFile, 'build') as mbuild:
+            link.ninja_link(result.creator, self.build, ninjafile, self.env)
+        self.assertTrue(ninjafile.has_pool('link'))
+        mbuild.assert_called_once_with(
+            output=[result], rule='cc_link', inputs=[obj], implicit=[],
+            order_only=[], variables=dict(self._variables(), pool='link')
+        )
+
+    def test_response_file(self):
+        self.env.response_file_threshold = 1
+        obj = self.context['object_file']('main.o')
+        result = self.context['executable']('exe', obj)
+
+        ninjafile = ninja.NinjaFile(None)
+        with mock.patch.object(ninja.NinjaFile, 'build') as mbuild:
+            link.ninja_link(result.creator, self.build, ninjafile, self.env)
+        mbuild.assert_called_once_with(
+            output=[result], rule='cc_link_rsp', inputs=[obj], implicit=[],
+            order_only=[], variables=self._variables()
+        )
+        self.assertEqual(ninjafile._rules['cc_link_rsp'].rspfile_content,
+                         ninja.var('in'))
+
+    def test_toc(self):
+        lib = self.context['shared_library']('lib', ['lib.cpp'])
+        result = self.context['executable']('exe', ['main.cpp'], libs=[lib])
+
+        ninjafile = ninja.NinjaFile(None)
+        with mock.patch.object(ninja.NinjaFile, 'build') as mbuild:
+            link.ninja_link(lib.creator, self.build, ninjafile, self.env)
+            link.ninja_link(result.creator, self.build, ninjafile, self.env)
+
+        if self.env.target_platform.object_format == 'elf':
+            toc = lib.path.addext('.TOC')
+            self.assertEqual(mbuild.mock_calls[1], mock.call(
+                output=toc, rule='toc', inputs=lib
+            ))
+            self.assertTrue(ninjafile._rules['toc'].restat)
+            self.assertEqual(mbuild.mock_calls[2][2]['implicit'], [toc])
+            self.assertEqual(mbuild.mock_calls[2][2]['order_only'], [lib])
+        else:
+            self.assertEqual(len(mbuild.mock_calls), 2)
+            self.assertEqual(mbuild.mock_calls[1][2]['implicit'], [lib])
+            self.assertEqual(mbuild.mock_calls[1][2]['order_only'], [])
+
 
 class TestMsbuildBackend(BuiltinTest):
     def setUp(self):
@@ -221,7 +221,7 @@ class TestBoostPackage(TestCase):
         context = self._make_context(env)
         boost_incdir = r'C:\Boost\include\boost-1.23'
 
-        def mock_walk(top, variables=None):
+        def mock_walk(top, variables=None, scandir=None):
             yield (top,) + (
                 [top.append('boost-1.23')],
                 []
@@ -255,7 +255,7 @@ class TestBoostPackage(TestCase):
         env = make_env('winnt', clear_variables=True)
         context = self._make_context(env)
 
-        def mock_walk(top, variables=None):
+        def mock_walk(top, variables=None, scandir=None):
             yield (top,) + (
                 [top.append('boost-1.23')],
                 []
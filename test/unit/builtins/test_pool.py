@@ -0,0 +1,45 @@
+from .common import BuiltinTest
+
+from bfg9000.builtins.pool import get_pool, link_pool, Pool
+
+
+class TestPool(BuiltinTest):
+    def test_pool(self):
+        pool = self.context['pool']('heavy', 2)
+        self.assertEqual(pool, Pool('heavy', 2))
+        self.assertEqual(self.build['pools'], {'heavy': pool})
+
+    def test_redefine(self):
+        pool = self.context['pool']('heavy', 2)
+        self.assertEqual(self.context['pool']('heavy', 2), pool)
+        self.assertRaises(ValueError, self.context['pool'], 'heavy', 4)
+
+    def test_invalid_name(self):
+        self.assertRaises(ValueError, self.context['pool'], 'my pool', 2)
+        self.assertRaises(ValueError, self.context['pool'], '', 2)
+        self.assertRaises(ValueError, self.context['pool'], 'console', 2)
+
+    def test_invalid_depth(self):
+        self.assertRaises(TypeError, self.context['pool'], 'heavy', '2')
+        self.assertRaises(TypeError, self.context['pool'], 'heavy', True)
+        self.assertRaises(ValueError, self.context['pool'], 'heavy', 0)
+
+    def test_get_pool(self):
+        pool = self.context['pool']('heavy', 2)
+        self.assertEqual(get_pool(self.build, None), None)
+        self.assertEqual(get_pool(self.build, pool), pool)
+        self.assertEqual(get_pool(self.build, 'heavy'), pool)
+        self.assertRaises(ValueError, get_pool, self.build, 'unknown')
+
+    def test_link_pool(self):
+        self.assertEqual(link_pool(self.build), None)
+        self.assertEqual(self.build['pools'], {})
+
+        self.context['project'](link_pool_depth=4)
+        self.assertEqual(link_pool(self.build), Pool('link', 4))
+        self.assertEqual(self.build['pools'], {'link': Pool('link', 4)})
+
+    def test_link_pool_conflict(self):
+        self.context['pool']('link', 2)
+        self.context['project'](link_pool_depth=4)
+        self.assertRaises(ValueError, link_pool, self.build)
@@ -9,6 +9,7 @@ class TestProject(BuiltinTest):
         self.assertEqual(self.build['project'].version, None)
         self.assertEqual(self.build['project']['intermediate_dirs'], True)
         self.assertEqual(self.build['project']['lang'], 'c')
+        self.assertEqual(self.build['project']['link_pool_depth'], None)
 
     def test_name(self):
         self.context['project']('project-name')
@@ -31,6 +32,10 @@ class TestProject(BuiltinTest):
         self.assertEqual(self.build['project']['intermediate_dirs'], False)
         self.assertEqual(self.build['project']['lang'], 'c')
 
+    def test_link_pool_depth(self):
+        self.context['project'](link_pool_depth=4)
+        self.assertEqual(self.build['project']['link_pool_depth'], 4)
+
     def test_multi(self):
         self.context['project']('project-name', '1.0', intermediate_dirs=False)
         self.assertEqual(self.build['project'].name, 'project-name')
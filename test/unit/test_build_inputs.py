@@ -68,3 +68,16 @@ class TestEdge(TestCase):
         output = file_types.File(Path('file.txt'))
         self.assertEdge(Edge(self.build, output, description='desc'),
                         output, description='desc')
+
+    def test_submodule(self):
+        sub = Path('sub/build.bfg', Root.srcdir)
+        root_edge = Edge(self.build, file_types.File(Path('root.txt')))
+        with self.build.push_submodule(sub):
+            sub_edge = Edge(self.build, file_types.File(Path('sub.txt')))
+        after_edge = Edge(self.build, file_types.File(Path('after.txt')))
+
+        self.assertEqual(list(self.build.edges()),
+                         [root_edge, sub_edge, after_edge])
+        self.assertIs(self.build.edge_submodule(root_edge), None)
+        self.assertEqual(self.build.edge_submodule(sub_edge), sub)
+        self.assertIs(self.build.edge_submodule(after_edge), None)
@@ -1,4 +1,5 @@
-from io import StringIO
+from io import BytesIO, StringIO
+from unittest import mock
 
 from . import *
 
@@ -66,6 +67,35 @@ class TestEmitDeps(TestCase):
         depfixer.emit_deps(instream, outstream)
         self.assertEqual(outstream.getvalue(), 'baz:\n')
 
+    def test_escaped_chars(self):
+        instream = StringIO('foo: bar\\ baz quux\\:\\\\ c::d\n')
+        outstream = StringIO()
+        depfixer.emit_deps(instream, outstream)
+        self.assertEqual(outstream.getvalue(),
+                         'bar\\ baz:\nquux\\:\\\\:\nc::d:\n')
+
+    def test_escaped_newline_in_dep(self):
+        instream = StringIO('foo: bar\\\nbaz\n')
+        outstream = StringIO()
+        depfixer.emit_deps(instream, outstream)
+        self.assertEqual(outstream.getvalue(), 'barbaz:\n')
+
+    def test_bytes(self):
+        instream = BytesIO(b'foo: bar \\\n  baz\n')
+        outstream = BytesIO()
+        depfixer.emit_deps(instream, outstream)
+        self.assertEqual(outstream.getvalue(), b'bar:\nbaz:\n')
+
+    def test_chunked(self):
+        data = 'foo: bar\\ baz \\\n  c:\\quux\\\\\nfoo2: bar2\n'
+        for size in range(1, len(data) + 1):
+            instream = StringIO(data)
+            outstream = StringIO()
+            with mock.patch('bfg9000.depfixer.chunk_size', size):
+                depfixer.emit_deps(instream, outstream)
+            self.assertEqual(outstream.getvalue(),
+                             'bar\\ baz:\nc:\\quux\\\\:\nbar2:\n')
+
     def test_unexpected_newline(self):
         instream = StringIO('foo\n')
         outstream = StringIO()
@@ -108,3 +138,13 @@ class TestEmitDeps(TestCase):
         outstream = StringIO()
         self.assertRaises(depfixer.ParseError, depfixer.emit_deps, instream,
                           outstream)
+
+
+class TestFixDepfile(TestCase):
+    def test_fix(self):
+        with mock.patch('builtins.open',
+                        mock_open(read_data=b'foo: bar baz\n')) as mopen:
+            depfixer.fix_depfile('foo.d')
+        self.assertEqual(mopen.mock_calls[0], mock.call('foo.d', 'rb'))
+        self.assertIn(mock.call('foo.d', 'ab'), mopen.mock_calls)
+        mopen().write.assert_called_once_with(b'bar:\nbaz:\n')
@@ -1,4 +1,6 @@
 import os
+import time
+from unittest import mock
 
 from . import *
 
@@ -6,6 +8,7 @@ from bfg9000.environment import Environment, LibraryMode
 from bfg9000.exceptions import ToolNotFoundError
 from bfg9000.file_types import SourceFile
 from bfg9000.path import Path, Root, InstallRoot
+from bfg9000.probe_cache import ProbeCache
 from bfg9000.tools import rm, lex, scripts  # noqa
 
 this_dir = os.path.abspath(os.path.dirname(__file__))
@@ -31,6 +34,46 @@ class TestEnvironment(TestCase):
         with self.assertRaises(ToolNotFoundError):
             env.builder('nonexist')
 
+    def test_prefetch_builders(self):
+        env = self.make_env()
+        env.prefetch_builders(['lex', 'nonexist'])
+        self.assertEqual(env.builder_langs, ['lex'])
+        lex_builder = env.builder('lex')
+        self.assertIsInstance(lex_builder, lex.LexBuilder)
+
+        env.prefetch_builders(['lex'])
+        self.assertIs(env.builder('lex'), lex_builder)
+        with self.assertRaises(ToolNotFoundError):
+            env.builder('nonexist')
+
+    def test_prefetch_builders_once(self):
+        env = self.make_env()
+        calls = []
+
+        def get_builder(env, lang):
+            calls.append(lang)
+            if lang == 'c':
+                time.sleep(0.05)
+            else:
+                # Pretend that this builder needs the C builder too.
+                env.builder('c')
+            return lang + ' builder'
+
+        with mock.patch('bfg9000.tools.get_builder', get_builder):
+            env.prefetch_builders(['c', 'c++'])
+        self.assertEqual(sorted(calls), ['c', 'c++'])
+        self.assertEqual(env.builder('c'), 'c builder')
+        self.assertEqual(env.builder('c++'), 'c++ builder')
+
+    def test_prefetch_builders_error(self):
+        env = self.make_env()
+        with mock.patch('bfg9000.log.debug') as m:
+            env.prefetch_builders(['nonexist'])
+        m.assert_called_once_with(
+            "unable to prefetch builder for 'nonexist': unknown language " +
+            "'nonexist'", show_stack=False
+        )
+
     def test_tool(self):
         env = self.make_env()
         self.assertIsInstance(env.tool('rm'), rm.Rm)
@@ -44,6 +87,25 @@ class TestEnvironment(TestCase):
         with self.assertRaises(TypeError):
             env.run_arguments(src, 'nonexist')
 
+    def test_probe(self):
+        env = self.make_env()
+        with mock.patch('bfg9000.shell.execute', return_value='out') as m:
+            self.assertEqual(env.probe(['cmd', '--version']), 'out')
+            self.assertEqual(env.probe(['cmd', '--version']), 'out')
+        self.assertEqual(m.call_count, 2)
+
+        with mock.patch('builtins.open', side_effect=FileNotFoundError()):
+            env.init_probe_cache()
+        with mock.patch.object(ProbeCache, '_stat',
+                               return_value=['/bin/cmd', 1, 2]), \
+             mock.patch('bfg9000.shell.execute', return_value='out') as m:  # noqa
+            self.assertEqual(env.probe(['cmd', '--version']), 'out')
+            self.assertEqual(env.probe(['cmd', '--version']), 'out')
+        self.assertEqual(m.call_count, 1)
+
+        env.init_probe_cache(False)
+        self.assertEqual(env.probe_cache, None)
+
     def test_upgrade_from_v4(self):
         env = Environment.load(
             os.path.join(test_data_dir, 'environment', 'v4')
@@ -70,6 +132,8 @@ class TestEnvironment(TestCase):
 
         self.assertEqual(env.host_platform.name, 'linux')
         self.assertEqual(env.target_platform.name, 'linux')
+        self.assertEqual(env.fast_makefile, False)
+        self.assertEqual(env.response_file_threshold, 0)
 
     def test_finalize(self):
         env = self.make_env()
@@ -0,0 +1,105 @@
+import json
+from unittest import mock
+
+from . import *
+
+from bfg9000.find_cache import FindCache
+
+listing = (['dir'], ['file.txt'], set())
+
+
+def mock_stat(path):
+    return [1, 2]
+
+
+def make_entry(stat=[1, 2]):
+    return {'stat': stat, 'dirs': ['dir'], 'nondirs': ['file.txt'],
+            'links': []}
+
+
+class TestFindCache(TestCase):
+    def make_cache(self, entries={}):
+        data = json.dumps({'version': FindCache.version, 'entries': entries})
+        with mock.patch('builtins.open', mock_open(read_data=data)):
+            return FindCache('.bfg_find_cache')
+
+    def test_load_missing(self):
+        with mock.patch('builtins.open', side_effect=FileNotFoundError()):
+            cache = FindCache('.bfg_find_cache')
+        self.assertEqual(cache._entries, {})
+
+    def test_load_bad_version(self):
+        data = json.dumps({'version': 0, 'entries': {'foo': 'bar'}})
+        with mock.patch('builtins.open', mock_open(read_data=data)):
+            cache = FindCache('.bfg_find_cache')
+        self.assertEqual(cache._entries, {})
+
+    def test_listdir(self):
+        cache = self.make_cache()
+        listdir = mock.Mock(return_value=listing)
+        with mock.patch.object(FindCache, '_stat', side_effect=mock_stat), \
+             mock.patch('time.time', return_value=10):  # noqa
+            self.assertEqual(cache.listdir('/path', listdir), listing)
+            self.assertEqual(cache.listdir('/path', listdir), listing)
+        listdir.assert_called_once_with('/path')
+        self.assertEqual(cache._used, {'/path': make_entry()})
+
+    def test_listdir_cached(self):
+        cache = self.make_cache({'/path': make_entry()})
+        listdir = mock.Mock(return_value=listing)
+        with mock.patch.object(FindCache, '_stat', side_effect=mock_stat):
+            self.assertEqual(cache.listdir('/path', listdir), listing)
+        listdir.assert_not_called()
+
+    def test_listdir_changed(self):
+        cache = self.make_cache({'/path': make_entry([0, 2])})
+        listdir = mock.Mock(return_value=listing)
+        with mock.patch.object(FindCache, '_stat', side_effect=mock_stat), \
+             mock.patch('time.time', return_value=10):  # noqa
+            self.assertEqual(cache.listdir('/path', listdir), listing)
+        listdir.assert_called_once_with('/path')
+        self.assertEqual(cache._used, {'/path': make_entry()})
+
+    def test_listdir_racy(self):
+        cache = self.make_cache()
+        listdir = mock.Mock(return_value=listing)
+        with mock.patch.object(FindCache, '_stat', side_effect=mock_stat), \
+             mock.patch('time.time', return_value=0):  # noqa
+            self.assertEqual(cache.listdir('/path', listdir), listing)
+            self.assertEqual(cache.listdir('/path', listdir), listing)
+        self.assertEqual(listdir.call_count, 2)
+        self.assertEqual(cache._used, {})
+
+    def test_listdir_missing(self):
+        cache = self.make_cache()
+        listdir = mock.Mock(return_value=([], [], set()))
+        with mock.patch.object(FindCache, '_stat', return_value=None):
+            self.assertEqual(cache.listdir('/path', listdir), ([], [], set()))
+        listdir.assert_called_once_with('/path')
+        self.assertEqual(cache._used, {})
+
+    def test_save(self):
+        cache = self.make_cache({'/path': make_entry(),
+                                 '/old': make_entry()})
+        with mock.patch.object(FindCache, '_stat', side_effect=mock_stat):
+            cache.listdir('/path', None)
+
+        with mock.patch('tempfile.mkstemp', return_value=(3, 'tmp')), \
+             mock.patch('os.fdopen', mock_open()) as mopen, \
+             mock.patch('os.replace') as mreplace:  # noqa
+            cache.save()
+        mreplace.assert_called_once_with('tmp', '.bfg_find_cache')
+        written = ''.join(i[0][0] for i in mopen().write.call_args_list)
+        self.assertEqual(json.loads(written), {
+            'version': FindCache.version,
+            'entries': {'/path': make_entry()},
+        })
+
+    def test_save_unchanged(self):
+        cache = self.make_cache({'/path': make_entry()})
+        with mock.patch.object(FindCache, '_stat', side_effect=mock_stat):
+            cache.listdir('/path', None)
+
+        with mock.patch('tempfile.mkstemp') as mkstemp:
+            cache.save()
+        mkstemp.assert_not_called()
@@ -0,0 +1,35 @@
+from unittest import mock
+
+from . import *
+
+from bfg9000 import findcheck
+
+
+class TestCheck(TestCase):
+    def test_unchanged(self):
+        with mock.patch('builtins.open', mock_open(read_data='{}')), \
+             mock.patch('bfg9000.findcheck.globs_changed',
+                        return_value=False), \
+             mock.patch('bfg9000.findcheck.touch') as mtouch:  # noqa
+            self.assertFalse(findcheck.check('globs', 'stamp'))
+        mtouch.assert_not_called()
+
+    def test_changed(self):
+        with mock.patch('builtins.open', mock_open(read_data='{}')), \
+             mock.patch('bfg9000.findcheck.globs_changed',
+                        return_value=True), \
+             mock.patch('bfg9000.findcheck.touch') as mtouch:  # noqa
+            self.assertTrue(findcheck.check('globs', 'stamp'))
+        mtouch.assert_called_once_with('stamp')
+
+    def test_missing(self):
+        with mock.patch('builtins.open', side_effect=FileNotFoundError()), \
+             mock.patch('bfg9000.findcheck.touch') as mtouch:  # noqa
+            self.assertTrue(findcheck.check('globs', 'stamp'))
+        mtouch.assert_called_once_with('stamp')
+
+    def test_invalid(self):
+        with mock.patch('builtins.open', mock_open(read_data='invalid')), \
+             mock.patch('bfg9000.findcheck.touch') as mtouch:  # noqa
+            self.assertTrue(findcheck.check('globs', 'stamp'))
+        mtouch.assert_called_once_with('stamp')
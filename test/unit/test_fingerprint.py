@@ -0,0 +1,68 @@
+import json
+from unittest import mock
+
+from . import *
+
+from bfg9000.app_version import version
+from bfg9000.fingerprint import Fingerprint
+
+
+def mock_hash(path):
+    return 'hash:' + path
+
+
+class TestFingerprint(TestCase):
+    def make_data(self, **kwargs):
+        data = {
+            'version': version,
+            'files': {'build.bfg': 'hash:build.bfg'},
+            'dirs': {'src': 'hash:src'},
+            'outputs': ['build.ninja'],
+        }
+        data.update(kwargs)
+        return json.dumps(data)
+
+    def is_current(self, data, exists=True):
+        with mock.patch('builtins.open', mock_open(read_data=data)), \
+             mock.patch('bfg9000.fingerprint._hash_file', mock_hash), \
+             mock.patch('bfg9000.fingerprint._hash_dir', mock_hash), \
+             mock.patch('os.path.exists', return_value=exists):  # noqa
+            return Fingerprint.is_current('builddir')
+
+    def test_to_json(self):
+        with mock.patch('bfg9000.fingerprint._hash_file', mock_hash), \
+             mock.patch('bfg9000.fingerprint._hash_dir', mock_hash):  # noqa
+            fp = Fingerprint(['build.bfg'], ['src'], ['b', 'a'])
+        self.assertEqual(fp.to_json(), {
+            'version': version,
+            'files': {'build.bfg': 'hash:build.bfg'},
+            'dirs': {'src': 'hash:src'},
+            'outputs': ['a', 'b'],
+        })
+
+    def test_current(self):
+        self.assertTrue(self.is_current(self.make_data()))
+
+    def test_file_changed(self):
+        self.assertFalse(self.is_current(self.make_data(
+            files={'build.bfg': 'old'}
+        )))
+
+    def test_dir_changed(self):
+        self.assertFalse(self.is_current(self.make_data(
+            dirs={'src': 'old'}
+        )))
+
+    def test_version_changed(self):
+        self.assertFalse(self.is_current(self.make_data(version='0.1')))
+
+    def test_missing_output(self):
+        self.assertFalse(self.is_current(self.make_data(), exists=False))
+
+    def test_invalid(self):
+        self.assertFalse(self.is_current('invalid'))
+        self.assertFalse(self.is_current('{}'))
+
+    def test_missing(self):
+        with mock.patch('builtins.open', side_effect=FileNotFoundError()):
+            self.assertFalse(Fingerprint.is_current('builddir'))
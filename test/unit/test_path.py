@@ -235,6 +235,25 @@ class TestPath(PathTestCase):
         p = self.Path('foo', Root.srcdir)
         self.assertRaises(ValueError, p.append, '../..')
 
+    def test_append_name(self):
+        Root = path.Root
+        p = self.Path('foo', Root.srcdir)
+        self.assertEqual(p.append_name('bar'),
+                         self.Path('foo/bar', Root.srcdir))
+        self.assertEqual(p.append_name('.'), self.Path('foo', Root.srcdir))
+        self.assertEqual(p.append_name('..'), self.Path('', Root.srcdir))
+        self.assertEqual(p.append_name(r'..\bar'),
+                         self.Path('bar', Root.srcdir))
+
+        self.assertEqual(self.Path('', Root.srcdir).append_name('bar'),
+                         self.Path('bar', Root.srcdir))
+        self.assertEqual(self.Path('/').append_name('bar'),
+                         self.Path('/bar'))
+
+        p = self.Path('foo', path.InstallRoot.bindir, True)
+        self.assertEqual(p.append_name('bar'),
+                         self.Path('foo/bar', path.InstallRoot.bindir, True))
+
     def test_ext(self):
         p = self.Path('foo.txt', path.Root.srcdir)
         self.assertEqual(p.ext(), '.txt')
@@ -651,3 +670,85 @@ class TestPushd(TestCase):
             self.assertEqual(os_chdir.mock_calls, [
                 mock.call('foo'), mock.call('cwd')
             ])
+
+
+class TestWriteIfChanged(TestCase):
+    def test_new(self):
+        mo = mock_open()
+        mo.side_effect = [FileNotFoundError(), mo.return_value]
+        with mock.patch('builtins.open', mo), \
+             mock.patch('os.replace') as mreplace:  # noqa
+            with path.write_if_changed('foo') as out:
+                out.write('data')
+        self.assertEqual(mo.call_args_list, [
+            mock.call('foo', 'r'), mock.call('foo.tmp', 'w')
+        ])
+        mo.return_value.write.assert_called_once_with('data')
+        mreplace.assert_called_once_with('foo.tmp', 'foo')
+
+    def test_changed(self):
+        mo = mock_open(read_data='old')
+        with mock.patch('builtins.open', mo), \
+             mock.patch('os.replace') as mreplace:  # noqa
+            with path.write_if_changed('foo') as out:
+                out.write('new')
+        mo().write.assert_called_once_with('new')
+        mreplace.assert_called_once_with('foo.tmp', 'foo')
+
+    def test_unchanged(self):
+        mo = mock_open(read_data='data')
+        with mock.patch('builtins.open', mo), \
+             mock.patch('os.replace') as mreplace:  # noqa
+            with path.write_if_changed('foo') as out:
+                out.write('data')
+        mo().write.assert_not_called()
+        mreplace.assert_not_called()
+
+    def test_binary(self):
+        mo = mock_open(read_data=b'data')
+        with mock.patch('builtins.open', mo), \
+             mock.patch('os.replace') as mreplace:  # noqa
+            with path.write_if_changed('foo', binary=True) as out:
+                out.write(b'data')
+        mo.assert_called_once_with('foo', 'rb')
+        mreplace.assert_not_called()
+
+
+class TestStreamIfChanged(TestCase):
+    def test_new(self):
+        with mock.patch('builtins.open', mock_open()) as mo, \
+             mock.patch('filecmp.cmp', side_effect=FileNotFoundError()), \
+             mock.patch('os.replace') as mreplace:  # noqa
+            with path.stream_if_changed('foo') as out:
+                out.write('data')
+        mo.assert_called_once_with('foo.tmp', 'w')
+        mo().write.assert_called_once_with('data')
+        mreplace.assert_called_once_with('foo.tmp', 'foo')
+
+    def test_changed(self):
+        with mock.patch('builtins.open', mock_open()), \
+             mock.patch('filecmp.cmp', return_value=False), \
+             mock.patch('os.replace') as mreplace:  # noqa
+            with path.stream_if_changed('foo') as out:
+                out.write('data')
+        mreplace.assert_called_once_with('foo.tmp', 'foo')
+
+    def test_unchanged(self):
+        with mock.patch('builtins.open', mock_open()), \
+             mock.patch('filecmp.cmp', return_value=True), \
+             mock.patch('os.remove') as mremove, \
+             mock.patch('os.replace') as mreplace:  # noqa
+            with path.stream_if_changed('foo') as out:
+                out.write('data')
+        mremove.assert_called_once_with('foo.tmp')
+        mreplace.assert_not_called()
+
+    def test_error(self):
+        with mock.patch('builtins.open', mock_open()), \
+             mock.patch('os.remove') as mremove, \
+             mock.patch('os.replace') as mreplace:  # noqa
+            with self.assertRaises(RuntimeError):
+                with path.stream_if_changed('foo'):
+                    raise RuntimeError()
+        mremove.assert_called_once_with('foo.tmp')
+        mreplace.assert_not_called()
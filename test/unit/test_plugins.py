@@ -0,0 +1,97 @@
+from unittest import mock
+
+from . import *
+
+from bfg9000 import plugins
+from bfg9000.plugins import entry_point, entry_points, EntryPoint
+
+
+class TestEntryPoint(TestCase):
+    def test_load_module(self):
+        self.assertIs(EntryPoint('name', 'bfg9000.plugins').load(), plugins)
+        self.assertIs(EntryPoint('name', 'bfg9000.plugins [extra]').load(),
+                      plugins)
+
+    def test_load_attr(self):
+        self.assertIs(EntryPoint('name', 'bfg9000.plugins:EntryPoint').load(),
+                      EntryPoint)
+        self.assertIs(EntryPoint(
+            'name', 'bfg9000.plugins : EntryPoint.load [extra]'
+        ).load(), EntryPoint.load)
+
+    def test_load_missing(self):
+        with self.assertRaises(ImportError):
+            EntryPoint('name', 'nonexist').load()
+
+
+class TestEntryPoints(TestCase):
+    metadata = [('group', 'foo', 'mod:foo'), ('group', 'bar', 'mod:bar'),
+                ('group', 'foo', 'other:foo'), ('other', 'baz', 'mod:baz')]
+    static = {'group': {'foo': 'static:foo', 'quux': 'static:quux'}}
+
+    def setUp(self):
+        plugins._all_entry_points._reset()
+        plugins._static_entry_points._reset()
+
+    def tearDown(self):
+        plugins._all_entry_points._reset()
+        plugins._static_entry_points._reset()
+
+    def patch(self, metadata=metadata, static=static):
+        self.metadata_mock = mock.Mock(return_value=metadata)
+        return mock.patch.multiple(
+            'bfg9000.plugins', _metadata_entry_points=self.metadata_mock,
+            _static_entry_points=mock.Mock(return_value=static)
+        )
+
+    def test_entry_points(self):
+        with self.patch():
+            self.assertEqual(entry_points('group'), [
+                EntryPoint('foo', 'mod:foo'), EntryPoint('bar', 'mod:bar'),
+                EntryPoint('quux', 'static:quux'),
+            ])
+            self.assertEqual(entry_points('other'),
+                             [EntryPoint('baz', 'mod:baz')])
+            self.assertEqual(entry_points('nonexist'), [])
+
+    def test_entry_points_no_metadata(self):
+        with self.patch(metadata=[]):
+            self.assertEqual(entry_points('group'), [
+                EntryPoint('foo', 'static:foo'),
+                EntryPoint('quux', 'static:quux'),
+            ])
+
+    def test_entry_point(self):
+        with self.patch():
+            self.assertEqual(entry_point('group', 'foo'),
+                             EntryPoint('foo', 'static:foo'))
+            self.metadata_mock.assert_not_called()
+
+            self.assertEqual(entry_point('group', 'bar'),
+                             EntryPoint('bar', 'mod:bar'))
+            self.assertEqual(entry_point('group', 'nonexist'), None)
+            self.assertEqual(entry_point('nonexist', 'foo'), None)
+
+    def test_egg_info_entry_points(self):
+        data = ('[console_scripts]\n' +
+                'bfg9000 = bfg9000.driver:main\n\n' +
+                '[bfg9000.backends]\n' +
+                'make = bfg9000.backends.make.writer\n' +
+                'msbuild = bfg9000.backends.msbuild.writer [msbuild]\n')
+        with mock.patch('builtins.open', mock_open(read_data=data)):
+            self.assertEqual(plugins._egg_info_entry_points(), {
+                'bfg9000.backends': {
+                    'make': 'bfg9000.backends.make.writer',
+                    'msbuild': 'bfg9000.backends.msbuild.writer [msbuild]',
+                },
+            })
+
+        with mock.patch('builtins.open', side_effect=FileNotFoundError()):
+            self.assertEqual(plugins._egg_info_entry_points(), {})
+
+    def test_real_entry_points(self):
+        names = [i.name for i in entry_points('bfg9000.backends')]
+        self.assertIn('make', names)
+        self.assertIn('ninja', names)
+        self.assertEqual(entry_point('bfg9000.platforms.host', 'posix').load()
+                         .__name__, 'PosixHostPlatform')
@@ -0,0 +1,110 @@
+import errno
+import os
+from unittest import mock
+
+from . import *
+
+from bfg9000 import pool
+
+
+def busy(depth):
+    def lockf(fd, cmd, len=0, start=0, whence=0):
+        if start < depth:
+            raise OSError(errno.EAGAIN, 'Resource temporarily unavailable')
+    return lockf
+
+
+class TestJobserver(TestCase):
+    def test_none(self):
+        self.assertIs(pool.Jobserver.from_env({}), None)
+        self.assertIs(pool.Jobserver.from_env({'MAKEFLAGS': 'k'}), None)
+
+    def test_fds(self):
+        r, w = os.pipe()
+        try:
+            env = {'MAKEFLAGS': ' -j4 --jobserver-auth={},{}'.format(r, w)}
+            js = pool.Jobserver.from_env(env)
+            self.assertEqual((js.read_fd, js.write_fd), (r, w))
+        finally:
+            os.close(r)
+            os.close(w)
+
+    def test_closed_fds(self):
+        r, w = os.pipe()
+        os.close(r)
+        os.close(w)
+        env = {'MAKEFLAGS': ' -j4 --jobserver-auth={},{}'.format(r, w)}
+        self.assertIs(pool.Jobserver.from_env(env), None)
+
+    def test_invalid_fds(self):
+        env = {'MAKEFLAGS': ' -j4 --jobserver-auth=foo'}
+        self.assertIs(pool.Jobserver.from_env(env), None)
+
+    def test_fifo(self):
+        env = {'MAKEFLAGS': ' -j4 --jobserver-auth=fifo:/tmp/GMfifo1'}
+        with mock.patch('os.open', return_value=3) as mopen:
+            js = pool.Jobserver.from_env(env)
+        mopen.assert_called_once_with('/tmp/GMfifo1', os.O_RDWR)
+        self.assertEqual((js.read_fd, js.write_fd), (3, 3))
+
+    def test_lend(self):
+        r, w = os.pipe()
+        try:
+            js = pool.Jobserver(r, w)
+            js.release()
+            js.acquire()
+            os.set_blocking(r, False)
+            self.assertRaises(BlockingIOError, os.read, r, 1)
+        finally:
+            os.close(r)
+            os.close(w)
+
+
+class TestAcquireSlot(TestCase):
+    def test_free(self):
+        with mock.patch('fcntl.lockf') as mlockf:
+            self.assertEqual(pool.acquire_slot(3, 2), 0)
+        mlockf.assert_called_once_with(3, mock.ANY, 1, 0)
+
+    def test_partly_busy(self):
+        with mock.patch('fcntl.lockf', side_effect=busy(1)):
+            self.assertEqual(pool.acquire_slot(3, 2), 1)
+
+    def test_wait(self):
+        lockf = busy(2)
+        js = mock.Mock()
+
+        def sleep(interval):
+            self.assertEqual(js.release.call_count, 1)
+            self.assertEqual(js.acquire.call_count, 0)
+            mlockf.side_effect = None
+
+        with mock.patch('fcntl.lockf', side_effect=lockf) as mlockf, \
+             mock.patch('time.sleep', side_effect=sleep):  # noqa
+            self.assertEqual(pool.acquire_slot(3, 2, js), 0)
+        js.release.assert_called_once_with()
+        js.acquire.assert_called_once_with()
+
+    def test_error(self):
+        def lockf(*args):
+            raise OSError(errno.EBADF, 'Bad file descriptor')
+
+        js = mock.Mock()
+        with mock.patch('fcntl.lockf', side_effect=lockf):
+            self.assertRaises(OSError, pool.acquire_slot, 3, 2, js)
+        js.release.assert_not_called()
+
+
+class TestRun(TestCase):
+    def test_run(self):
+        with mock.patch('os.open', return_value=3) as mopen, \
+             mock.patch('os.close') as mclose, \
+             mock.patch('bfg9000.pool.acquire_slot') as macquire, \
+             mock.patch('bfg9000.pool.Jobserver.from_env',
+                        return_value=None), \
+             mock.patch('subprocess.call', return_value=1) as mcall:  # noqa
+            self.assertEqual(pool.run('link.pool', 2, ['cmd']), 1)
+        mopen.assert_called_once_with('link.pool', mock.ANY, 0o666)
+        macquire.assert_called_once_with(3, 2, None)
+        mcall.assert_called_once_with(['cmd'])
+        mclose.assert_called_once_with(3)
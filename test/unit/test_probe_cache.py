@@ -0,0 +1,180 @@
+import json
+import posixpath
+from unittest import mock
+
+from . import *
+
+from bfg9000 import shell
+from bfg9000.probe_cache import ProbeCache
+
+
+def mock_stat(command, env):
+    return [posixpath.join('/bin', command), 1, 2]
+
+
+class TestProbeCache(TestCase):
+    def make_cache(self, entries={}):
+        data = json.dumps({'version': ProbeCache.version, 'entries': entries})
+        with mock.patch('builtins.open', mock_open(read_data=data)):
+            return ProbeCache('.bfg_probe_cache')
+
+    def test_load_missing(self):
+        with mock.patch('builtins.open', side_effect=FileNotFoundError()):
+            cache = ProbeCache('.bfg_probe_cache')
+        self.assertEqual(cache._entries, {})
+
+    def test_load_bad_version(self):
+        data = json.dumps({'version': 0, 'entries': {'foo': 'bar'}})
+        with mock.patch('builtins.open', mock_open(read_data=data)):
+            cache = ProbeCache('.bfg_probe_cache')
+        self.assertEqual(cache._entries, {})
+
+    def test_execute(self):
+        cache = self.make_cache()
+        with mock.patch.object(ProbeCache, '_stat', side_effect=mock_stat), \
+             mock.patch('bfg9000.shell.execute',
+                        return_value='version 1.0') as m:  # noqa
+            self.assertEqual(cache.execute(['cc', '--version'], env={},
+                                           stdout=shell.Mode.pipe),
+                             'version 1.0')
+            self.assertEqual(cache.execute(['cc', '--version'], env={},
+                                           stdout=shell.Mode.pipe),
+                             'version 1.0')
+            self.assertEqual(m.call_count, 1)
+
+    def test_execute_tuple(self):
+        cache = self.make_cache()
+        with mock.patch.object(ProbeCache, '_stat', side_effect=mock_stat), \
+             mock.patch('bfg9000.shell.execute',
+                        return_value=('out', 'err')) as m:  # noqa
+            for i in range(2):
+                self.assertEqual(cache.execute(['cc', '-v'], env={}),
+                                 ('out', 'err'))
+            self.assertEqual(m.call_count, 1)
+
+    def test_execute_error(self):
+        cache = self.make_cache()
+        err = shell.CalledProcessError(1, ['cc', '--bad'])
+        with mock.patch.object(ProbeCache, '_stat', side_effect=mock_stat), \
+             mock.patch('bfg9000.shell.execute', side_effect=err) as m:  # noqa
+            for i in range(2):
+                with self.assertRaises(shell.CalledProcessError):
+                    cache.execute(['cc', '--bad'], env={})
+            self.assertEqual(m.call_count, 1)
+
+    def test_execute_env_changed(self):
+        cache = self.make_cache()
+        with mock.patch.object(ProbeCache, '_stat', side_effect=mock_stat), \
+             mock.patch('bfg9000.shell.execute',
+                        return_value='output') as m:  # noqa
+            cache.execute(['cc', '-print-search-dirs'], env={})
+            cache.execute(['cc', '-print-search-dirs'],
+                          env={'LIBRARY_PATH': '/lib'})
+            cache.execute(['cc', '-print-search-dirs'],
+                          env={'UNRELATED': 'value'})
+            self.assertEqual(m.call_count, 2)
+
+    def test_execute_tool_changed(self):
+        args = ['cc', '--version']
+        key = ProbeCache._key(args, {}, {})
+        cache = self.make_cache({key: {
+            'stats': [['/bin/cc', 0, 0]], 'output': 'old'
+        }})
+        with mock.patch.object(ProbeCache, '_stat', side_effect=mock_stat), \
+             mock.patch('bfg9000.shell.execute',
+                        return_value='new') as m:  # noqa
+            self.assertEqual(cache.execute(args, env={}), 'new')
+            self.assertEqual(m.call_count, 1)
+
+    def test_execute_launcher(self):
+        args = ['ccache', 'cc', '--version']
+        key = ProbeCache._key(args, {}, {})
+        cache = self.make_cache({key: {
+            'stats': [['/bin/ccache', 1, 2], ['/bin/cc', 0, 0]],
+            'output': 'old'
+        }})
+        with mock.patch.object(ProbeCache, '_stat', side_effect=mock_stat), \
+             mock.patch('bfg9000.shell.execute',
+                        return_value='new') as m:  # noqa
+            self.assertEqual(cache.execute(args, env={}), 'new')
+            self.assertEqual(m.call_count, 1)
+
+    def test_execute_linker_changed(self):
+        args = ['cc', '-v', '-Wl,--version']
+        key = ProbeCache._key(args, {}, {})
+        cache = self.make_cache({key: {
+            'stats': [['/bin/cc', 1, 2], ['/bin/ld', 0, 0]], 'output': 'old'
+        }})
+        with mock.patch.object(ProbeCache, '_stat', side_effect=mock_stat), \
+             mock.patch('bfg9000.shell.execute',
+                        return_value='new') as m:  # noqa
+            self.assertEqual(cache.execute(args, env={}), 'new')
+            self.assertEqual(m.call_count, 1)
+
+    def test_stats(self):
+        with mock.patch.object(ProbeCache, '_stat', side_effect=mock_stat):
+            self.assertEqual(ProbeCache._stats(['cc', '--version'], {}), [
+                ['/bin/cc', 1, 2]
+            ])
+            self.assertEqual(ProbeCache._stats(['ccache', 'cc', '-v'], {}), [
+                ['/bin/ccache', 1, 2], ['/bin/cc', 1, 2]
+            ])
+            self.assertEqual(ProbeCache._stats(
+                ['cc', '-print-search-dirs'], {}
+            ), [['/bin/cc', 1, 2], ['/bin/ld', 1, 2]])
+            self.assertEqual(ProbeCache._stats(
+                ['cc', '-fuse-ld=gold', '-Wl,--version'], {}
+            ), [['/bin/cc', 1, 2], ['/bin/ld.gold', 1, 2]])
+
+    def test_stat_script(self):
+        with mock.patch('bfg9000.shell.which', return_value=['/bin/cc']), \
+             mock.patch('builtins.open', mock_open(read_data=b'#!/bin/sh')), \
+             mock.patch('os.stat') as ms:  # noqa
+            self.assertEqual(ProbeCache._stat('cc', {}), None)
+            ms.assert_not_called()
+
+    def test_execute_not_found(self):
+        cache = self.make_cache()
+        with mock.patch.object(ProbeCache, '_stat', return_value=None), \
+             mock.patch('bfg9000.shell.execute',
+                        return_value='output') as m:  # noqa
+            for i in range(2):
+                self.assertEqual(cache.execute(['cc', '--version'], env={}),
+                                 'output')
+            self.assertEqual(m.call_count, 2)
+
+    def test_save(self):
+        cache = self.make_cache()
+        with mock.patch.object(ProbeCache, '_stat', side_effect=mock_stat), \
+             mock.patch('bfg9000.shell.execute', return_value='output'):
+            cache.execute(['cc', '--version'], env={})
+
+        with mock.patch.object(ProbeCache, '_stat', side_effect=mock_stat), \
+             mock.patch('tempfile.mkstemp', return_value=(0, 'tmp')), \
+             mock.patch('os.fdopen', mock_open()) as mo, \
+             mock.patch('os.replace') as mr:  # noqa
+            cache.save()
+        mr.assert_called_once_with('tmp', '.bfg_probe_cache')
+        data = json.loads(''.join(i[-2][0] for i in
+                                  mo().write.mock_calls))
+        self.assertEqual(list(data['entries'].values()), [
+            {'stats': [['/bin/cc', 1, 2]], 'output': 'output'}
+        ])
+
+    def test_save_prune(self):
+        key = ProbeCache._key(['cc', '--version'], {}, {})
+        cache = self.make_cache({key: {
+            'stats': [['/bin/cc', 0, 0]], 'output': 'old'
+        }})
+        with mock.patch.object(ProbeCache, '_stat', side_effect=mock_stat), \
+             mock.patch('tempfile.mkstemp', return_value=(0, 'tmp')), \
+             mock.patch('os.fdopen', mock_open()), \
+             mock.patch('os.replace'):  # noqa
+            cache.save()
+        self.assertEqual(cache._entries, {})
+
+    def test_save_unchanged(self):
+        cache = self.make_cache()
+        with mock.patch('os.replace') as mr:
+            cache.save()
+        mr.assert_not_called()
@@ -0,0 +1,86 @@
+import json
+import os
+from unittest import mock
+
+from . import *
+
+from bfg9000 import restat
+
+
+def mock_stat(mtimes):
+    def stat(path):
+        if path not in mtimes:
+            raise FileNotFoundError()
+        return mock.Mock(st_mtime_ns=mtimes[path], st_atime_ns=0)
+    return stat
+
+
+class TestHashFile(TestCase):
+    def test_hash(self):
+        with mock.patch('builtins.open', mock_open(read_data=b'data')):
+            self.assertEqual(restat._hash_file('file'),
+                             '3a6eb0790f39ac87c94f3856b2dd2c5d' +
+                             '110e6811602261a9a923d3bb23adc8b7')
+
+
+class TestSave(TestCase):
+    def test_save(self):
+        out = os.path.abspath('out')
+        with mock.patch('os.stat', mock_stat({'out': 100})), \
+             mock.patch('bfg9000.restat._hash_file', return_value='hash'), \
+             mock.patch('builtins.open', mock_open()) as mopen:  # noqa
+            restat.save('state', ['out', 'missing'])
+        mopen.assert_called_once_with('state', 'w')
+        written = ''.join(i[-2][0] for i in mopen().write.mock_calls)
+        self.assertEqual(json.loads(written), [[out, 100, 'hash']])
+
+
+class TestRestore(TestCase):
+    def test_unchanged(self):
+        data = json.dumps([['out', 100, 'hash']])
+        with mock.patch('builtins.open', mock_open(read_data=data)), \
+             mock.patch('os.stat', mock_stat({'out': 200})), \
+             mock.patch('bfg9000.restat._hash_file', return_value='hash'), \
+             mock.patch('os.utime') as mutime, \
+             mock.patch('os.remove') as mremove:  # noqa
+            self.assertEqual(restat.restore('state'), ['out'])
+        mutime.assert_called_once_with('out', ns=(0, 100))
+        mremove.assert_called_once_with('state')
+
+    def test_changed(self):
+        data = json.dumps([['out', 100, 'hash']])
+        with mock.patch('builtins.open', mock_open(read_data=data)), \
+             mock.patch('os.stat', mock_stat({'out': 200})), \
+             mock.patch('bfg9000.restat._hash_file', return_value='new'), \
+             mock.patch('os.utime') as mutime, \
+             mock.patch('os.remove') as mremove:  # noqa
+            self.assertEqual(restat.restore('state'), [])
+        mutime.assert_not_called()
+        mremove.assert_called_once_with('state')
+
+    def test_removed(self):
+        data = json.dumps([['out', 100, 'hash']])
+        with mock.patch('builtins.open', mock_open(read_data=data)), \
+             mock.patch('bfg9000.restat._hash_file',
+                        side_effect=FileNotFoundError()), \
+             mock.patch('os.utime') as mutime, \
+             mock.patch('os.remove') as mremove:  # noqa
+            self.assertEqual(restat.restore('state'), [])
+        mutime.assert_not_called()
+        mremove.assert_called_once_with('state')
+
+    def test_missing_state(self):
+        with mock.patch('builtins.open', side_effect=FileNotFoundError()), \
+             mock.patch('os.utime') as mutime, \
+             mock.patch('os.remove') as mremove:  # noqa
+            self.assertEqual(restat.restore('state'), [])
+        mutime.assert_not_called()
+        mremove.assert_not_called()
+
+    def test_invalid_state(self):
+        with mock.patch('builtins.open', mock_open(read_data='invalid')), \
+             mock.patch('os.utime') as mutime, \
+             mock.patch('os.remove') as mremove:  # noqa
+            self.assertEqual(restat.restore('state'), [])
+        mutime.assert_not_called()
+        mremove.assert_not_called()
@@ -0,0 +1,161 @@
+import argparse
+import os
+import tempfile
+from unittest import mock
+
+from . import *
+
+from bfg9000 import file_types
+from bfg9000.build_inputs import BuildInputs
+from bfg9000.builtins import init as builtin_init
+from bfg9000.builtins.builtin import BuildContext
+from bfg9000.path import Path, Root
+from bfg9000.submodule_cache import (_apply, _diff, _snapshot, _Uncacheable,
+                                     SubmoduleCache)
+
+
+class Thing:
+    def __init__(self):
+        self.items = []
+        self.value = 1
+
+
+class TestSnapshot(TestCase):
+    def assertReplays(self, before, after, mutate):
+        snapshot = _snapshot(before)
+        mutate(before)
+        ops = _diff(before, snapshot)
+        _apply(after, ops)
+        return ops
+
+    def test_list(self):
+        old, new = [1], [1]
+        ops = self.assertReplays(old, new, lambda x: x.extend([2, 3]))
+        self.assertEqual(ops, [('extend', (), [2, 3])])
+        self.assertEqual(new, [1, 2, 3])
+
+    def test_list_unchanged(self):
+        old = [1, 2]
+        self.assertEqual(_diff(old, _snapshot(old)), [])
+
+    def test_list_shrunk(self):
+        old = [1, 2]
+        snapshot = _snapshot(old)
+        old.pop()
+        self.assertRaises(_Uncacheable, _diff, old, snapshot)
+
+    def test_set(self):
+        old, new = {1}, {1}
+        self.assertReplays(old, new, lambda x: x.add(2))
+        self.assertEqual(new, {1, 2})
+
+    def test_set_removed(self):
+        old = {1, 2}
+        snapshot = _snapshot(old)
+        old.remove(1)
+        self.assertRaises(_Uncacheable, _diff, old, snapshot)
+
+    def test_dict(self):
+        old, new = {'a': [], 'b': 1}, {'a': [], 'b': 1}
+
+        def mutate(x):
+            x['a'].append(1)
+            x['b'] = 2
+            x['c'] = 3
+
+        self.assertReplays(old, new, mutate)
+        self.assertEqual(new, {'a': [1], 'b': 2, 'c': 3})
+
+    def test_dict_removed(self):
+        old = {'a': 1}
+        snapshot = _snapshot(old)
+        del old['a']
+        self.assertRaises(_Uncacheable, _diff, old, snapshot)
+
+    def test_object(self):
+        old, new = {'x': Thing()}, {'x': Thing()}
+
+        def mutate(x):
+            x['x'].items.append('item')
+            x['x'].value = 2
+
+        self.assertReplays(old, new, mutate)
+        self.assertEqual(new['x'].items, ['item'])
+        self.assertEqual(new['x'].value, 2)
+
+
+class TestSubmoduleCache(TestCase):
+    def setUp(self):
+        builtin_init()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, SubmoduleCache.filename)
+        self.env = make_env()
+        self.argv = argparse.Namespace()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def make_context(self):
+        build = BuildInputs(self.env, Path('build.bfg', Root.srcdir))
+        return BuildContext(self.env, build, self.argv)
+
+    def execute(self, context):
+        context.build.add_source(file_types.SourceFile(
+            Path('main.cpp', Root.srcdir), 'c++'
+        ))
+        context.builtins['answer'] = 42
+        return {'name': 'sub'}
+
+    def test_replay(self):
+        path = Path('sub/build.bfg', Root.srcdir)
+
+        context = self.make_context()
+        cache = SubmoduleCache(self.path, self.env, self.argv)
+        self.assertEqual(cache.execute(context, path,
+                                       lambda: self.execute(context)),
+                         {'name': 'sub'})
+        cache.save()
+
+        context = self.make_context()
+        cache = SubmoduleCache(self.path, self.env, self.argv)
+        execute = mock.Mock()
+        self.assertEqual(cache.execute(context, path, execute),
+                         {'name': 'sub'})
+        execute.assert_not_called()
+        self.assertEqual([i.path for i in context.build.sources()], [
+            Path('build.bfg', Root.srcdir), Path('main.cpp', Root.srcdir),
+        ])
+        self.assertEqual(context.builtins['answer'], 42)
+
+    def test_changed_context(self):
+        path = Path('sub/build.bfg', Root.srcdir)
+
+        context = self.make_context()
+        cache = SubmoduleCache(self.path, self.env, self.argv)
+        cache.execute(context, path, lambda: self.execute(context))
+        cache.save()
+
+        self.env.variables['CPPFLAGS'] = '-DFOO'
+        context = self.make_context()
+        cache = SubmoduleCache(self.path, self.env, self.argv)
+        execute = mock.Mock(return_value={})
+        self.assertEqual(cache.execute(context, path, execute), {})
+        execute.assert_called_once_with()
+
+    def test_journal(self):
+        context = self.make_context()
+        build = context.build
+        src = build.add_source(file_types.SourceFile(
+            Path('main.cpp', Root.srcdir), 'c++'
+        ))
+        self.assertIs(build._journal, None)
+
+        cache = SubmoduleCache(self.path, self.env, self.argv)
+
+        def execute():
+            self.assertEqual(build._journal, [])
+            build.add_source(src)
+            return {}
+
+        cache.execute(context, Path('sub/build.bfg', Root.srcdir), execute)
+        self.assertIs(build._journal, None)
@@ -0,0 +1,53 @@
+from . import *
+
+from bfg9000 import toc
+
+readelf_output = """
+Dynamic section at offset 0x2e68 contains 3 entries:
+  Tag        Type                         Name/Value
+ 0x0000000000000001 (NEEDED)             Shared library: [libc.so.6]
+ 0x000000000000000e (SONAME)             Library soname: [libfoo.so.1]
+ 0x0000000000000000 (NULL)               0x0
+
+Symbol table '.dynsym' contains 7 entries:
+   Num:    Value          Size Type    Bind   Vis      Ndx Name
+     0: 0000000000000000     0 NOTYPE  LOCAL  DEFAULT  UND 
+     1: 0000000000000000     0 NOTYPE  WEAK   DEFAULT  UND __gmon_start__
+     2: 0000000000000000     0 FUNC    GLOBAL DEFAULT  UND puts@GLIBC_2.2.5 (2)
+     3: 0000000000001109    11 FUNC    GLOBAL DEFAULT   14 foo
+     4: 0000000000004010     4 OBJECT  GLOBAL DEFAULT   23 bar
+     5: 0000000000001114    11 FUNC    WEAK   DEFAULT   14 baz
+     6: 0000000000001120    11 FUNC    GLOBAL DEFAULT [<localentry>: 8] 14 quux
+
+Symbol table '.symtab' contains 1 entry:
+   Num:    Value          Size Type    Bind   Vis      Ndx Name
+     0: 0000000000001130    11 FUNC    GLOBAL DEFAULT   14 hidden
+"""  # noqa: W291
+
+
+class TestToc(TestCase):
+    def test_toc(self):
+        self.assertEqual(toc.toc(readelf_output), [
+            'soname: libfoo.so.1',
+            'bar OBJECT GLOBAL 4',
+            'baz FUNC WEAK',
+            'foo FUNC GLOBAL',
+            'quux FUNC GLOBAL',
+        ])
+
+    def test_no_soname(self):
+        self.assertEqual(toc.toc(readelf_output.replace('(SONAME)', '')), [
+            'bar OBJECT GLOBAL 4',
+            'baz FUNC WEAK',
+            'foo FUNC GLOBAL',
+            'quux FUNC GLOBAL',
+        ])
+
+    def test_symbol_order(self):
+        lines = readelf_output.splitlines()
+        lines[12], lines[13] = lines[13], lines[12]
+        self.assertIn(' foo', lines[13])
+        self.assertEqual(toc.toc('\n'.join(lines)), toc.toc(readelf_output))
+
+    def test_empty(self):
+        self.assertEqual(toc.toc(''), [])
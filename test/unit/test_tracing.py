@@ -0,0 +1,65 @@
+import json
+from unittest import mock
+
+from . import *
+
+from bfg9000 import tracing
+
+
+class TestTracing(TestCase):
+    def tearDown(self):
+        tracing._tracer = None
+
+    def test_disabled(self):
+        self.assertFalse(tracing.enabled())
+        with tracing.span('name', 'cat', foo='bar') as args:
+            self.assertEqual(args, {'foo': 'bar'})
+            args['returncode'] = 0
+
+    def test_span(self):
+        tracing.enable()
+        self.assertTrue(tracing.enabled())
+        with tracing.span('name', 'cat', argv=['cmd', 1]) as args:
+            args['returncode'] = 1
+        with tracing.span('name', 'cat'):
+            pass
+
+        data = tracing._tracer.to_json()
+        self.assertEqual(len(data['traceEvents']), 2)
+        event = data['traceEvents'][0]
+        self.assertEqual(event['name'], 'name')
+        self.assertEqual(event['cat'], 'cat')
+        self.assertEqual(event['ph'], 'X')
+        self.assertEqual(event['args'], {'argv': ['cmd', 1],
+                                         'returncode': 1})
+        self.assertNotIn('args', data['traceEvents'][1])
+
+        self.assertEqual(list(data['otherData']['summary']), ['cat'])
+        self.assertEqual(data['otherData']['summary']['cat']['name']['count'],
+                         2)
+
+    def test_exception(self):
+        tracing.enable()
+        with self.assertRaises(ValueError):
+            with tracing.span('name', 'cat'):
+                raise ValueError()
+        self.assertEqual(len(tracing._tracer.events), 1)
+
+    def test_jsonify(self):
+        self.assertEqual(tracing._jsonify('foo'), 'foo')
+        self.assertEqual(tracing._jsonify(None), None)
+        self.assertEqual(tracing._jsonify(('foo', 1)), ['foo', 1])
+        self.assertEqual(tracing._jsonify(object), str(object))
+
+    def test_save(self):
+        tracing.enable()
+        with tracing.span('name', 'cat'):
+            pass
+
+        with mock.patch('builtins.open', mock_open()) as mo:
+            tracing.save('trace.json')
+        mo.assert_called_once_with('trace.json', 'w')
+        data = json.loads(''.join(
+            i[0][0] for i in mo.return_value.write.call_args_list
+        ))
+        self.assertEqual(data['traceEvents'][0]['name'], 'name')
@@ -39,6 +39,14 @@ class TestCcCompiler(CrossPlatformTestCase):
             [self.compiler] + extra + ['flags', '-c', 'in', '-MMD', '-MF',
                                        'out.d', '-o', 'out']
         )
+        self.assertEqual(
+            self.compiler('in', 'out', 'out.d', phony_deps=True),
+            [self.compiler] + extra + ['-c', 'in', '-MMD', '-MF', 'out.d',
+                                       '-MP', '-o', 'out']
+        )
+
+    def test_supports_phony_deps(self):
+        self.assertTrue(self.compiler.supports_phony_deps)
 
     def test_default_name(self):
         src = SourceFile(Path('file.cpp', Root.srcdir), 'c++')
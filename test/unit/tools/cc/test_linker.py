@@ -55,6 +55,9 @@ class TestCcLinker(CrossPlatformTestCase):
         self.assertFalse(self.linker.can_link('goofy', ['c']))
         self.assertFalse(self.linker.can_link(fmt, ['objc++']))
 
+    def test_supports_response_file(self):
+        self.assertTrue(self.linker.supports_response_file)
+
     def test_flags_empty(self):
         self.assertEqual(self.linker.flags(opts.option_list()), [])
 
@@ -54,6 +54,9 @@ class TestMsvcLinker(CrossPlatformTestCase):
         c_linker = self._get_linker('c')
         self.assertFalse(c_linker.can_link(fmt, ['c++']))
 
+    def test_supports_response_file(self):
+        self.assertTrue(self.linker.supports_response_file)
+
     def test_flags_empty(self):
         self.assertEqual(self.linker.flags(opts.option_list()), [])
 
@@ -284,6 +287,9 @@ class TestMsvcStaticLinker(CrossPlatformTestCase):
         self.assertTrue(self.linker.can_link(fmt, ['goofy']))
         self.assertFalse(self.linker.can_link('goofy', ['c']))
 
+    def test_supports_response_file(self):
+        self.assertTrue(self.linker.supports_response_file)
+
     def test_flags_empty(self):
         self.assertEqual(self.linker.flags(opts.option_list()), [])
 
@@ -31,6 +31,7 @@ class TestArLinker(CrossPlatformTestCase):
         with mock.patch('bfg9000.shell.execute', mock_execute):
             self.assertEqual(self.ar.brand, 'gnu')
             self.assertEqual(self.ar.version, Version('2.26.1'))
+            self.assertTrue(self.ar.supports_response_file)
 
     def test_unknown_brand(self):
         def mock_execute(*args, **kwargs):
@@ -39,6 +40,7 @@ class TestArLinker(CrossPlatformTestCase):
         with mock.patch('bfg9000.shell.execute', mock_execute):
             self.assertEqual(self.ar.brand, 'unknown')
             self.assertEqual(self.ar.version, None)
+            self.assertFalse(self.ar.supports_response_file)
 
     def test_broken_brand(self):
         def mock_execute(*args, **kwargs):
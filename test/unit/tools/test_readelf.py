@@ -0,0 +1,16 @@
+from . import *
+
+from bfg9000.tools.readelf import ReadElf
+
+
+class TestReadElf(ToolTestCase):
+    tool_type = ReadElf
+
+    def test_env(self):
+        with mock.patch('bfg9000.shell.which', return_value=['command']):
+            self.assertIsInstance(self.env.tool('readelf'), ReadElf)
+
+    def test_call(self):
+        self.assertEqual(self.tool('file'), [
+            self.tool, '-dW', '--dyn-syms', 'file'
+        ])